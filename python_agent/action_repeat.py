@@ -0,0 +1,89 @@
+"""
+Tick-aware action repeat for CustomGameEnv.
+
+Most decisions don't need re-evaluating every game tick: once an attack or a walk is
+submitted the game carries it on by itself. ActionRepeat sends the policy's action once,
+then holds it with CustomGameEnv.hold() for up to `repeat` ticks in all, observing the
+game without sending anything, and hands the policy the summed reward of the held steps:
+
+    env = ActionRepeat(CustomGameEnv(ticks_per_step=1), repeat=4)
+
+The hold ends early when an interrupt fires between two observations (by default
+state_changed(): health dropped, an NPC left the view, an item dropped, or a walk ended).
+With interrupt=None nothing needs checking, so the held ticks cost a single observation
+request. The policy then runs once per hold instead of once per tick. Held steps cost the
+step cost per tick, so the return doesn't depend on how often the interrupt is checked.
+
+hold() waits for the ticks with the client's wait_for_tick(), which needs a bridge with the
+"tick_sync" capability or a client subscribed to the observation stream (SimulatedGameEnv
+simulates ticks). With neither, it warns once and sleeps for the ticks' nominal length
+(GAME_TICK_MS each) before fetching an observation, which is then not tick-aligned.
+"""
+
+import gymnasium as gym
+import numpy as np
+
+# Actions whose effect continues in the game without re-sending them (ATTACK_NPC,
+# MOVE_TO_GOBLIN_AREA, NOOP); eating is over in one tick
+HOLD_ACTIONS = (0, 2, 3)
+
+
+def _count(rows):
+    return int(np.count_nonzero(rows[:, 0] != -1))
+
+
+def state_changed(action, previous, current):
+    """Default interrupt: whether the state changed enough for the policy to decide again.
+
+    Fires when health dropped, fewer NPCs are in view (e.g. the target died), more ground
+    items lie around (a drop), or, while walking, the player stopped moving.
+    """
+    if current["player_stats"][0] < previous["player_stats"][0]:
+        return True
+    if _count(current["nearby_npcs_info"]) < _count(previous["nearby_npcs_info"]):
+        return True
+    if _count(current["nearby_ground_items_info"]) > _count(previous["nearby_ground_items_info"]):
+        return True
+    return action == 2 and np.array_equal(current["player_location"], previous["player_location"])
+
+
+class ActionRepeat(gym.Wrapper):
+    """Holds each HOLD_ACTIONS action for up to `repeat` game ticks.
+
+    `ticks_per_check` ticks pass between the observations the interrupt is checked on.
+    Actions that were declined (not submitted, except NOOP) or are not in `hold_actions`
+    return after their one step. The step's info carries the observed steps' last info,
+    plus "held_steps" (holds after the first step) and "interrupted". Holds go straight to
+    the unwrapped env, so put time limits and other wrappers around ActionRepeat.
+    """
+
+    def __init__(self, env, repeat=4, interrupt=state_changed, ticks_per_check=1, hold_actions=HOLD_ACTIONS):
+        super().__init__(env)
+        if repeat < 1 or ticks_per_check < 1:
+            raise ValueError("repeat and ticks_per_check must be at least 1")
+        self.repeat = repeat
+        self.interrupt = interrupt
+        self.ticks_per_check = ticks_per_check
+        self.hold_actions = frozenset(hold_actions)
+
+    def step(self, action):
+        observation, total_reward, terminated, truncated, info = self.env.step(action)
+        held_steps, interrupted = 0, False
+        submitted = action == 3 or info["action_status"].get("status") == "submitted"
+        if action in self.hold_actions and submitted:
+            remaining = self.repeat - 1
+            while remaining > 0 and not (terminated or truncated or interrupted):
+                # Without an interrupt there is nothing to check in between
+                ticks = remaining if self.interrupt is None else min(self.ticks_per_check, remaining)
+                previous = observation
+                observation, reward, terminated, truncated, info = self.env.unwrapped.hold(action, ticks)
+                total_reward += reward
+                remaining -= ticks
+                held_steps += 1
+                interrupted = self.interrupt is not None and self.interrupt(action, previous, observation)
+        info["held_steps"] = held_steps
+        info["interrupted"] = interrupted
+        return observation, total_reward, terminated, truncated, info
+
+    def action_masks(self):
+        return self.env.unwrapped.action_masks()
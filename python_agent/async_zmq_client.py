@@ -0,0 +1,256 @@
+import asyncio
+import time
+
+import zmq
+import zmq.asyncio
+
+from zmq_client import ZMQClient, CIRCUIT_CLOSED, frame_buffer
+from monitoring import record_error
+import step_trace
+
+
+class AsyncZMQClient(ZMQClient):
+    """asyncio-native bridge client built on zmq.asyncio.
+
+    Speaks the same protocol as ZMQClient and records the same metrics, but every
+    bridge call is a coroutine, so a single event loop can drive many bots (one client
+    per bridge) plus side tasks without a thread per bot. Requests go out over a
+    DEALER socket with request ids, so concurrent awaits on one client are also safe.
+    """
+
+    def __init__(self, host="localhost", port=5555, timeout_ms=5000, **client_kwargs):
+        self._futures = {}
+        self._reader_task = None
+        super().__init__(host=host, port=port, mode="dealer", timeout_ms=timeout_ms, **client_kwargs)
+
+    def _initialize_connection(self):
+        """Initialize the asyncio ZMQ socket with error handling."""
+        try:
+            if self.context is None:
+                self.context = zmq.asyncio.Context()
+            self.socket = self.context.socket(zmq.DEALER)
+            self.socket.connect(f"tcp://{self.host}:{self.port}")
+            self.socket.setsockopt(zmq.LINGER, 0) # Don't wait for unsent messages on close
+            self.connected = True
+            self.connection_attempts += 1
+            if self.verbose:
+                print(f"Async ZMQ Client connected to tcp://{self.host}:{self.port}")
+        except Exception as e:
+            self.connected = False
+            record_error("ZMQ_INIT_ERROR", f"Failed to initialize async ZMQ connection: {str(e)}")
+            raise
+
+    async def _reconnect(self):
+        """Get a usable socket after a failure; the context is kept, nothing sleeps.
+
+        A lost reply doesn't break a DEALER socket (a late one is dropped by request id), so
+        while other requests are in flight the socket is kept and their replies still
+        arrive. Only an idle socket is replaced.
+        """
+        if self.connected:
+            return True
+        if self._futures:
+            self.connected = True
+            return True
+
+        try:
+            self._stop_reader()
+            if self.socket:
+                self.socket.close()
+            self._initialize_connection()
+            return True
+        except Exception as e:
+            record_error("ZMQ_RECONNECT_ERROR", f"Failed to reconnect: {str(e)}")
+            self.metrics.record_connection_failure()
+            return False
+
+    async def send_command(self, command_type, params=None):
+        if self.circuit_state != CIRCUIT_CLOSED:
+            return self._circuit_open_error()
+        if self.compression and not self._compression_negotiated and command_type != "get_capabilities":
+            await self.get_capabilities()
+            self._select_compression_codec()
+
+        if not self.connected:
+            if not await self._reconnect():
+                return {"status": "error", "message": "Connection failed"}
+
+        start_time = time.time()
+        raw_message, payload = self._encode_command(command_type, params)
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._futures[request_id] = future
+        self._ensure_reader()
+
+        try:
+            send_start = time.perf_counter()
+            # Registered before the send completes so a fast reply always finds its entry
+            self._pending[request_id] = (command_type, raw_message, start_time, send_start)
+            await self.socket.send_multipart([request_id.to_bytes(8, "big"), b"", payload])
+            sent_at = time.perf_counter()
+            self._record_phase("send", sent_at - send_start)
+            if request_id in self._pending:
+                self._pending[request_id] = (command_type, raw_message, start_time, sent_at)
+            return await asyncio.wait_for(future, self.timeout_ms / 1000.0)
+        except asyncio.TimeoutError:
+            # Forget the request; the reader drops its reply if it turns up later
+            self._pending.pop(request_id, None)
+            self._futures.pop(request_id, None)
+            return self._handle_timeout(raw_message)
+        except zmq.error.ZMQError as e:
+            self._pending.pop(request_id, None)
+            self._futures.pop(request_id, None)
+            error_msg = f"ZMQError during communication for command {raw_message}: {e}"
+            self._report_error(step_trace.EVENT_ZMQ_ERROR, error_msg)
+            record_error("ZMQ_ERROR", error_msg, {"command": raw_message})
+            self._record_failure()
+            return {"status": "error", "message": error_msg}
+
+    def _ensure_reader(self):
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.get_running_loop().create_task(self._reader_loop())
+
+    def _stop_reader(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        # Nobody will answer requests sent on the old socket
+        for request_id, future in self._futures.items():
+            if not future.done():
+                future.set_result({"status": "error", "message": "Connection reset"})
+            self._pending.pop(request_id, None)
+        self._futures.clear()
+
+    async def _reader_loop(self):
+        """Dispatch replies to the coroutines awaiting them, matched by request id."""
+        while True:
+            try:
+                frames = await self.socket.recv_multipart(copy=False)
+            except asyncio.CancelledError:
+                raise
+            except zmq.error.ZMQError as e:
+                record_error("ZMQ_ERROR", f"Async reader stopped: {e}")
+                return
+
+            request_id = int.from_bytes(frame_buffer(frames[0]), "big")
+            pending = self._pending.pop(request_id, None)
+            future = self._futures.pop(request_id, None)
+            if pending is None or future is None:
+                # Reply to a request we already gave up on
+                self.late_replies_dropped += 1
+                continue
+            command_type, raw_message, start_time, sent_at = pending
+            self._record_phase("wait", time.perf_counter() - sent_at)
+            self.connected = True
+            # frames[1] is the empty delimiter
+            response = self._handle_reply(command_type, raw_message, frames[2:], start_time)
+            if not future.done():
+                future.set_result(response)
+
+    async def get_observation(self, refresh=False):
+        observation = self._local_observation(binary=False, refresh=refresh)
+        if observation is not None:
+            return observation
+        if self.delta_observations and self.supports("delta_observation"):
+            observation = await self.get_observation_delta()
+        else:
+            observation = await self.send_command("get_observation")
+        self._remember_tick(observation)
+        self._cache_observation(False, observation)
+        return observation
+
+    async def get_observation_delta(self):
+        """Fetch an observation in delta mode and return the full reconstructed dict (see ZMQClient).
+
+        Concurrent calls are safe: a reply diffed against a state another reply replaced
+        is retried as a full resync.
+        """
+        for _ in range(2):  # A failed delta is retried once as a full resync
+            response = await self.send_command("get_observation_delta",
+                                               params={"last_sequence": self._delta_sequence})
+            observation = self._delta_observation(response)
+            if observation is not None:
+                return observation
+        return self._delta_resync_failed()
+
+    async def get_observation_binary(self, refresh=False):
+        observation = self._local_observation(binary=True, refresh=refresh)
+        if observation is not None:
+            return observation
+        observation = await self.send_command("get_observation_binary")
+        self._cache_observation(True, observation)
+        return observation
+
+    async def execute_action(self, action_type, parameters):
+        action_payload = {"action_type": action_type, "parameters": parameters}
+        self.invalidate_observation_cache()
+        return await self.send_command("execute_action", params=action_payload)
+
+    async def execute_action_batch(self, actions):
+        batch_payload = {"actions": [{"action_type": action_type, "parameters": parameters}
+                                     for action_type, parameters in actions]}
+        self.invalidate_observation_cache()
+        response = await self.send_command("execute_action_batch", params=batch_payload)
+        return self._batch_result(response, len(batch_payload["actions"]))
+
+    async def step(self, action_type, parameters, binary_observation=False):
+        action_payload = {"action_type": action_type, "parameters": parameters}
+        command_type = "step_binary" if binary_observation else "step"
+        self.invalidate_observation_cache()
+        response = await self.send_command(command_type, params=action_payload)
+        if not isinstance(response, dict) or response.get("status") == "error":
+            return self._failed_step(response)
+        self._remember_tick(response.get("observation"))
+        self._cache_observation(binary_observation, response.get("observation"))
+        return response
+
+    async def wait_for_tick(self, tick=None, binary_observation=False, timeout_ms=None):
+        """Await the game reaching `tick` (the next tick if None) and return its observation.
+
+        The bridge holds the request until the tick, so other coroutines keep running.
+        """
+        command_type = "wait_for_tick_binary" if binary_observation else "wait_for_tick"
+        response = await self.send_command(command_type, params=self._tick_request(tick, timeout_ms))
+        return self._tick_observation(binary_observation, response)
+
+    async def wait_for_next_tick(self, binary_observation=False, timeout_ms=None):
+        return await self.wait_for_tick(None, binary_observation=binary_observation, timeout_ms=timeout_ms)
+
+    async def get_capabilities(self, refresh=False):
+        """Query (once) which optional protocol features the bridge supports."""
+        if self.capabilities is not None and not refresh:
+            return self.capabilities
+
+        return self._store_capabilities(await self.send_command("get_capabilities"))
+
+    def supports(self, capability):
+        """Check a capability against the last negotiated set (see get_capabilities()).
+
+        Unlike ZMQClient.supports() this never touches the network, so it is safe to call
+        from synchronous env code; await get_capabilities() once up front.
+        """
+        return capability in (self.capabilities or ())
+
+    def submit(self, command_type, params=None):
+        raise RuntimeError("AsyncZMQClient pipelines natively; await send_command() concurrently instead")
+
+    def get_reply(self, request_id, timeout_ms=None):
+        raise RuntimeError("AsyncZMQClient pipelines natively; await send_command() concurrently instead")
+
+    def close(self):
+        try:
+            self._stop_reader()
+            self._stop_probe()
+            self._stop_observation_stream()
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.socket:
+                self.socket.close()
+            if self.context and self._owns_context:
+                self.context.term()
+            self.connected = False
+            if self.verbose:
+                print("Async ZMQ Client connection closed")
+        except Exception as e:
+            record_error("ZMQ_CLOSE_ERROR", f"Error closing async ZMQ connection: {str(e)}")
@@ -0,0 +1,472 @@
+"""
+Benchmarks for the Python side of the AIBridge pipeline.
+Runs against the MockZMQServer from test_integration.py, so no game client is required.
+
+Usage:
+    python benchmark.py step --iterations 2000
+    python benchmark.py decode
+    python benchmark.py delta
+    python benchmark.py compression
+    python benchmark.py parse --payloads recorded_observations.jsonl
+    python benchmark.py replay --recording session.mbr
+    python benchmark.py parser
+    python benchmark.py vecenv --envs 4
+    python benchmark.py simulator --envs 256
+    python benchmark.py targets
+    python benchmark.py repeat
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from zmq_client import ZMQClient, ORJSON_AVAILABLE, loads_json
+from custom_env import (CustomGameEnv, OBSERVATION_SCHEMA, make_observation_schema, GOBLIN_NPC_ID, GOBLIN_ID_TABLE, FOOD_ITEM_IDS,
+                        FOOD_ID_TABLE)
+from entity_selection import GridIndex, nearest_entity, first_matching_item
+from observation_codec import encode_observation
+from observation_delta import encode_observation_delta, apply_observation_delta
+from payload_compression import CODECS, wrap_frame, unwrap_frame
+from bridge_recording import RECORDING_MAGIC, ReplayServer, recorded_observations
+from vec_env import PolledVectorEnv, make_env
+from simulator import SimulatedGameEnv, SimulatedVectorEnv
+from action_repeat import ActionRepeat
+from test_integration import MockZMQServer
+
+BENCHMARK_PORT = 5557
+VECENV_BASE_PORT = 5590
+
+
+def _report(name, iterations, elapsed_s, unit="step"):
+    per_call_us = elapsed_s / iterations * 1e6
+    print(f"  {name:<32} {per_call_us:10.1f} us/{unit}  {iterations / elapsed_s:10.1f} {unit}/s")
+
+
+def sample_observation(num_npcs=10, num_inventory=28, num_ground_items=10):
+    """A busier observation than the mock server default, closer to a real scene."""
+    return {
+        "player_current_health": 75, "player_max_health": 99,
+        "player_current_prayer": 50, "player_max_prayer": 70,
+        "player_run_energy_percentage": 0.8, "player_animation": 422,
+        "player_location": {"x": 3200, "y": 3200, "plane": 0},
+        "nearby_npcs": [
+            {"id": 125, "name": "Goblin", "animation": -1, "location": {"x": 3200 + i, "y": 3205 - i, "plane": 0}}
+            for i in range(num_npcs)
+        ],
+        "inventory": [{"id": 315, "name": "Shrimps", "quantity": 1} for _ in range(num_inventory)],
+        "nearby_ground_items": [
+            {"id": 526, "name": "Bones", "quantity": 1, "location": {"x": 3199 - i, "y": 3199, "plane": 0}}
+            for i in range(num_ground_items)
+        ],
+    }
+
+
+def benchmark_step(iterations):
+    """Compare execute_action + get_observation against the combined step RPC."""
+    server = MockZMQServer(port=BENCHMARK_PORT)
+    server.start()
+    client = ZMQClient(port=BENCHMARK_PORT)
+    parameters = {"x": 3200, "y": 3200, "plane": 0}
+    try:
+        print(f"Step round trips ({iterations} iterations):")
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.execute_action("walk_to", parameters)
+            client.get_observation()
+        _report("execute_action + get_observation", iterations, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.step("walk_to", parameters)
+        _report("step", iterations, time.perf_counter() - start)
+    finally:
+        client.close()
+        server.stop()
+
+
+def benchmark_decode(iterations):
+    """Compare JSON (json.loads + _get_obs) against the binary observation decode."""
+    env = CustomGameEnv()
+    raw_obs = sample_observation()
+    json_payload = json.dumps(raw_obs).encode('utf-8')
+    binary_payload = encode_observation(raw_obs)
+    try:
+        print(f"Observation decode ({iterations} iterations, "
+              f"JSON {len(json_payload)} bytes vs binary {len(binary_payload)} bytes):")
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            env._get_obs(json.loads(json_payload.decode('utf-8')))
+        _report("json", iterations, time.perf_counter() - start, unit="obs")
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            env._get_obs(binary_payload)
+        _report("binary", iterations, time.perf_counter() - start, unit="obs")
+    finally:
+        env.close()
+
+
+def benchmark_delta(iterations):
+    """Compare parsing a full JSON observation against parsing and applying a delta.
+
+    The scene is static apart from the player's health, the common case between steps.
+    """
+    base = sample_observation()
+    current = json.loads(json.dumps(base))
+    current["player_current_health"] -= 1
+    full_payload = json.dumps({"sequence": 2, "full": True, "observation": current}).encode('utf-8')
+    delta_payload = json.dumps(encode_observation_delta(base, current, 2, 1)).encode('utf-8')
+    print(f"Observation delta ({iterations} iterations, "
+          f"full {len(full_payload)} bytes vs delta {len(delta_payload)} bytes):")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.loads(full_payload.decode('utf-8'))["observation"]
+    _report("full", iterations, time.perf_counter() - start, unit="obs")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        apply_observation_delta(base, json.loads(delta_payload.decode('utf-8')))
+    _report("delta", iterations, time.perf_counter() - start, unit="obs")
+
+
+def benchmark_compression(iterations):
+    """Wire size and codec time per available codec for a large (busy scene) observation."""
+    payload = json.dumps(sample_observation(num_npcs=100, num_ground_items=100)).encode('utf-8')
+    print(f"Compression ({iterations} iterations, {len(payload)} byte observation):")
+    for codec in sorted(CODECS):
+        frame, _ = wrap_frame(payload, codec, threshold=0)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            unwrap_frame(wrap_frame(payload, codec, threshold=0)[0])
+        elapsed_s = time.perf_counter() - start
+        _report(f"{codec} ({len(frame)} bytes, {len(payload) / len(frame):.1f}x)", iterations, elapsed_s, unit="obs")
+
+
+def load_payloads(path):
+    """Observation payloads from a bridge recording or a file with one JSON document per line.
+
+    Falls back to sample scenes when no file is given.
+    """
+    if path is None:
+        return [json.dumps(sample_observation(num_npcs=n, num_ground_items=n)).encode('utf-8') for n in (3, 10, 50)]
+    with open(path, 'rb') as f:
+        if f.read(len(RECORDING_MAGIC)) == RECORDING_MAGIC:
+            return recorded_observations(path)
+        f.seek(0)
+        return [line.rstrip(b"\r\n") for line in f if line.strip()]
+
+
+def benchmark_parse(iterations, payloads=None):
+    """Compare the old copy + decode + json.loads reply path against parsing straight from the frame buffer."""
+    frames = load_payloads(payloads)
+    buffers = [memoryview(frame) for frame in frames]  # What zmq.Frame.buffer hands the client
+    total_bytes = sum(len(frame) for frame in frames)
+    backend = "orjson" if ORJSON_AVAILABLE else "json"
+    print(f"JSON reply parse ({iterations} iterations over {len(frames)} payloads, {total_bytes} bytes):")
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        json.loads(bytes(buffers[i % len(buffers)]).decode('utf-8'))
+    _report("copy + decode + json.loads", iterations, time.perf_counter() - start, unit="obs")
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        loads_json(buffers[i % len(buffers)])
+    _report(f"buffer + {backend}", iterations, time.perf_counter() - start, unit="obs")
+
+
+def benchmark_replay(iterations, recording=None):
+    """CustomGameEnv step throughput against a recorded session, replayed as fast as possible."""
+    if recording is None:
+        print("replay: pass --recording <file> (record one with ZMQClient(record_path=...))")
+        return
+    server = ReplayServer(recording, port=BENCHMARK_PORT)
+    server.start()
+    env = CustomGameEnv(client=ZMQClient(port=BENCHMARK_PORT, verbose=False), verbose=False)
+    try:
+        print(f"Replayed env steps ({iterations} iterations, {recording}):")
+        env.reset()
+        start = time.perf_counter()
+        for i in range(iterations):
+            env.step(i % env.action_space.n)
+        _report("CustomGameEnv.step", iterations, time.perf_counter() - start)
+    finally:
+        env.close()
+        server.stop()
+
+
+def handwritten_parse(raw_obs_data, obs, names):
+    """The hand-written parser CustomGameEnv used before OBSERVATION_SCHEMA (minus its logging)."""
+    obs["player_stats"][0] = float(raw_obs_data.get("player_current_health", 0))
+    obs["player_stats"][1] = float(raw_obs_data.get("player_max_health", 0))
+    obs["player_stats"][2] = float(raw_obs_data.get("player_current_prayer", 0))
+    obs["player_stats"][3] = float(raw_obs_data.get("player_max_prayer", 0))
+    obs["player_stats"][4] = float(raw_obs_data.get("player_run_energy_percentage", 0.0))
+    obs["player_animation"][0] = int(raw_obs_data.get("player_animation", -1))
+
+    player_loc_data = raw_obs_data.get("player_location", {})
+    if player_loc_data:
+        obs["player_location"][0] = float(player_loc_data.get("x", 0))
+        obs["player_location"][1] = float(player_loc_data.get("y", 0))
+        obs["player_location"][2] = float(player_loc_data.get("plane", 0))
+
+    nearby_npcs_data = raw_obs_data.get("nearby_npcs", [])
+    for i in range(min(len(nearby_npcs_data), len(obs["nearby_npcs_info"]))):
+        npc = nearby_npcs_data[i]
+        if isinstance(npc, dict):
+            obs["nearby_npcs_info"][i, 0] = float(npc.get("id", -1))
+            npc_loc = npc.get("location", {})
+            if isinstance(npc_loc, dict):
+                obs["nearby_npcs_info"][i, 1] = float(npc_loc.get("x", -1))
+                obs["nearby_npcs_info"][i, 2] = float(npc_loc.get("y", -1))
+            obs["nearby_npcs_info"][i, 3] = float(npc.get("animation", -1))
+            names["npc_names"][i] = npc.get("name", "Unknown")
+
+    inventory_data = raw_obs_data.get("inventory", [])
+    for i in range(min(len(inventory_data), len(obs["inventory_item_ids"]))):
+        item = inventory_data[i]
+        if isinstance(item, dict):
+            obs["inventory_item_ids"][i] = float(item.get("id", -1))
+            names["inventory_item_names"][i] = item.get("name", "Unknown")
+
+    ground_items_data = raw_obs_data.get("nearby_ground_items", [])
+    for i in range(min(len(ground_items_data), len(obs["nearby_ground_items_info"]))):
+        g_item = ground_items_data[i]
+        if isinstance(g_item, dict):
+            obs["nearby_ground_items_info"][i, 0] = float(g_item.get("id", -1))
+            obs["nearby_ground_items_info"][i, 1] = float(g_item.get("quantity", 0))
+            g_item_loc = g_item.get("location", {})
+            if isinstance(g_item_loc, dict):
+                obs["nearby_ground_items_info"][i, 2] = float(g_item_loc.get("x", -1))
+                obs["nearby_ground_items_info"][i, 3] = float(g_item_loc.get("y", -1))
+            names["ground_item_names"][i] = g_item.get("name", "Unknown")
+
+
+def benchmark_parser(iterations):
+    """Compare the hand-written observation parser against the one generated from OBSERVATION_SCHEMA.
+
+    The sample has more NPCs and ground items than the caps; "schema, nearest" is the default
+    schema keeping the ones nearest the player, "schema" keeps the first ones like the hand-written parser.
+    """
+    raw_obs = sample_observation()
+    obs, names = OBSERVATION_SCHEMA.empty()
+    print(f"Observation dict -> arrays ({iterations} iterations):")
+    for name, parse in (("hand-written", handwritten_parse),
+                        ("schema", make_observation_schema(nearest_entities=False).parse),
+                        ("schema, nearest", OBSERVATION_SCHEMA.parse)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            parse(raw_obs, obs, names)
+        _report(name, iterations, time.perf_counter() - start, unit="obs")
+
+
+def loop_nearest_goblin(npcs, player_x, player_y):
+    """The per-slot loop _handle_attack_npc used before entity_selection: (goblin row, squared distance)."""
+    best, min_dist_sq = None, float('inf')
+    for i in range(len(npcs)):
+        npc_id, npc_x, npc_y = npcs[i, 0], npcs[i, 1], npcs[i, 2]
+        if npc_id == GOBLIN_NPC_ID and npc_x != -1 and npc_y != -1:
+            dist_sq = (player_x - npc_x)**2 + (player_y - npc_y)**2
+            if dist_sq < min_dist_sq:
+                best, min_dist_sq = i, dist_sq
+    return best, min_dist_sq
+
+
+def loop_first_food(item_ids):
+    """The per-slot loop _handle_eat_food used before entity_selection."""
+    for i in range(len(item_ids)):
+        if item_ids[i] != -1 and int(item_ids[i]) in FOOD_ITEM_IDS:
+            return i
+    return None
+
+
+def sample_entities(count, rng):
+    """`count` NPC rows [id, x, y, animation] around (3200, 3200), a third of them goblins, and
+    `count` inventory ids with food near the end."""
+    npcs = np.empty((count, 4), dtype=np.float32)
+    npcs[:, 0] = np.where(rng.random(count) < 1 / 3, GOBLIN_NPC_ID, 3000)
+    npcs[:, 1:3] = 3200 + rng.integers(-50, 51, (count, 2))
+    npcs[:, 3] = -1
+    item_ids = np.full(count, 1511, dtype=np.float32)  # Logs
+    item_ids[-1] = FOOD_ITEM_IDS[0]
+    return npcs, item_ids
+
+
+def benchmark_targets(iterations):
+    """Target/item selection: the old per-slot loops against entity_selection, for 3 to 1000 entities."""
+    rng = np.random.default_rng(0)
+    player = np.array([3200, 3200, 0], dtype=np.float32)
+    for count in (3, 100, 1000):
+        npcs, item_ids = sample_entities(count, rng)
+        print(f"Target selection, {count} entities ({iterations} iterations):")
+        cases = (
+            ("nearest goblin: loop", lambda: loop_nearest_goblin(npcs, player[0], player[1])),
+            ("nearest goblin: vectorized", lambda: nearest_entity(npcs[:, 0], npcs[:, 1:3], player, GOBLIN_ID_TABLE)),
+            ("nearest goblin: grid build+query",
+             lambda: GridIndex(npcs[:, 1:3], mask=npcs[:, 0] == GOBLIN_NPC_ID).nearest(player[0], player[1])),
+            ("first food: loop", lambda: loop_first_food(item_ids)),
+            ("first food: vectorized", lambda: first_matching_item(item_ids, FOOD_ID_TABLE)),
+        )
+        for name, select in cases:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                select()
+            _report(name, iterations, time.perf_counter() - start, unit="call")
+
+        # One index answering many queries, e.g. nearest goblin to each of several points
+        index = GridIndex(npcs[:, 1:3], mask=npcs[:, 0] == GOBLIN_NPC_ID)
+        points = 3200 + rng.integers(-50, 51, (iterations, 2))
+        start = time.perf_counter()
+        for x, y in points:
+            index.nearest(x, y)
+        _report("grid nearest (prebuilt)", iterations, time.perf_counter() - start, unit="call")
+        start = time.perf_counter()
+        for x, y in points:
+            index.query_radius(x, y, 10)
+        _report("grid radius 10 (prebuilt)", iterations, time.perf_counter() - start, unit="call")
+
+
+def _vecenv_throughput(name, env, iterations):
+    try:
+        env.reset()
+        actions = [3] * env.num_envs  # NOOP
+        start = time.perf_counter()
+        for _ in range(iterations):
+            env.step(actions)
+        _report(name, iterations * env.num_envs, time.perf_counter() - start)
+    finally:
+        env.close()
+
+
+def benchmark_vecenv(iterations, max_envs=4, bridge_latency_ms=10):
+    """PolledVectorEnv and make_env() throughput with 1..max_envs bridges answering after bridge_latency_ms."""
+    servers = [MockZMQServer(port=VECENV_BASE_PORT + i) for i in range(max_envs)]
+    for server in servers:
+        server.response_delay = bridge_latency_ms / 1000.0
+        server.start()
+    try:
+        print(f"Vector env steps ({iterations} steps per env, {bridge_latency_ms} ms per bridge reply):")
+        num_envs = 1
+        while num_envs <= max_envs:
+            ports = [server.port for server in servers[:num_envs]]
+            _vecenv_throughput(f"PolledVectorEnv x{num_envs}", PolledVectorEnv(ports, copy=False), iterations)
+            try:
+                _vecenv_throughput(f"SubprocVecEnv x{num_envs}", make_env(ports, subprocess=True), iterations)
+            except ImportError as e:
+                print(f"  SubprocVecEnv x{num_envs}: {e}")
+            num_envs *= 2
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def benchmark_simulator(iterations, num_envs=256):
+    """Offline simulator throughput: SimulatedGameEnv, then SimulatedVectorEnv with num_envs."""
+    print(f"Simulator steps ({iterations} iterations):")
+    env = SimulatedGameEnv(seed=0, verbose=False)
+    try:
+        env.reset()
+        start = time.perf_counter()
+        for i in range(iterations):
+            env.step(i % env.action_space.n)
+        _report("SimulatedGameEnv", iterations, time.perf_counter() - start)
+    finally:
+        env.close()
+
+    envs = SimulatedVectorEnv(num_envs=num_envs, seed=0, copy=False)
+    envs.reset()
+    actions = np.random.default_rng(0).integers(0, envs.single_action_space.n, (iterations, num_envs))
+    start = time.perf_counter()
+    for batch in actions:
+        envs.step(batch)
+    _report(f"SimulatedVectorEnv x{num_envs}", iterations * num_envs, time.perf_counter() - start)
+
+
+def greedy_action(action_mask):
+    """Eat when it is valid, otherwise attack when that is, otherwise walk to the goblins."""
+    return 1 if action_mask[1] else 0 if action_mask[0] else 2
+
+
+def benchmark_repeat(iterations):
+    """Policy decisions and bridge requests per `iterations` simulated game ticks, with and without ActionRepeat."""
+    print(f"Action repeat ({iterations} game ticks, greedy policy):")
+    variants = [("every tick", None), ("repeat 4", {"repeat": 4}),
+                ("repeat 4, no interrupt", {"repeat": 4, "interrupt": None})]
+    for name, repeat in variants:
+        env = SimulatedGameEnv(seed=0, verbose=False)
+        bridge = env.client
+        requests = {"actions": 0, "observations": 0}
+        execute_action, get_observation = bridge.execute_action, bridge.get_observation
+        def counted(key, method):
+            def call(*args, **kwargs):
+                requests[key] += 1
+                return method(*args, **kwargs)
+            return call
+        bridge.execute_action = counted("actions", execute_action)
+        bridge.get_observation = counted("observations", get_observation)
+        if repeat is not None:
+            env = ActionRepeat(env, **repeat)
+        try:
+            _, info = env.reset(seed=0)
+            decisions, total_reward = 0, 0.0
+            start = time.perf_counter()
+            while bridge.sim.tick < iterations:
+                _, reward, _, _, info = env.step(greedy_action(info["action_mask"]))
+                decisions += 1
+                total_reward += reward
+            elapsed = time.perf_counter() - start
+        finally:
+            env.close()
+        print(f"  {name}: {decisions} decisions, {requests['actions']} actions and "
+              f"{requests['observations']} observations sent, reward {total_reward:.1f} "
+              f"({elapsed * 1000:.0f} ms)")
+
+
+BENCHMARKS = {
+    "step": benchmark_step,
+    "decode": benchmark_decode,
+    "delta": benchmark_delta,
+    "compression": benchmark_compression,
+    "parse": benchmark_parse,
+    "replay": benchmark_replay,
+    "parser": benchmark_parser,
+    "vecenv": benchmark_vecenv,
+    "simulator": benchmark_simulator,
+    "targets": benchmark_targets,
+    "repeat": benchmark_repeat,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIBridge Python agent benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--payloads", help="Bridge recording, or file of observation payloads with one JSON "
+                                           "document per line (used by the parse benchmark)")
+    parser.add_argument("--recording", help="Bridge recording to replay (used by the replay benchmark)")
+    parser.add_argument("--envs", type=int,
+                        help="Most bridges to step in parallel (vecenv, default 4), or simulated envs per batch "
+                             "(simulator, default 256)")
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    for name in names:
+        if name == "parse":
+            benchmark_parse(args.iterations, args.payloads)
+        elif name == "replay":
+            benchmark_replay(args.iterations, args.recording)
+        elif name == "vecenv":
+            benchmark_vecenv(args.iterations, args.envs or 4)
+        elif name == "simulator":
+            benchmark_simulator(args.iterations, args.envs or 256)
+        else:
+            BENCHMARKS[name](args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Record/replay of AIBridge traffic.
+
+ZMQClient(record_path=...) appends every request/reply pair it completes to a recording:
+    file    magic "MBR1", then one record per request
+    record  timestamp (f64, time.time() of the request), latency in ms (f32),
+            request length (u32) + request message,
+            frame count (u16), then per reply frame: length (u32) + bytes
+
+Frames are stored decompressed, so a recording can be replayed to clients with or without
+compression. ReplayServer serves a recording back over a REP socket, at the recorded
+latency or as fast as possible, so the agent can be benchmarked on real traffic without
+a game client:
+
+    python bridge_recording.py session.mbr --port 5555 --speed 0
+
+The gaps between requests were the client's own time, which a server cannot impose. By
+default a replay only reproduces each reply's latency, so a faster client runs ahead of
+the recorded session; with --timeline replies are also held until their recorded time
+from the start of the session, which reproduces its pacing (e.g. of game ticks) for any
+client that is not slower than the recorded one.
+"""
+
+import argparse
+import collections
+import json
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import List
+
+import zmq
+
+from payload_compression import is_compressed_frame, unwrap_frame
+
+RECORDING_MAGIC = b"MBR1"
+_RECORD_HEADER = struct.Struct("<dfI")
+_FRAME_COUNT = struct.Struct("<H")
+_FRAME_LENGTH = struct.Struct("<I")
+
+# Capabilities the replay server cannot honour (there is no publisher behind it)
+_UNREPLAYABLE_CAPABILITIES = ("observation_stream",)
+
+
+@dataclass(frozen=True)
+class RecordedExchange:
+    """One request and the reply the bridge sent for it."""
+    timestamp: float     # time.time() when the request was sent
+    latency_ms: float    # Time until the reply arrived
+    request: bytes       # Request message, e.g. b"command:get_observation"
+    frames: List[bytes]  # Reply frames, decompressed
+
+
+def command_key(request):
+    """The command part of a request ("command:step" for "command:step:{...}"), used to match replies."""
+    parts = request.split(b":", 2)
+    return b":".join(parts[:2])
+
+
+class TrafficRecorder:
+    """Appends request/reply pairs to a recording file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(RECORDING_MAGIC)
+        self._lock = threading.Lock()  # Async/dealer replies may be recorded from another thread
+        self.records = 0
+
+    def record(self, request, frames, timestamp, latency_ms):
+        """Write one exchange. `request` is the message (str or bytes), `frames` the reply frames,
+        already decompressed (bytes or buffers)."""
+        if isinstance(request, str):
+            request = request.encode('utf-8')
+        parts = [_RECORD_HEADER.pack(timestamp, latency_ms, len(request)), request, _FRAME_COUNT.pack(len(frames))]
+        for frame in frames:
+            parts.append(_FRAME_LENGTH.pack(len(frame)))
+            parts.append(frame)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(b"".join(parts))
+                self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path):
+    """Load every RecordedExchange from a recording file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(RECORDING_MAGIC)] != RECORDING_MAGIC:
+        raise ValueError(f"Not an AIBridge recording: {path}")
+    exchanges = []
+    offset = len(RECORDING_MAGIC)
+    try:
+        while offset < len(data):
+            timestamp, latency_ms, request_length = _RECORD_HEADER.unpack_from(data, offset)
+            offset += _RECORD_HEADER.size
+            request = data[offset:offset + request_length]
+            offset += request_length
+            frame_count, = _FRAME_COUNT.unpack_from(data, offset)
+            offset += _FRAME_COUNT.size
+            frames = []
+            for _ in range(frame_count):
+                frame_length, = _FRAME_LENGTH.unpack_from(data, offset)
+                offset += _FRAME_LENGTH.size
+                frames.append(data[offset:offset + frame_length])
+                offset += frame_length
+            exchanges.append(RecordedExchange(timestamp, latency_ms, request, frames))
+    except struct.error:
+        pass  # Truncated last record (recording process was killed); keep the complete ones
+    return exchanges
+
+
+def recorded_observations(path):
+    """The JSON observation payloads of a recording (get_observation replies), for parse benchmarks."""
+    return [exchange.frames[0] for exchange in read_recording(path)
+            if exchange.request == b"command:get_observation" and exchange.frames
+            and exchange.frames[0].startswith(b"{")]
+
+
+class ReplayServer:
+    """Serves a recording back to clients over ZMQ REP.
+
+    Requests are matched to recorded replies by command (see command_key()): the n-th
+    "command:step" request gets the n-th recorded step reply, whatever its parameters.
+    When a command's replies run out they start over. `speed` 1.0 reproduces the recorded
+    latency, 2.0 halves it, and None (or 0) replies as fast as possible. With `timeline`
+    (and a speed) a reply is also held until its recorded time since the start of the
+    session, counted from the first request served.
+    """
+
+    def __init__(self, path, port=5555, speed=None, timeline=False):
+        self.path = path
+        self.port = port
+        self.speed = speed
+        self.timeline = timeline
+        self._replies = collections.defaultdict(list)
+        exchanges = read_recording(path)
+        for exchange in exchanges:
+            self._replies[command_key(exchange.request)].append(exchange)
+        self._recording_start = min((e.timestamp for e in exchanges), default=0.0)
+        self._timeline_origin = None  # perf_counter() the recording's start maps to
+        self._positions = collections.Counter()
+        self.requests_served = 0
+        self.unmatched_requests = 0
+        self.running = False
+        self.thread = None
+
+    def _next_exchange(self, request):
+        key = command_key(request)
+        exchanges = self._replies.get(key)
+        if not exchanges:
+            return None
+        exchange = exchanges[self._positions[key] % len(exchanges)]
+        self._positions[key] += 1
+        return exchange
+
+    def _reply_frames(self, request, exchange):
+        if exchange is None:
+            self.unmatched_requests += 1
+            message = f"Command not in recording: {command_key(request).decode('utf-8', errors='replace')}"
+            return [json.dumps({"status": "error", "message": message}).encode('utf-8')]
+        if command_key(request) == b"command:get_capabilities":
+            reply = json.loads(exchange.frames[0])
+            if isinstance(reply.get("capabilities"), list):
+                reply["capabilities"] = [c for c in reply["capabilities"] if c not in _UNREPLAYABLE_CAPABILITIES]
+            return [json.dumps(reply).encode('utf-8')]
+        return exchange.frames
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, name="ReplayServer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=3)
+            self.thread = None
+
+    def _serve(self):
+        context = zmq.Context()
+        socket = context.socket(zmq.REP)
+        try:
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.setsockopt(zmq.RCVTIMEO, 100)  # Short timeout so stop() is quick
+            socket.bind(f"tcp://*:{self.port}")
+            while self.running:
+                try:
+                    request = socket.recv()
+                except zmq.Again:
+                    continue
+                received_at = time.perf_counter()
+                if is_compressed_frame(request):
+                    request = unwrap_frame(request)[0]  # Replies go back uncompressed
+                exchange = self._next_exchange(request)
+                frames = self._reply_frames(request, exchange)
+                if self.speed and exchange is not None:
+                    delay = exchange.latency_ms / 1000.0 / self.speed - (time.perf_counter() - received_at)
+                    if self.timeline:
+                        offset = (exchange.timestamp - self._recording_start) / self.speed
+                        if self._timeline_origin is None:
+                            self._timeline_origin = received_at - offset
+                        due = self._timeline_origin + offset + exchange.latency_ms / 1000.0 / self.speed
+                        delay = max(delay, due - time.perf_counter())
+                    if delay > 0:
+                        time.sleep(delay)
+                socket.send_multipart(frames)
+                self.requests_served += 1
+        finally:
+            socket.close()
+            context.term()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded AIBridge session over ZMQ")
+    parser.add_argument("recording")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--speed", type=float, default=0,
+                        help="1.0 replays at the recorded latency, 0 (default) as fast as possible")
+    parser.add_argument("--timeline", action="store_true",
+                        help="Also hold replies until their recorded time since the session start")
+    args = parser.parse_args()
+
+    server = ReplayServer(args.recording, port=args.port, speed=args.speed, timeline=args.timeline)
+    print(f"Replaying {args.recording} on tcp://*:{args.port} "
+          f"({sum(len(e) for e in server._replies.values())} recorded requests)")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Served {server.requests_served} requests ({server.unmatched_requests} not in the recording)")
+
+
+if __name__ == '__main__':
+    main()
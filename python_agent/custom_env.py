@@ -3,36 +3,133 @@ from gymnasium import spaces
 import numpy as np
 import json
 import time # Keep if used in __main__
-
-from zmq_client import ZMQClient
+import functools
+from dataclasses import asdict
+
+from zmq_client import ZMQClient, GAME_TICK_MS
+from async_zmq_client import AsyncZMQClient
+from observation_codec import decode_observation_into
+from observation_schema import ObservationSchema, ScalarArray, EntityArray, Field
+from entity_selection import id_table, nearest_entity, first_matching_item
 from monitoring import get_metrics_collector, record_error
+import step_trace
+from step_trace import StepTrace, DEFAULT_TRACE_CAPACITY, ACTION_STATUS_CODES
 
+# Default entity caps (observation slots); CustomGameEnv(max_npcs=..., ...) overrides them per env
 MAX_NEARBY_NPCS = 3
 MAX_INVENTORY_ITEMS = 5
 MAX_GROUND_ITEMS = 5 # New constant
+INVENTORY_SIZE = 28 # Slots in a full inventory, e.g. CustomGameEnv(max_inventory_items=INVENTORY_SIZE)
 BONE_ITEM_ID = 526 # Example ID for Bones
 
 # --- Task-Specific Constants for Simple Combat Agent ---
 GOBLIN_NPC_ID = 125  # Example ID for a common Goblin
 FOOD_ITEM_IDS = [315, 2140, 2309]  # Cooked Shrimp, Cooked Chicken, Bread
 EAT_HEALTH_THRESHOLD_PERCENTAGE = 0.6 # Eat if health is <= 60% of max health
+# Id tables for the vectorized handlers (entity_selection)
+GOBLIN_ID_TABLE = id_table([GOBLIN_NPC_ID])
+FOOD_ID_TABLE = id_table(FOOD_ITEM_IDS)
 # Example waypoints near Lumbridge Goblins (east of river, south of castle)
 GOBLIN_AREA_WAYPOINTS = [
     (3248, 3237, 0), # Approximate
     (3252, 3230, 0), # Approximate
     (3245, 3224, 0)  # Approximate
 ]
+# Macro actions (CustomGameEnv(macro_actions=True)) are appended after the primitive actions.
+# Each one runs the primitive handlers on the same observation and dispatches the resulting
+# game actions in a single bridge message; primitives whose handler declines are skipped.
+NUM_PRIMITIVE_ACTIONS = 4
+# action_taken reported to the reward and metrics for each primitive action
+PRIMITIVE_ACTION_NAMES = ("attack_npc", "eat_food", "move_to_waypoint", "noop")
+MACRO_ACTIONS = [
+    ("eat_then_attack", (1, 0)),  # Eat if health is low, then (re-)attack the nearest goblin
+    ("eat_then_move", (1, 2)),    # Eat if health is low, then walk to the next goblin waypoint
+]
 # --- End Task-Specific Constants ---
 
+@functools.lru_cache(maxsize=None)
+def make_observation_schema(max_npcs=MAX_NEARBY_NPCS, max_inventory_items=MAX_INVENTORY_ITEMS,
+                            max_ground_items=MAX_GROUND_ITEMS, nearest_entities=True):
+    """How a JSON observation fills each array of the observation space (see observation_schema).
+
+    With nearest_entities, NPCs and ground items beyond the caps are the ones nearest the
+    player. Compiled once per set of arguments and shared by every env using them.
+    """
+    nearest_to = "player_location" if nearest_entities else None
+    return ObservationSchema([
+        ScalarArray("player_stats", (Field(("player_current_health",)), Field(("player_max_health",)),
+                                     Field(("player_current_prayer",)), Field(("player_max_prayer",)),
+                                     Field(("player_run_energy_percentage",)))),
+        ScalarArray("player_location", (Field(("player_location", "x")), Field(("player_location", "y")),
+                                        Field(("player_location", "plane")))),
+        EntityArray("nearby_npcs_info", "nearby_npcs", max_npcs,
+                    (Field(("id",), -1), Field(("location", "x"), -1), Field(("location", "y"), -1),
+                     Field(("animation",), -1)), names="npc_names", nearest_to=nearest_to),
+        EntityArray("inventory_item_ids", "inventory", max_inventory_items,
+                    (Field(("id",), -1),), names="inventory_item_names"),
+        EntityArray("nearby_ground_items_info", "nearby_ground_items", max_ground_items,
+                    (Field(("id",), -1), Field(("quantity",), 0), Field(("location", "x"), -1),
+                     Field(("location", "y"), -1)), names="ground_item_names", nearest_to=nearest_to),
+        ScalarArray("player_animation", (Field(("player_animation",), -1),), dtype=np.int32, fill=-1),
+    ])
+
+
+OBSERVATION_SCHEMA = make_observation_schema()  # Default caps
+
 # Define known combat animations (example IDs, replace with actual ones)
 PLAYER_COMBAT_ANIMATION_IDS = [422, 423, 390, 393, 386, 80, 819, 1658] # Common melee/ranged/magic attack animations
 
+def make_observation_space(max_npcs=MAX_NEARBY_NPCS, max_inventory_items=MAX_INVENTORY_ITEMS,
+                           max_ground_items=MAX_GROUND_ITEMS):
+    """The observation space shared by CustomGameEnv and the simulator (see simulator.py)."""
+    return spaces.Dict({ 
+        "player_stats": spaces.Box(low=0, high=np.array([200, 200, 200, 200, 1.0]), dtype=np.float32), # cur_hp,max_hp,cur_pray,max_pray,run_energy
+        "player_location": spaces.Box(low=-np.inf, high=np.inf, shape=(3,), dtype=np.float32), # x,y,plane
+        "nearby_npcs_info": spaces.Box(low=-1, high=np.inf, shape=(max_npcs, 4), dtype=np.float32), # id,x,y,anim
+        "inventory_item_ids": spaces.Box(low=-1, high=np.inf, shape=(max_inventory_items,), dtype=np.float32), # id
+        "nearby_ground_items_info": spaces.Box(low=-1, high=np.inf, shape=(max_ground_items, 4), dtype=np.float32),#id,q,x,y
+        "player_animation": spaces.Box(low=-1, high=np.inf, shape=(1,), dtype=np.int32) # New player animation ID
+    })
+
+
+def copy_observation(obs):
+    """Copy an observation so it outlives the env's reused buffers (see reuse_observation_buffers)."""
+    return {key: value.copy() for key, value in obs.items()}
+
+
 class CustomGameEnv(gym.Env):
+    """Gymnasium env for the combat task, talking to the AIBridge plugin.
+
+    With reuse_observation_buffers=True the env fills two preallocated observation buffers
+    in turn instead of allocating arrays on every step. The observation returned by step()
+    or reset() (and the name lists in its info) stays valid until the step after next, which
+    covers last_observation; pass it to copy_observation() to keep it for longer.
+    """
     metadata = {'render_modes': ['human', 'rgb_array'], 'render_fps': 4}
 
-    def __init__(self, render_mode=None):
+    def __init__(self, render_mode=None, binary_observations=True, client=None, pool=None, macro_actions=False,
+                 observation_cache_ms=None, ticks_per_step=None, reuse_observation_buffers=False,
+                 host="localhost", port=5555, verbose=True, trace_capacity=DEFAULT_TRACE_CAPACITY,
+                 max_npcs=MAX_NEARBY_NPCS, max_inventory_items=MAX_INVENTORY_ITEMS, max_ground_items=MAX_GROUND_ITEMS,
+                 nearest_entities=True, skip_invalid_actions=False):
         super().__init__()
-        self.client = ZMQClient()
+        # Action decisions, reward components and errors go to a ring buffer (see step_trace);
+        # verbose=False stops printing them, so stepping does no console I/O at all
+        self.trace = StepTrace(trace_capacity, verbose=verbose)
+        # With a ZMQClientPool the env leases a client and hands it back on close()
+        self.pool = pool
+        if client is None:
+            # observation_cache_ms lets the env's own client reuse an observation (off by default:
+            # the cache ignores game ticks, and every step must observe the game after its action)
+            client = pool.acquire() if pool is not None else ZMQClient(
+                host=host, port=port, observation_cache_ms=observation_cache_ms, verbose=verbose, trace=self.trace)
+        self.client = client
+        # Use the binary observation wire format when the bridge advertises it (JSON otherwise)
+        self.binary_observations = binary_observations
+        # Tick-synchronized stepping: each step() observes the game exactly ticks_per_step ticks
+        # after the previous one (bridges with "tick_sync"); None steps as fast as replies come back
+        self.ticks_per_step = ticks_per_step
+        self._next_step_tick = None
         
         # Initialize monitoring
         self.metrics = get_metrics_collector()
@@ -41,20 +138,26 @@ class CustomGameEnv(gym.Env):
         self.episode_start_time = time.time()
         self.cumulative_reward = 0.0
 
-        # Action Space: 0:ATTACK_NPC, 1:EAT_FOOD, 2:MOVE_TO_GOBLIN_AREA, 3:NOOP
-        self.action_space = spaces.Discrete(4) 
-
-        self.observation_space = spaces.Dict({ 
-            "player_stats": spaces.Box(low=0, high=np.array([200, 200, 200, 200, 1.0]), dtype=np.float32), # cur_hp,max_hp,cur_pray,max_pray,run_energy
-            "player_location": spaces.Box(low=-np.inf, high=np.inf, shape=(3,), dtype=np.float32), # x,y,plane
-            "nearby_npcs_info": spaces.Box(low=-1, high=np.inf, shape=(MAX_NEARBY_NPCS, 4), dtype=np.float32), # id,x,y,anim
-            "inventory_item_ids": spaces.Box(low=-1, high=np.inf, shape=(MAX_INVENTORY_ITEMS,), dtype=np.float32), # id
-            "nearby_ground_items_info": spaces.Box(low=-1, high=np.inf, shape=(MAX_GROUND_ITEMS, 4), dtype=np.float32),#id,q,x,y
-            "player_animation": spaces.Box(low=-1, high=np.inf, shape=(1,), dtype=np.int32) # New player animation ID
-        })
+        # Action Space: 0:ATTACK_NPC, 1:EAT_FOOD, 2:MOVE_TO_GOBLIN_AREA, 3:NOOP, then any MACRO_ACTIONS
+        # With skip_invalid_actions, actions action_masks() rules out never reach the bridge
+        self.skip_invalid_actions = skip_invalid_actions
+        self._warned_untimed_hold = False
+        self.macro_actions = MACRO_ACTIONS if macro_actions else []
+        self.action_space = spaces.Discrete(NUM_PRIMITIVE_ACTIONS + len(self.macro_actions))
+
+        # Entity caps; over a cap, NPCs and ground items nearest the player fill the slots
+        # (nearest_entities) rather than the first ones the bridge lists
+        self.nearest_entities = nearest_entities
+        self.observation_space = make_observation_space(max_npcs, max_inventory_items, max_ground_items)
+        self.observation_schema = make_observation_schema(max_npcs, max_inventory_items, max_ground_items,
+                                                          nearest_entities)
+        self.observation_schema.validate(self.observation_space)
         
         self._current_game_info = {} 
         self.last_observation = None 
+        # Two (obs, names) buffers filled in turn; the one holding last_observation is never reused
+        self._observation_buffers = ([self.observation_schema.empty(), self.observation_schema.empty()]
+                                     if reuse_observation_buffers else None)
         
         self.current_target_npc_id = None 
         self.waypoint_index = 0
@@ -64,121 +167,101 @@ class CustomGameEnv(gym.Env):
         self.render_mode = render_mode
 
 
-    def _get_obs(self):
-        # Track observation timing for monitoring
-        obs_start_time = time.time()
-        
-        try:
-            raw_obs_data = self.client.get_observation()
-            
-            # Record observation latency
-            obs_latency_ms = (time.time() - obs_start_time) * 1000
-            self.metrics.record_observation_time(obs_latency_ms)
-            
-        except Exception as e:
-            record_error("OBSERVATION_ERROR", f"Failed to get observation: {str(e)}")
-            raw_obs_data = {"status": "error", "message": str(e)}
+    def _get_obs(self, raw_obs_data=None, refresh=False, into=None):
+        # raw_obs_data may already have been fetched (e.g. by a combined step round trip)
+        # `into` is an (obs, names) pair to fill in place, e.g. a row of a vector env's batch
+        if raw_obs_data is None:
+            # Latency is recorded (per phase) by the client itself; refresh bypasses its cache
+            try:
+                if self._use_binary_observations():
+                    raw_obs_data = self.client.get_observation_binary(refresh=refresh)
+                else:
+                    raw_obs_data = self.client.get_observation(refresh=refresh)
+            except Exception as e:
+                record_error("OBSERVATION_ERROR", f"Failed to get observation: {str(e)}")
+                raw_obs_data = {"status": "error", "message": str(e)}
         
-        obs = {
-            "player_stats": np.zeros(self.observation_space["player_stats"].shape, dtype=np.float32),
-            "player_location": np.full(self.observation_space["player_location"].shape, 0.0, dtype=np.float32),
-            "nearby_npcs_info": np.full(self.observation_space["nearby_npcs_info"].shape, -1.0, dtype=np.float32),
-            "inventory_item_ids": np.full(self.observation_space["inventory_item_ids"].shape, -1.0, dtype=np.float32),
-            "nearby_ground_items_info": np.full(self.observation_space["nearby_ground_items_info"].shape, -1.0, dtype=np.float32),
-            "player_animation": np.full(self.observation_space["player_animation"].shape, -1, dtype=np.int32) # New
-        }
+        if into is None:
+            obs, names = self._new_observation()
+        else:
+            obs, names = into
+            self.observation_schema.clear(obs, names)
         # Initialize parts of the info dictionary that will be populated here
-        self._current_game_info = {
-            "raw_observation": raw_obs_data, # Store raw for debugging
-            "npc_names": [""] * MAX_NEARBY_NPCS,
-            "inventory_item_names": [""] * MAX_INVENTORY_ITEMS,
-            "ground_item_names": [""] * MAX_GROUND_ITEMS
-        }
+        self._current_game_info = {"raw_observation": raw_obs_data, **names} # Store raw for debugging
+
+        if isinstance(raw_obs_data, (bytes, bytearray, memoryview)):
+            # Binary wire format: fixed-width records straight into the arrays (no names)
+            try:
+                decode_observation_into(raw_obs_data, obs, nearest=self.nearest_entities)
+            except ValueError as e:
+                self.trace.record(step_trace.EVENT_OBSERVATION_DECODE_ERROR,
+                                  message=f"Warning: Failed to decode binary observation: {e}. Using default observation.")
+                record_error("OBSERVATION_PARSE_ERROR", str(e))
+            return obs
 
         if not raw_obs_data or raw_obs_data.get("status") == "error":
             error_msg = "Unknown error or no data received"
             if raw_obs_data and 'message' in raw_obs_data:
                 error_msg = raw_obs_data['message']
-            print(f"Warning: Error or no data in received observation: {error_msg}. Using default observation.")
+            self.trace.record(step_trace.EVENT_OBSERVATION_ERROR_REPLY,
+                              message=f"Warning: Error or no data in received observation: {error_msg}. Using default observation.")
             record_error("OBSERVATION_PARSE_ERROR", error_msg)
             # self._current_game_info will still contain the raw_obs_data if it exists
             return obs # Return the default initialized obs
 
         try:
-            # Player Stats
-            obs["player_stats"][0] = float(raw_obs_data.get("player_current_health", 0))
-            obs["player_stats"][1] = float(raw_obs_data.get("player_max_health", 0))
-            obs["player_stats"][2] = float(raw_obs_data.get("player_current_prayer", 0))
-            obs["player_stats"][3] = float(raw_obs_data.get("player_max_prayer", 0))
-            obs["player_stats"][4] = float(raw_obs_data.get("player_run_energy_percentage", 0.0))
-            obs["player_animation"][0] = int(raw_obs_data.get("player_animation", -1)) # New
-
-            # Player Location
-            player_loc_data = raw_obs_data.get("player_location", {}) # Default to empty dict if null
-            if player_loc_data: # Check if player_loc_data is not None and not empty
-                obs["player_location"][0] = float(player_loc_data.get("x", 0))
-                obs["player_location"][1] = float(player_loc_data.get("y", 0))
-                obs["player_location"][2] = float(player_loc_data.get("plane", 0))
-            else: # Fill with default if player_location was null or empty
-                obs["player_location"][:] = 0.0
-
-            # Nearby NPCs - now includes animation ID
-            nearby_npcs_data = raw_obs_data.get("nearby_npcs", [])
-            for i in range(min(len(nearby_npcs_data), MAX_NEARBY_NPCS)):
-                npc = nearby_npcs_data[i]
-                if isinstance(npc, dict):
-                    obs["nearby_npcs_info"][i, 0] = float(npc.get("id", -1))
-                    npc_loc = npc.get("location", {})
-                    if isinstance(npc_loc, dict):
-                        obs["nearby_npcs_info"][i, 1] = float(npc_loc.get("x", -1))
-                        obs["nearby_npcs_info"][i, 2] = float(npc_loc.get("y", -1))
-                    obs["nearby_npcs_info"][i, 3] = float(npc.get("animation", -1)) # New: animation ID
-                    self._current_game_info["npc_names"][i] = npc.get("name", "Unknown")
-                else:
-                    print(f"Warning: NPC data at index {i} is not a dictionary: {npc}")
-                    record_error("OBSERVATION_FORMAT_ERROR", f"Invalid NPC data at index {i}")
-            
-            # Inventory Items - now includes names in info
-            inventory_data = raw_obs_data.get("inventory", [])
-            for i in range(min(len(inventory_data), MAX_INVENTORY_ITEMS)):
-                item = inventory_data[i]
-                if isinstance(item, dict):
-                    obs["inventory_item_ids"][i] = float(item.get("id", -1))
-                    self._current_game_info["inventory_item_names"][i] = item.get("name", "Unknown")
-                else:
-                    print(f"Warning: Inventory item data at index {i} is not a dictionary: {item}")
-                    record_error("OBSERVATION_FORMAT_ERROR", f"Invalid inventory data at index {i}")
-
-            # Nearby Ground Items - now includes names in info
-            ground_items_data = raw_obs_data.get("nearby_ground_items", [])
-            for i in range(min(len(ground_items_data), MAX_GROUND_ITEMS)):
-                g_item = ground_items_data[i]
-                if isinstance(g_item, dict):
-                    obs["nearby_ground_items_info"][i, 0] = float(g_item.get("id", -1))
-                    obs["nearby_ground_items_info"][i, 1] = float(g_item.get("quantity", 0))
-                    g_item_loc = g_item.get("location", {})
-                    if isinstance(g_item_loc, dict):
-                        obs["nearby_ground_items_info"][i, 2] = float(g_item_loc.get("x", -1))
-                        obs["nearby_ground_items_info"][i, 3] = float(g_item_loc.get("y", -1))
-                    self._current_game_info["ground_item_names"][i] = g_item.get("name", "Unknown")
-                else:
-                    print(f"Warning: Ground item data at index {i} is not a dictionary: {g_item}")
-                    record_error("OBSERVATION_FORMAT_ERROR", f"Invalid ground item data at index {i}")
-        
+            malformed = self.observation_schema.parse(raw_obs_data, obs, self._current_game_info)
+            if malformed:
+                # One report per observation, however many entities were bad
+                record_error("OBSERVATION_FORMAT_ERROR", f"{malformed} malformed entities in observation")
         except (TypeError, ValueError) as e:
             error_msg = f"Type or value error while processing observation data: {e}"
-            print(f"Warning: {error_msg}. Raw data: {raw_obs_data}. Using partially processed/default observation.")
+            self.trace.record(step_trace.EVENT_OBSERVATION_PARSE_ERROR,
+                              message=f"Warning: {error_msg}. Raw data: {raw_obs_data}. Using partially processed/default observation.")
             record_error("OBSERVATION_PARSE_ERROR", error_msg, {"raw_data": str(raw_obs_data)})
             # Ensure player_animation also has a default if error occurs mid-parse
             obs["player_animation"][0] = -1
         except Exception as e:
             error_msg = f"Unexpected error while processing observation data: {e}"
-            print(f"Warning: {error_msg}. Raw data: {raw_obs_data}. Using partially processed/default observation.")
+            self.trace.record(step_trace.EVENT_OBSERVATION_UNEXPECTED_ERROR,
+                              message=f"Warning: {error_msg}. Raw data: {raw_obs_data}. Using partially processed/default observation.")
             record_error("OBSERVATION_UNEXPECTED_ERROR", error_msg, {"raw_data": str(raw_obs_data)})
             obs["player_animation"][0] = -1
             
         return obs
 
+    def _new_observation(self):
+        """Padded arrays and name lists to fill: fresh ones, or the buffer last_observation is not in."""
+        if self._observation_buffers is None:
+            return self.observation_schema.empty()
+        obs, names = self._observation_buffers[0]
+        if obs is self.last_observation:
+            obs, names = self._observation_buffers[1]
+        self.observation_schema.clear(obs, names)
+        return obs, names
+
+    def _use_binary_observations(self):
+        return self.binary_observations and self.client.supports("binary_observation")
+
+    def _tick_synced(self):
+        return self.ticks_per_step is not None and self.client.supports("tick_sync")
+
+    def _wait_for_step_tick(self):
+        """Observation of the tick this step is due on; schedules the next step ticks_per_step later."""
+        try:
+            raw_obs_data = self.client.wait_for_tick(self._next_step_tick,
+                                                     binary_observation=self._use_binary_observations())
+        except Exception as e:
+            record_error("OBSERVATION_ERROR", f"Failed to wait for game tick: {str(e)}")
+            raw_obs_data = {"status": "error", "message": str(e)}
+        self._schedule_next_step_tick()
+        return raw_obs_data
+
+    def _schedule_next_step_tick(self):
+        # A late step observes the current tick and the schedule restarts from there
+        last_tick = self.client.last_tick
+        self._next_step_tick = last_tick + self.ticks_per_step if last_tick is not None else None
+
     def _get_info(self):
         # self._current_game_info is populated by _get_obs()
         # It contains raw_observation and parsed names.
@@ -194,20 +277,30 @@ class CustomGameEnv(gym.Env):
             self.player_is_in_combat_animation = False
 
     def reset(self, seed=None, options=None):
+        self._begin_episode(seed)
+        if self._tick_synced():
+            # Start the episode on a tick boundary
+            self._next_step_tick = None
+            return self._complete_reset(self._get_obs(self._wait_for_step_tick()))
+        # Get initial observation; a new episode never starts from a cached one
+        return self._complete_reset(self._get_obs(refresh=True))
+
+    def _begin_episode(self, seed=None):
         super().reset(seed=seed)
-        print("Environment reset.")
         
         # Update episode tracking
         self.current_episode += 1
         self.current_step = 0
+        self.trace.begin_step(self.current_episode, 0, -1)
+        self.trace.record(step_trace.EVENT_RESET)
         self.episode_start_time = time.time()
         self.cumulative_reward = 0.0
-        
-        # Get initial observation
-        initial_observation = self._get_obs() 
+
+    def _complete_reset(self, initial_observation):
         self._update_combat_state_from_obs(initial_observation) # Call the new method
         self.last_observation = initial_observation
         info = self._get_info() 
+        info["action_mask"] = self.action_masks()
         
         # Record frame timing
         frame_time_ms = (time.time() - self.episode_start_time) * 1000
@@ -217,52 +310,289 @@ class CustomGameEnv(gym.Env):
 
     def step(self, action):
         step_start_time = time.time()
-        action_start_time = time.time()
-        
-        base_action_cost = -0.1 # Default cost for taking a step
+        self.trace.begin_step(self.current_episode, self.current_step + 1, action)
+        tick_synced = self._tick_synced()
+        if self._is_macro_action(action):
+            actions, action_specific_reward_info = self._select_macro_action(action)
+            if self._skips(action, actions):
+                return self._complete_skipped_step(action_specific_reward_info, step_start_time)
+            action_status, raw_obs_data = self._execute_action_batch(actions, combined=not tick_synced)
+        else:
+            action_type, parameters, action_specific_reward_info = self._select_action(action)
+            if self._skips(action, action_type):
+                return self._complete_skipped_step(action_specific_reward_info, step_start_time)
+            # In tick-synced mode the observation comes from the tick wait, not the step reply
+            action_status, raw_obs_data = self._execute_action(action_type, parameters, combined=not tick_synced)
+        if tick_synced:
+            raw_obs_data = self._wait_for_step_tick()
+        # A declined action sent nothing that would have invalidated a cached observation
+        current_obs = self._get_obs(raw_obs_data, refresh=True)
+        return self._complete_step(current_obs, action_status, action_specific_reward_info, step_start_time)
+
+    def hold(self, action, ticks=1):
+        """Step without sending anything: observe the game `ticks` ticks later while `action` plays out.
+
+        Attacks and walks carry on in the game by themselves, so holding the last action only
+        costs an observation request (none with an observation stream). Returns a step()
+        tuple with action status "held"; the reward is the step cost for each of the `ticks`
+        (as if it had been stepped once per tick) plus any death penalty. The ticks are waited
+        for with the client's wait_for_tick(); only when neither a "tick_sync" bridge nor an
+        observation stream can report ticks are they slept out (with a warning, once).
+        """
+        step_start_time = time.time()
+        self.trace.begin_step(self.current_episode, self.current_step + 1, action)
+        self.trace.record(step_trace.EVENT_HOLD, ticks)
+        current_obs = self._get_obs(self._wait_ticks(ticks), refresh=True)
+        return self._complete_step(current_obs, {"status": "held"}, self._held_reward_info(action), step_start_time,
+                                   ticks=ticks)
+
+    def _held_reward_info(self, action):
+        """action_specific_reward_info for holding `action`, with the action_taken _select_action() gives it."""
+        if self._is_macro_action(action):
+            return {"action_taken": self.macro_actions[action - NUM_PRIMITIVE_ACTIONS][0]}
+        if 0 <= action < NUM_PRIMITIVE_ACTIONS:
+            return {"action_taken": PRIMITIVE_ACTION_NAMES[action]}
+        return {}
+
+    def _wait_ticks(self, ticks):
+        """Raw observation `ticks` game ticks after the last one seen (None: fetch one after sleeping).
+
+        wait_for_tick() reads the tick from the observation stream when the client has one,
+        and otherwise has a "tick_sync" bridge hold the request until the tick.
+        """
+        if not self.client.supports("tick_sync") and self.client.stream_port is None:
+            if not self._warned_untimed_hold:
+                self._warned_untimed_hold = True
+                self.metrics.record_warning("HOLD_WITHOUT_TICK_SYNC", "Bridge can't report game ticks; "
+                                            "holds sleep instead, so their observations aren't tick-aligned")
+            time.sleep(ticks * GAME_TICK_MS / 1000.0)
+            return None
+        binary_observation = self._use_binary_observations()
+        last_tick = self.client.last_tick
+        try:
+            if last_tick is None:
+                # No tick seen yet: the next one tells where the game is and is the first held tick
+                raw_obs_data = self.client.wait_for_tick(None, binary_observation=binary_observation)
+                last_tick, ticks = self.client.last_tick, ticks - 1
+            if ticks > 0 and last_tick is not None:
+                raw_obs_data = self.client.wait_for_tick(last_tick + ticks, binary_observation=binary_observation)
+        except Exception as e:
+            record_error("OBSERVATION_ERROR", f"Failed to wait for game tick: {str(e)}")
+            raw_obs_data = {"status": "error", "message": str(e)}
+        if self._tick_synced():
+            self._schedule_next_step_tick()
+        return raw_obs_data
+
+    def _select_action(self, action):
+        """Map a discrete action to (action_type, parameters, action_specific_reward_info)."""
         action_type = None
         parameters = {}
         action_specific_reward_info = {} # To pass data to reward function
-        action_success = False
 
         # --- Action Selection and Parameter Generation ---
         if action == 0: # ATTACK_NPC
             action_type, parameters, action_specific_reward_info = self._handle_attack_npc(self.last_observation)
+            action_specific_reward_info["action_taken"] = PRIMITIVE_ACTION_NAMES[0]
         elif action == 1: # EAT_FOOD
             action_type, parameters, action_specific_reward_info = self._handle_eat_food(self.last_observation)
+            action_specific_reward_info["action_taken"] = PRIMITIVE_ACTION_NAMES[1]
         elif action == 2: # MOVE_TO_GOBLIN_AREA
             action_type = "walk_to" # This one is simpler, can define params directly or use a helper
             selected_waypoint = GOBLIN_AREA_WAYPOINTS[self.waypoint_index % len(GOBLIN_AREA_WAYPOINTS)]
             parameters = {"x": selected_waypoint[0], "y": selected_waypoint[1], "plane": selected_waypoint[2]}
             self.waypoint_index += 1
-            action_specific_reward_info = {"action_taken": "move_to_waypoint"}
-            print(f"Env Action: Move to waypoint {selected_waypoint}")
+            action_specific_reward_info = {"action_taken": PRIMITIVE_ACTION_NAMES[2]}
+            self.trace.record(step_trace.EVENT_MOVE, selected_waypoint[0], selected_waypoint[1])
         elif action == 3: # NOOP
             action_type = None # No action sent to game
-            action_specific_reward_info = {"action_taken": "noop"}
-            print(f"Env Action: NOOP")
+            action_specific_reward_info = {"action_taken": PRIMITIVE_ACTION_NAMES[3]}
+            self.trace.record(step_trace.EVENT_NOOP)
         else:
-            print(f"Unknown action discrete value: {action}")
+            self.trace.record(step_trace.EVENT_UNKNOWN_ACTION, action)
             record_error("INVALID_ACTION", f"Unknown action value: {action}")
+        return action_type, parameters, action_specific_reward_info
+
+    def _skips(self, action, game_actions):
+        """Whether step() ends here: skip_invalid_actions is on and the handlers sent nothing for a non-NOOP action."""
+        return (self.skip_invalid_actions and not game_actions and action != 3
+                and self.last_observation is not None)
+
+    def _complete_skipped_step(self, action_specific_reward_info, step_start_time, into=None):
+        """Finish a step whose action was invalid without contacting the bridge.
+
+        Nothing happened in the game, so the observation is last_observation again (copied
+        into `into` when given); the reward is the one a declined action gets from the bridge.
+        """
+        current_obs = self.last_observation
+        info = dict(self._current_game_info)  # The previous step's info stays as it was
+        if into is not None:
+            obs, names = into
+            for key, value in current_obs.items():
+                obs[key][...] = value
+            for key, name_list in names.items():
+                name_list[:] = info.get(key, name_list)
+                info[key] = name_list
+            current_obs = obs
+        self._current_game_info = info
+        return self._complete_step(current_obs, {"status": "skipped"}, action_specific_reward_info, step_start_time)
+
+    def _is_macro_action(self, action):
+        return NUM_PRIMITIVE_ACTIONS <= action < NUM_PRIMITIVE_ACTIONS + len(self.macro_actions)
+
+    def _select_macro_action(self, action):
+        """Map a macro action to ([(action_type, parameters), ...], action_specific_reward_info)."""
+        name, primitive_actions = self.macro_actions[action - NUM_PRIMITIVE_ACTIONS]
+        actions = []
+        action_specific_reward_info = {}
+        for primitive_action in primitive_actions:
+            action_type, parameters, reward_info = self._select_action(primitive_action)
+            action_specific_reward_info.update(reward_info)
+            if action_type:
+                actions.append((action_type, parameters))
+        action_specific_reward_info["action_taken"] = name
+        self.trace.record(step_trace.EVENT_MACRO, action, len(actions),
+                          message=f"Env Action: Macro {name} -> {[action_type for action_type, _ in actions]}"
+                          if self.trace.verbose else None)
+        return actions, action_specific_reward_info
+
+    def _execute_action_batch(self, actions, combined=True):
+        """Send several actions in one message. Returns (action_status, raw_obs_data or None).
+
+        action_status carries the per-action replies under "results".
+        """
+        if len(actions) <= 1:
+            return self._execute_action(*(actions[0] if actions else (None, {})), combined=combined)
 
-        # --- Execute Action ---
+        try:
+            if self.client.supports("action_batch"):
+                action_status = self.client.execute_action_batch(actions)
+            else:
+                # Older bridges: one round trip per action
+                action_status = self._combine_action_results(
+                    [self.client.execute_action(action_type, parameters) for action_type, parameters in actions])
+        except Exception as e:
+            record_error("ACTION_EXECUTION_ERROR", f"Failed to execute action batch {actions}: {str(e)}")
+            action_status = {"status": "error", "message": str(e)}
+        return action_status, None
+
+    @staticmethod
+    def _combine_action_results(results):
+        """execute_action_batch-style status for actions sent one execute_action at a time."""
+        results = [result or {"status": "no_response"} for result in results]
+        submitted = sum(result.get("status") == "submitted" for result in results)
+        status = "submitted" if submitted == len(results) else "partial" if submitted else "error"
+        return {"status": status, "results": results}
+
+    def _execute_action(self, action_type, parameters, combined=True):
+        """Send the action to the game. Returns (action_status, raw_obs_data or None).
+
+        With `combined`, bridges that support it return the post-action observation in the same reply.
+        """
         action_status = {"status": "not_executed"}
+        raw_obs_data = None
         if action_type:
             try:
-                action_result = self.client.execute_action(action_type, parameters)
+                if combined and self.client.supports("step"):
+                    # Action and post-action observation in a single round trip
+                    step_result = self.client.step(action_type, parameters,
+                                                   binary_observation=self._use_binary_observations()) or {}
+                    action_result = step_result.get("action_result")
+                    raw_obs_data = step_result.get("observation")
+                else:
+                    action_result = self.client.execute_action(action_type, parameters)
                 action_status = action_result if action_result else {"status": "no_response"}
-                action_success = action_status.get("status") == "submitted"
-                
-                # Record action latency
-                action_latency_ms = (time.time() - action_start_time) * 1000
-                self.metrics.record_action_time(action_latency_ms)
-                
             except Exception as e:
                 record_error("ACTION_EXECUTION_ERROR", f"Failed to execute {action_type}: {str(e)}")
                 action_status = {"status": "error", "message": str(e)}
-
-        # --- Get New State ---
-        current_obs = self._get_obs()
+        return action_status, raw_obs_data
+
+    # --- Split reset/step for PolledVectorEnv (dealer-mode client) ---
+    # _submit_*() selects the action and sends every request it needs without waiting;
+    # _finish_*() turns the replies into the reset()/step() result once they are in. A vector
+    # env polls all its envs' sockets in between, so their round trips overlap. Only
+    # capabilities the client already knows are used, so submitting never blocks.
+
+    def _submit_request(self, pending, command_type, params=None):
+        request_id = self.client.submit(command_type, params)
+        pending["requests"].append(request_id)
+        return request_id
+
+    def _submit_observation_request(self, pending):
+        binary = self.binary_observations and "binary_observation" in (self.client.capabilities or ())
+        pending["observation"] = self._submit_request(
+            pending, "get_observation_binary" if binary else "get_observation")
+
+    def _submit_reset(self, seed=None):
+        """Start reset(). Returns the pending reset for _finish_reset()."""
+        self._begin_episode(seed)
+        pending = {"requests": []}
+        self._submit_observation_request(pending)
+        return pending
+
+    def _finish_reset(self, pending, into=None):
+        raw_obs_data = self.client.get_reply(pending["observation"], timeout_ms=0)
+        return self._complete_reset(self._get_obs(raw_obs_data, into=into))
+
+    def _submit_step(self, action):
+        """Start step(). Returns the pending step for _finish_step()."""
+        pending = {"requests": [], "start_time": time.time(), "step": None, "batch": None, "actions": [],
+                   "skipped": False}
+        self.trace.begin_step(self.current_episode, self.current_step + 1, action)
+        if self._is_macro_action(action):
+            actions, pending["reward_info"] = self._select_macro_action(action)
+        else:
+            action_type, parameters, pending["reward_info"] = self._select_action(action)
+            actions = [(action_type, parameters)] if action_type else []
+        if self._skips(action, actions):
+            pending["skipped"] = True
+            return pending
+        payloads = [{"action_type": action_type, "parameters": parameters} for action_type, parameters in actions]
+
+        capabilities = self.client.capabilities or ()
+        if len(payloads) == 1 and "step" in capabilities:
+            # Action and post-action observation in a single round trip
+            binary = self.binary_observations and "binary_observation" in capabilities
+            pending["step"] = self._submit_request(pending, "step_binary" if binary else "step", payloads[0])
+            return pending
+        if len(payloads) > 1 and "action_batch" in capabilities:
+            pending["batch"] = (self._submit_request(pending, "execute_action_batch", {"actions": payloads}),
+                                len(payloads))
+        else:
+            # Pipelined: the bridge answers them in order, after one round trip
+            pending["actions"] = [self._submit_request(pending, "execute_action", payload) for payload in payloads]
+        self._submit_observation_request(pending)
+        return pending
+
+    def _finish_step(self, pending, into=None):
+        if pending["skipped"]:
+            return self._complete_skipped_step(pending["reward_info"], pending["start_time"], into=into)
+        get_reply = lambda request_id: self.client.get_reply(request_id, timeout_ms=0)
+        raw_obs_data = None
+        if pending["step"] is not None:
+            response = get_reply(pending["step"])
+            if not isinstance(response, dict) or response.get("status") == "error":
+                action_status = raw_obs_data = ZMQClient._failed_step(response)["action_result"]
+            else:
+                action_status = response.get("action_result") or {"status": "no_response"}
+                raw_obs_data = response.get("observation")
+        elif pending["batch"] is not None:
+            request_id, num_actions = pending["batch"]
+            action_status = ZMQClient._batch_result(get_reply(request_id), num_actions)
+        elif len(pending["actions"]) == 1:
+            action_status = get_reply(pending["actions"][0]) or {"status": "no_response"}
+        elif pending["actions"]:
+            action_status = self._combine_action_results([get_reply(request_id) for request_id in pending["actions"]])
+        else:
+            action_status = {"status": "not_executed"}
+        if raw_obs_data is None:
+            raw_obs_data = get_reply(pending["observation"])
+        current_obs = self._get_obs(raw_obs_data, into=into)
+        return self._complete_step(current_obs, action_status, pending["reward_info"], pending["start_time"])
+
+    def _complete_step(self, current_obs, action_status, action_specific_reward_info, step_start_time, ticks=1):
+        """Reward, bookkeeping and metrics once the post-action observation is known."""
+        base_action_cost = -0.1 * ticks # Default cost for taking a step (per tick, for holds over several)
+        action_success = action_status.get("status") == "submitted"
         self._update_combat_state_from_obs(current_obs)
 
         # --- Calculate Reward ---
@@ -307,109 +637,134 @@ class CustomGameEnv(gym.Env):
             "action_success": action_success,
             "episode": self.current_episode,
             "step": self.current_step,
-            "cumulative_reward": self.cumulative_reward
+            "cumulative_reward": self.cumulative_reward,
+            "action_mask": self.action_masks(),  # For the next action
         })
 
         return current_obs, reward, terminated, truncated, info
 
     # In class CustomGameEnv (ensure these are methods of the class):
-    def _handle_attack_npc(self, last_observation):
+    def _attack_target(self, last_observation):
+        """The attack handler's decision: (goblin id, squared distance, None), or (None, None, declined).
+
+        `declined` is the trace event and action_specific_reward_info for not attacking.
+        Shared by _handle_attack_npc() and action_masks(); no side effects.
+        """
         if not last_observation:
-            print("Attack: No last_observation available.")
-            return None, {}, {"attack_attempted": False, "error": "Missing last_observation"}
+            return None, None, (step_trace.EVENT_ATTACK_NO_OBSERVATION,
+                                {"attack_attempted": False, "error": "Missing last_observation"})
 
         player_loc_data = last_observation.get("player_location")
         # Check if player_loc_data is None or any of its crucial elements are None (assuming x,y,plane are at 0,1,2)
         if player_loc_data is None or \
            player_loc_data[0] is None or player_loc_data[1] is None or player_loc_data[2] is None or \
            player_loc_data[0] == 0.0 and player_loc_data[1] == 0.0: # Default/uninitialized check
-             print("Attack: Player location not available or uninitialized in last_observation.")
-             return None, {}, {"attack_attempted": False, "error": "Player location missing or uninitialized"}
-
+             return None, None, (step_trace.EVENT_ATTACK_NO_LOCATION,
+                                 {"attack_attempted": False, "error": "Player location missing or uninitialized"})
 
         nearby_npcs = last_observation.get("nearby_npcs_info")
         if nearby_npcs is None:
-            print("Attack: No NPC info in last_observation.")
-            return None, {}, {"attack_attempted": False, "error": "NPC info missing"}
+            return None, None, (step_trace.EVENT_ATTACK_NO_NPC_INFO,
+                                {"attack_attempted": False, "error": "NPC info missing"})
 
         # --- Player Animation for combat state ---
         # self.player_is_in_combat_animation should be updated in step() method after new obs.
         # For now, we'll simplify and not use it directly to gate re-attacking.
 
-        best_target_goblin_id = None
-        min_dist_sq = float('inf') # Use squared distance to avoid sqrt
-        
-        player_x, player_y, player_plane = player_loc_data[0], player_loc_data[1], player_loc_data[2]
-
-        for i in range(MAX_NEARBY_NPCS):
-            npc_id = nearby_npcs[i, 0]
-            npc_x = nearby_npcs[i, 1]
-            npc_y = nearby_npcs[i, 2]
-            # npc_anim = nearby_npcs[i, 3] # NPC animation (could be used to check if already dead/fighting)
-
-            if npc_id == GOBLIN_NPC_ID:
-                # Basic check: is NPC data valid (not -1 padding)?
-                if npc_x != -1 and npc_y != -1: # Assuming NPCs are on the same plane as player
-                    dist_sq = (player_x - npc_x)**2 + (player_y - npc_y)**2
-                    if dist_sq < min_dist_sq:
-                        min_dist_sq = dist_sq
-                        best_target_goblin_id = int(npc_id)
-        
-        if best_target_goblin_id is not None:
-            # Simple logic: always try to attack if a goblin is found.
-            # More complex: check if self.current_target_npc_id == best_target_goblin_id and self.player_is_in_combat_animation
-            # For now, if we found a goblin, we set it as current target and attempt attack.
-            self.current_target_npc_id = best_target_goblin_id 
-            print(f"Attack: Found Goblin (ID: {best_target_goblin_id}). Min distance: {min_dist_sq**0.5:.2f}")
-            return "attack_npc", {"npc_id": best_target_goblin_id}, {"attack_attempted": True, "target_id": best_target_goblin_id}
-        else:
-            print("Attack: No suitable Goblin found nearby.")
-            self.current_target_npc_id = None
-        return None, {}, {"attack_attempted": False, "error": "No suitable goblin found"}
+        # Nearest goblin with a valid (not -1 padding) location, assuming NPCs are on the
+        # player's plane; squared distance avoids the sqrt
+        target_index, min_dist_sq = nearest_entity(nearby_npcs[:, 0], nearby_npcs[:, 1:3], player_loc_data,
+                                                   GOBLIN_ID_TABLE)
+        if target_index is None:
+            return None, None, (step_trace.EVENT_ATTACK_NO_GOBLIN,
+                                {"attack_attempted": False, "error": "No suitable goblin found"})
+        return int(nearby_npcs[target_index, 0]), min_dist_sq, None
 
-    def _handle_eat_food(self, last_observation):
+    def _handle_attack_npc(self, last_observation):
+        best_target_goblin_id, min_dist_sq, declined = self._attack_target(last_observation)
+        if declined is not None:
+            event, reward_info = declined
+            self.trace.record(event)
+            if event == step_trace.EVENT_ATTACK_NO_GOBLIN:
+                self.current_target_npc_id = None
+            return None, {}, reward_info
+
+        # Simple logic: always try to attack if a goblin is found.
+        # More complex: check if self.current_target_npc_id == best_target_goblin_id and self.player_is_in_combat_animation
+        # For now, if we found a goblin, we set it as current target and attempt attack.
+        self.current_target_npc_id = best_target_goblin_id 
+        self.trace.record(step_trace.EVENT_ATTACK_TARGET, best_target_goblin_id, min_dist_sq**0.5)
+        return "attack_npc", {"npc_id": best_target_goblin_id}, {"attack_attempted": True, "target_id": best_target_goblin_id}
+
+    def _food_to_eat(self, last_observation):
+        """The eat handler's decision: (food id, current health, None), or (None, current health, declined).
+
+        `declined` is the trace event (None if not traced) and action_specific_reward_info
+        for not eating. Shared by _handle_eat_food() and action_masks(); no side effects.
+        """
         if not last_observation:
-            print("Eat Food: No last_observation available.")
-            return None, {}, {"eat_attempted": False, "error": "Missing last_observation"}
+            return None, 0, (step_trace.EVENT_EAT_NO_OBSERVATION,
+                             {"eat_attempted": False, "error": "Missing last_observation"})
 
         player_stats = last_observation.get("player_stats")
         if player_stats is None or len(player_stats) < 2: # Need at least current and max health
-            print("Eat Food: Player stats not available or incomplete in last_observation.")
-            return None, {}, {"eat_attempted": False, "error": "Player stats missing or incomplete"}
+            return None, 0, (step_trace.EVENT_EAT_NO_STATS,
+                             {"eat_attempted": False, "error": "Player stats missing or incomplete"})
 
         current_health = player_stats[0]
         max_health = player_stats[1]
 
         if max_health <= 0: # Avoid division by zero if max_health isn't loaded correctly
-            print("Eat Food: Max health is zero or invalid.")
-            return None, {}, {"eat_attempted": False, "error": "Invalid max_health"}
+            return None, current_health, (step_trace.EVENT_EAT_INVALID_MAX_HEALTH,
+                                          {"eat_attempted": False, "error": "Invalid max_health"})
             
         should_eat = (current_health / max_health) <= EAT_HEALTH_THRESHOLD_PERCENTAGE
         
         if not should_eat:
             # print(f"Eat Food: Health {current_health}/{max_health} is above threshold {EAT_HEALTH_THRESHOLD_PERCENTAGE*100}%. No need to eat.")
-            return None, {}, {"eat_attempted": False, "status": "Health sufficient"}
+            return None, current_health, (None, {"eat_attempted": False, "status": "Health sufficient"})
 
         inventory_item_ids = last_observation.get("inventory_item_ids")
         if inventory_item_ids is None:
-            print("Eat Food: Inventory info not available in last_observation.")
-            return None, {}, {"eat_attempted": False, "error": "Inventory info missing"}
-
-        found_food_id = None
-        for i in range(MAX_INVENTORY_ITEMS):
-            item_id = inventory_item_ids[i]
-            if item_id != -1 and int(item_id) in FOOD_ITEM_IDS: # Ensure item_id is not padding and is in our list
-                found_food_id = int(item_id)
-                break 
-        
-        if found_food_id is not None:
-            print(f"Eat Food: Health {current_health}/{max_health} is low. Found food (ID: {found_food_id}). Attempting to eat.")
-            # Action string "Eat" is common. Some items might use "Consume".
-            # The Java plugin's interactWithInventoryItem needs to handle this.
-            return "interact_inventory", {"item_id": found_food_id, "action": "Eat"}, {"eat_attempted": True, "food_id": found_food_id}
-        else:
-            print(f"Eat Food: Health {current_health}/{max_health} is low, but no suitable food found in inventory.")
-            return None, {}, {"eat_attempted": False, "error": "No food found"}
+            return None, current_health, (step_trace.EVENT_EAT_NO_INVENTORY,
+                                          {"eat_attempted": False, "error": "Inventory info missing"})
+
+        food_slot = first_matching_item(inventory_item_ids, FOOD_ID_TABLE)
+        if food_slot is None:
+            return None, current_health, (step_trace.EVENT_EAT_NO_FOOD,
+                                          {"eat_attempted": False, "error": "No food found"})
+        return int(inventory_item_ids[food_slot]), current_health, None
+
+    def _handle_eat_food(self, last_observation):
+        found_food_id, current_health, declined = self._food_to_eat(last_observation)
+        if declined is not None:
+            event, reward_info = declined
+            if event is not None:
+                self.trace.record(event, 0, current_health)
+            return None, {}, reward_info
+
+        self.trace.record(step_trace.EVENT_EAT_FOOD, found_food_id, current_health)
+        # Action string "Eat" is common. Some items might use "Consume".
+        # The Java plugin's interactWithInventoryItem needs to handle this.
+        return "interact_inventory", {"item_id": found_food_id, "action": "Eat"}, {"eat_attempted": True, "food_id": found_food_id}
+
+    def action_masks(self):
+        """Boolean mask of the actions that would do something given last_observation.
+
+        ATTACK_NPC and EAT_FOOD are valid when their handlers would send a game action,
+        MOVE_TO_GOBLIN_AREA and NOOP always are, and a macro action when any of its
+        primitives is. The method name is the one maskable policies (sb3-contrib's
+        MaskablePPO) look for; step() also puts the mask in info["action_mask"]. With
+        skip_invalid_actions, step() answers masked-out actions without a bridge round trip.
+        """
+        valid = (self._attack_target(self.last_observation)[2] is None,
+                 self._food_to_eat(self.last_observation)[2] is None,
+                 True, True)
+        mask = np.ones(self.action_space.n, dtype=np.bool_)
+        mask[:NUM_PRIMITIVE_ACTIONS] = valid
+        for i, (_, primitive_actions) in enumerate(self.macro_actions):
+            mask[NUM_PRIMITIVE_ACTIONS + i] = any(valid[action] for action in primitive_actions)
+        return mask
 
     def _calculate_reward(self, base_action_cost, action_specific_reward_info, 
                           prev_obs, current_obs, action_status, action_taken):
@@ -418,18 +773,20 @@ class CustomGameEnv(gym.Env):
         # --- Penalties for Action Failures/Context Errors ---
         if action_status.get("status") == "error": # Error from Java plugin or ZMQ
             reward -= 0.5
-            print(f"Reward: Penalized for action error: {action_status.get('message')}")
+            self.trace.record(step_trace.EVENT_REWARD_ACTION_ERROR, -0.5,
+                              message=f"Reward: Penalized for action error: {action_status.get('message')}"
+                              if self.trace.verbose else None)
         elif action_status.get("status") == "no_action_taken" and action_taken != 3: # Action was chosen but handler decided not to act (and not NOOP)
             # Check specific errors from handlers if available in action_specific_reward_info
             if action_specific_reward_info.get("error") == "No suitable goblin found" and action_taken == 0:
                 reward -= 0.5 # Tried to attack when no goblin was found by handler
-                print("Reward: Penalized for trying to attack with no suitable goblin.")
+                self.trace.record(step_trace.EVENT_REWARD_NO_GOBLIN, -0.5)
             elif action_specific_reward_info.get("error") == "No food found" and action_taken == 1:
                 reward -= 0.3 # Tried to eat but no food
-                print("Reward: Penalized for trying to eat with no food.")
+                self.trace.record(step_trace.EVENT_REWARD_NO_FOOD, -0.3)
             elif action_specific_reward_info.get("status") == "Health sufficient" and action_taken == 1:
                 reward -= 0.3 # Tried to eat when health was high
-                print("Reward: Penalized for trying to eat with sufficient health.")
+                self.trace.record(step_trace.EVENT_REWARD_HEALTH_SUFFICIENT, -0.3)
             # Add more specific penalties based on action_specific_reward_info if needed
 
         # --- Rewards/Penalties based on Action Type and Outcome ---
@@ -439,7 +796,7 @@ class CustomGameEnv(gym.Env):
             if action_taken == 0: # ATTACK_NPC
                 if action_specific_reward_info.get("attack_attempted"):
                     reward += 0.5  # Successfully submitted an attack command
-                    print("Reward: Bonus for submitting attack.")
+                    self.trace.record(step_trace.EVENT_REWARD_ATTACK, 0.5)
                     # TODO (Advanced): Check if target NPC health decreased in current_obs vs prev_obs
                     # This would require adding NPC health to observation or having a way to query it.
                     # For now, this simple reward for submission is a starting point.
@@ -453,40 +810,39 @@ class CustomGameEnv(gym.Env):
                        current_obs["player_stats"][0] > prev_obs["player_stats"][0]:
                         health_increase = current_obs["player_stats"][0] - prev_obs["player_stats"][0]
                         reward += health_increase * 0.5 # Reward proportional to healing, e.g., 5.0 for 10 hp
-                        print(f"Reward: Bonus for eating and increasing health by {health_increase}.")
+                        self.trace.record(step_trace.EVENT_REWARD_EAT_HEALED, health_increase * 0.5, health_increase)
                     else:
                         # Submitted eat command, but health didn't increase (e.g., already full, non-food, or lag)
                         reward -= 0.1 # Small penalty or just remove the submission bonus
-                        print("Reward: Eat submitted, but no health increase observed.")
+                        self.trace.record(step_trace.EVENT_REWARD_EAT_NOT_HEALED, -0.1)
             
             elif action_taken == 2: # MOVE_TO_GOBLIN_AREA
                 reward += 0.05 # Small bonus for moving, already got 0.1 for submission
-                print("Reward: Bonus for moving to waypoint.")
+                self.trace.record(step_trace.EVENT_REWARD_MOVE, 0.05)
 
         # --- NOOP Action (action_taken == 3) ---
         if action_taken == 3: # NOOP
             # If base_action_cost is -0.1, this effectively makes NOOP cost 0 if we add 0.1
             # Or, set reward directly:
             reward = 0.0 # NOOPs are neutral or very slightly negative if preferred
-            print("Reward: NOOP action, neutral reward.")
+            self.trace.record(step_trace.EVENT_REWARD_NOOP)
 
 
         # --- Major Penalty for Death ---
         if current_obs.get("player_stats") is not None and len(current_obs["player_stats"]) > 0 and \
            current_obs["player_stats"][0] <= 0: # Current health is 0 or less
             reward = -100.0 # Large penalty for dying
-            print("Reward: Large penalty for player death.")
+            self.trace.record(step_trace.EVENT_REWARD_DEATH)
             
-        print(f"Final Reward for step: {reward}")
+        self.trace.record(step_trace.EVENT_REWARD_TOTAL, reward, ACTION_STATUS_CODES.get(action_status.get("status"), 0))
         return reward
 
     def render(self):
-        if self.render_mode == "human":
-            # Potentially print some state to console or use a simple visualizer
-            # obs_data = self._get_info().get("raw_observation", {}) # _get_info() returns the dict directly now
-            obs_dict = self._get_obs() # Get the processed observation dictionary
+        if self.render_mode == "human" and self.last_observation is not None:
+            # Show the last observation: fetching a new one would refill the spare observation
+            # buffer and replace the step's info
             print(f"--- Current State (Render) ---")
-            for key, value in obs_dict.items():
+            for key, value in self.last_observation.items():
                 if isinstance(value, np.ndarray):
                     print(f"  {key}: {value.tolist()}") # Convert numpy arrays to lists for cleaner printing
                 else:
@@ -499,9 +855,121 @@ class CustomGameEnv(gym.Env):
             return np.zeros((100, 100, 3), dtype=np.uint8)
 
 
+    def get_worker_metrics(self):
+        """Health and recent performance from this env's MetricsCollector.
+
+        Under make_env() every worker process has its own collector; the parent reads them
+        with vec_env.env_method("get_worker_metrics").
+        """
+        return {
+            "worker": self.metrics.worker,
+            "health": asdict(self.metrics.get_health_status()),
+            "recent_performance": self.metrics.get_recent_performance(),
+        }
+
     def close(self):
-        self.client.close()
-        print("CustomGameEnv closed.")
+        if self.pool is not None:
+            self.pool.release(self.client)
+        else:
+            self.client.close()
+        if self.trace.verbose:
+            print("CustomGameEnv closed.")
+
+
+class AsyncCustomGameEnv(CustomGameEnv):
+    """CustomGameEnv driven from an asyncio event loop via AsyncZMQClient.
+
+    Same spaces, action handlers and reward as CustomGameEnv, but the bridge calls are
+    awaited, so one process can step many bots concurrently, e.g.
+    `await asyncio.gather(*(env.step_async(a) for env, a in zip(envs, actions)))`.
+    The synchronous reset()/step()/hold() are not available on this class.
+    """
+
+    def __init__(self, render_mode=None, binary_observations=True, client=None, host="localhost", port=5555,
+                 observation_cache_ms=None, ticks_per_step=None, reuse_observation_buffers=False,
+                 verbose=True, trace_capacity=DEFAULT_TRACE_CAPACITY, max_npcs=MAX_NEARBY_NPCS,
+                 max_inventory_items=MAX_INVENTORY_ITEMS, max_ground_items=MAX_GROUND_ITEMS, nearest_entities=True,
+                 skip_invalid_actions=False):
+        own_client = client is None
+        if own_client:
+            client = AsyncZMQClient(host=host, port=port, observation_cache_ms=observation_cache_ms, verbose=verbose)
+        super().__init__(render_mode=render_mode, binary_observations=binary_observations, client=client,
+                         ticks_per_step=ticks_per_step, reuse_observation_buffers=reuse_observation_buffers,
+                         verbose=verbose, trace_capacity=trace_capacity, max_npcs=max_npcs,
+                         max_inventory_items=max_inventory_items, max_ground_items=max_ground_items,
+                         nearest_entities=nearest_entities, skip_invalid_actions=skip_invalid_actions)
+        if own_client:
+            client.trace = self.trace  # The client's errors go to the env's trace
+
+    async def reset_async(self, seed=None, options=None):
+        self._begin_episode(seed)
+        await self.client.get_capabilities()
+        if self._tick_synced():
+            self._next_step_tick = None
+            return self._complete_reset(self._get_obs(await self._wait_for_step_tick_async()))
+        return self._complete_reset(self._get_obs(await self._fetch_observation_async(refresh=True)))
+
+    async def step_async(self, action):
+        step_start_time = time.time()
+        self.trace.begin_step(self.current_episode, self.current_step + 1, action)
+        action_type, parameters, action_specific_reward_info = self._select_action(action)
+        if self._skips(action, action_type):
+            return self._complete_skipped_step(action_specific_reward_info, step_start_time)
+
+        tick_synced = self._tick_synced()
+        action_status = {"status": "not_executed"}
+        raw_obs_data = None
+        if action_type:
+            try:
+                if not tick_synced and self.client.supports("step"):
+                    step_result = await self.client.step(action_type, parameters,
+                                                         binary_observation=self._use_binary_observations())
+                    action_result = step_result.get("action_result")
+                    raw_obs_data = step_result.get("observation")
+                else:
+                    action_result = await self.client.execute_action(action_type, parameters)
+                action_status = action_result if action_result else {"status": "no_response"}
+            except Exception as e:
+                record_error("ACTION_EXECUTION_ERROR", f"Failed to execute {action_type}: {str(e)}")
+                action_status = {"status": "error", "message": str(e)}
+
+        if tick_synced:
+            raw_obs_data = await self._wait_for_step_tick_async()
+        elif raw_obs_data is None:
+            raw_obs_data = await self._fetch_observation_async(refresh=True)
+        current_obs = self._get_obs(raw_obs_data)
+        return self._complete_step(current_obs, action_status, action_specific_reward_info, step_start_time)
+
+    async def _fetch_observation_async(self, refresh=False):
+        try:
+            if self._use_binary_observations():
+                raw_obs_data = await self.client.get_observation_binary(refresh=refresh)
+            else:
+                raw_obs_data = await self.client.get_observation(refresh=refresh)
+        except Exception as e:
+            record_error("OBSERVATION_ERROR", f"Failed to get observation: {str(e)}")
+            raw_obs_data = {"status": "error", "message": str(e)}
+        return raw_obs_data
+
+    async def _wait_for_step_tick_async(self):
+        try:
+            raw_obs_data = await self.client.wait_for_tick(self._next_step_tick,
+                                                           binary_observation=self._use_binary_observations())
+        except Exception as e:
+            record_error("OBSERVATION_ERROR", f"Failed to wait for game tick: {str(e)}")
+            raw_obs_data = {"status": "error", "message": str(e)}
+        self._schedule_next_step_tick()
+        return raw_obs_data
+
+    def reset(self, seed=None, options=None):
+        raise RuntimeError("AsyncCustomGameEnv is asynchronous; use 'await env.reset_async()'")
+
+    def step(self, action):
+        raise RuntimeError("AsyncCustomGameEnv is asynchronous; use 'await env.step_async(action)'")
+
+    def hold(self, action, ticks=1):
+        raise RuntimeError("AsyncCustomGameEnv is asynchronous; hold() is not available")
+
 
 if __name__ == '__main__':
     # Example usage:
@@ -4,6 +4,8 @@ Tracks performance, health, and training progress with real-time visualization.
 """
 
 import json
+import math
+import os
 import time
 import threading
 import collections
@@ -61,11 +63,60 @@ class AgentHealth:
     total_steps: int
 
 
+class LatencyHistogram:
+    """Fixed log-spaced latency buckets (about 4% wide, 1 us to 100 s).
+
+    Recording is O(1) with no per-sample storage, so it is cheap enough for every request;
+    percentiles are resolved to the upper edge of their bucket.
+    """
+    
+    def __init__(self, min_ms: float = 0.001, max_ms: float = 100000.0, buckets_per_decade: int = 60):
+        self._log_min = math.log10(min_ms)
+        self._buckets_per_decade = buckets_per_decade
+        num_buckets = int((math.log10(max_ms) - self._log_min) * buckets_per_decade) + 2
+        self.counts = [0] * num_buckets
+        self.count = 0
+        self.max_ms = 0.0
+    
+    def record(self, value_ms: float):
+        if value_ms > 0:
+            index = int((math.log10(value_ms) - self._log_min) * self._buckets_per_decade) + 1
+            index = min(max(index, 0), len(self.counts) - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+    
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                upper_ms = 10 ** (self._log_min + index / self._buckets_per_decade)
+                return min(upper_ms, self.max_ms)
+        return self.max_ms
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max_ms
+        }
+
+
 class MetricsCollector:
     """Collects and stores performance metrics."""
     
-    def __init__(self, max_history=10000):
+    def __init__(self, max_history=10000, worker=None):
         self.max_history = max_history
+        self.worker = worker  # Label of the env worker this collector belongs to (e.g. its bridge endpoint)
         self.metrics_history: List[PerformanceMetrics] = []
         self.health_history: List[AgentHealth] = []
         self.episode_rewards: Dict[int, List[float]] = collections.defaultdict(list)
@@ -77,8 +128,19 @@ class MetricsCollector:
         # Performance tracking
         self.observation_times = collections.deque(maxlen=100)
         self.action_times = collections.deque(maxlen=100)
+        self.step_times = collections.deque(maxlen=100)
         self.frame_times = collections.deque(maxlen=60)
         
+        # Payload compression (see payload_compression.py)
+        self.compression_raw_bytes = 0
+        self.compression_wire_bytes = 0
+        self.compression_frames = 0
+        self.codec_times = collections.deque(maxlen=100)
+        
+        # Client-side observation cache (ZMQClient(observation_cache_ms=...))
+        self.observation_cache_hits = 0
+        self.observation_cache_misses = 0
+        
         # Error tracking
         self.recent_errors = collections.deque(maxlen=100)
         self.recent_warnings = collections.deque(maxlen=100)
@@ -87,6 +149,7 @@ class MetricsCollector:
         self.last_observation_time = 0
         self.last_action_time = 0
         self.connection_failures = 0
+        self.connection_state_durations: Dict[str, float] = collections.defaultdict(float)  # seconds
         self.total_episodes = 0
         self.total_steps = 0
         
@@ -114,6 +177,52 @@ class MetricsCollector:
             self.action_times.append(duration_ms)
             self.last_action_time = time.time()
     
+    def record_step_time(self, duration_ms: float):
+        """Record time taken by a combined action + observation round trip."""
+        with self._lock:
+            self.step_times.append(duration_ms)
+            self.last_observation_time = time.time()
+            self.last_action_time = self.last_observation_time
+    
+    def record_compression(self, raw_bytes: int, wire_bytes: int, codec_time_ms: float):
+        """Record one enveloped message: its uncompressed and on-the-wire sizes and codec time."""
+        with self._lock:
+            self.compression_raw_bytes += raw_bytes
+            self.compression_wire_bytes += wire_bytes
+            self.compression_frames += 1
+            if codec_time_ms > 0:
+                self.codec_times.append(codec_time_ms)
+    
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """Overall compression ratio and average (de)compression time, to judge whether it pays off."""
+        with self._lock:
+            return {
+                'frames': self.compression_frames,
+                'raw_bytes': self.compression_raw_bytes,
+                'wire_bytes': self.compression_wire_bytes,
+                'ratio': (self.compression_raw_bytes / self.compression_wire_bytes
+                          if self.compression_wire_bytes else None),
+                'average_codec_time_ms': np.mean(self.codec_times) if self.codec_times else 0.0
+            }
+    
+    def record_observation_cache(self, hit: bool):
+        """Record whether an observation request was served from the client-side cache."""
+        with self._lock:
+            if hit:
+                self.observation_cache_hits += 1
+            else:
+                self.observation_cache_misses += 1
+    
+    def get_observation_cache_stats(self) -> Dict[str, Any]:
+        """Observation cache hits, misses and hit rate (None before the first lookup)."""
+        with self._lock:
+            lookups = self.observation_cache_hits + self.observation_cache_misses
+            return {
+                'hits': self.observation_cache_hits,
+                'misses': self.observation_cache_misses,
+                'hit_rate': self.observation_cache_hits / lookups if lookups else None
+            }
+    
     def record_frame_time(self, duration_ms: float):
         """Record time for complete frame processing."""
         with self._lock:
@@ -142,7 +251,18 @@ class MetricsCollector:
         """Record a connection failure."""
         with self._lock:
             self.connection_failures += 1
-            self.record_error("CONNECTION_FAILURE", "ZMQ connection failed")
+        # Outside the lock: record_error() takes it too
+        self.record_error("CONNECTION_FAILURE", "ZMQ connection failed")
+    
+    def record_connection_state(self, state: str, duration_s: float):
+        """Record time spent in a connection (circuit breaker) state, once the state is left."""
+        with self._lock:
+            self.connection_state_durations[state] += duration_s
+    
+    def get_connection_state_durations(self) -> Dict[str, float]:
+        """Total seconds spent in each connection state so far."""
+        with self._lock:
+            return dict(self.connection_state_durations)
     
     def record_metrics(self, episode: int, step: int, reward: float, 
                       cumulative_reward: float, player_health: float, 
@@ -268,11 +388,22 @@ class MetricsCollector:
             data = {
                 'export_timestamp': time.time(),
                 'start_time': self.start_time,
+                'worker': self.worker,
                 'metrics': [asdict(m) for m in self.metrics_history],
                 'episode_summaries': [self.get_episode_summary(ep) 
                                     for ep in self.episode_rewards.keys()],
                 'health_status': asdict(self.get_health_status()),
                 'recent_performance': self.get_recent_performance(),
+                'connection_state_durations': dict(self.connection_state_durations),
+                'compression': {
+                    'raw_bytes': self.compression_raw_bytes,
+                    'wire_bytes': self.compression_wire_bytes,
+                    'frames': self.compression_frames
+                },
+                'observation_cache': {
+                    'hits': self.observation_cache_hits,
+                    'misses': self.observation_cache_misses
+                },
                 'error_log': self.error_log[-100:]  # Last 100 errors
             }
         
@@ -467,21 +598,28 @@ except ImportError:
     np = MinimalNumpy()
 
 
-# Global metrics collector instance
+# Global metrics collector instance, one per process
 _global_metrics = None
+_global_metrics_pid = None
 
 def get_metrics_collector() -> MetricsCollector:
-    """Get the global metrics collector instance."""
-    global _global_metrics
-    if _global_metrics is None:
+    """Get the global metrics collector instance.
+
+    A forked worker process gets a fresh collector rather than the copy of its parent's
+    (whose history and lock state it would otherwise inherit).
+    """
+    global _global_metrics, _global_metrics_pid
+    if _global_metrics is None or _global_metrics_pid != os.getpid():
         _global_metrics = MetricsCollector()
+        _global_metrics_pid = os.getpid()
     return _global_metrics
 
 
-def initialize_monitoring(max_history=10000) -> MetricsCollector:
+def initialize_monitoring(max_history=10000, worker=None) -> MetricsCollector:
     """Initialize the global monitoring system."""
-    global _global_metrics
-    _global_metrics = MetricsCollector(max_history)
+    global _global_metrics, _global_metrics_pid
+    _global_metrics = MetricsCollector(max_history, worker=worker)
+    _global_metrics_pid = os.getpid()
     return _global_metrics
 
 
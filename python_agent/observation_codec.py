@@ -0,0 +1,150 @@
+"""
+Binary observation wire format for the AIBridge.
+A fixed-layout alternative to the JSON observation that decodes with np.frombuffer,
+without walking nested dicts in Python.
+
+Layout (all little-endian):
+    header          magic "MBO1", version (u16), npc count (u16), inventory count (u16),
+                    ground item count (u16)
+    player record   player_stats (5 x f32), player_location (3 x f32), player_animation (i32)
+    npc records     count x (id, x, y, animation) f32
+    inventory       count x (id, quantity) f32
+    ground items    count x (id, quantity, x, y) f32
+
+Entity names are not part of the binary format; they are only available over JSON.
+"""
+
+import numpy as np
+
+from entity_selection import nearest_records
+
+OBSERVATION_MAGIC = b"MBO1"
+OBSERVATION_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("num_npcs", "<u2"),
+    ("num_inventory", "<u2"),
+    ("num_ground_items", "<u2"),
+])
+PLAYER_DTYPE = np.dtype([
+    ("player_stats", "<f4", (5,)),
+    ("player_location", "<f4", (3,)),
+    ("player_animation", "<i4", (1,)),
+])
+NPC_RECORD_DTYPE = np.dtype(("<f4", (4,)))          # id, x, y, animation
+INVENTORY_RECORD_DTYPE = np.dtype(("<f4", (2,)))    # id, quantity
+GROUND_ITEM_RECORD_DTYPE = np.dtype(("<f4", (4,)))  # id, quantity, x, y
+
+_PLAYER_OFFSET = HEADER_DTYPE.itemsize
+_ENTITIES_OFFSET = _PLAYER_OFFSET + PLAYER_DTYPE.itemsize
+
+
+def is_binary_observation(payload):
+    """Check whether a reply frame holds a binary observation (as opposed to JSON)."""
+    return bytes(payload[:4]) == OBSERVATION_MAGIC
+
+
+def encode_observation(raw_obs_data):
+    """Encode a JSON-style observation dict into the binary wire format.
+
+    Mirrors what the Java bridge sends; used by the mock/replay servers and benchmarks.
+    """
+    npcs = [n for n in raw_obs_data.get("nearby_npcs") or [] if isinstance(n, dict)]
+    inventory = [i for i in raw_obs_data.get("inventory") or [] if isinstance(i, dict)]
+    ground_items = [g for g in raw_obs_data.get("nearby_ground_items") or [] if isinstance(g, dict)]
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = OBSERVATION_MAGIC
+    header["version"] = OBSERVATION_VERSION
+    header["num_npcs"] = len(npcs)
+    header["num_inventory"] = len(inventory)
+    header["num_ground_items"] = len(ground_items)
+
+    location = raw_obs_data.get("player_location") or {}
+    player = np.zeros(1, dtype=PLAYER_DTYPE)
+    player["player_stats"] = [
+        raw_obs_data.get("player_current_health", 0),
+        raw_obs_data.get("player_max_health", 0),
+        raw_obs_data.get("player_current_prayer", 0),
+        raw_obs_data.get("player_max_prayer", 0),
+        raw_obs_data.get("player_run_energy_percentage", 0.0),
+    ]
+    player["player_location"] = [location.get("x", 0), location.get("y", 0), location.get("plane", 0)]
+    player["player_animation"] = raw_obs_data.get("player_animation", -1)
+
+    def _loc(entity):
+        loc = entity.get("location")
+        return loc if isinstance(loc, dict) else {}
+
+    npc_records = np.array(
+        [(n.get("id", -1), _loc(n).get("x", -1), _loc(n).get("y", -1), n.get("animation", -1)) for n in npcs],
+        dtype=np.float32).reshape(-1, 4)
+    inventory_records = np.array(
+        [(i.get("id", -1), i.get("quantity", 0)) for i in inventory],
+        dtype=np.float32).reshape(-1, 2)
+    ground_records = np.array(
+        [(g.get("id", -1), g.get("quantity", 0), _loc(g).get("x", -1), _loc(g).get("y", -1)) for g in ground_items],
+        dtype=np.float32).reshape(-1, 4)
+
+    return b"".join([
+        header.tobytes(),
+        player.tobytes(),
+        npc_records.astype("<f4").tobytes(),
+        inventory_records.astype("<f4").tobytes(),
+        ground_records.astype("<f4").tobytes(),
+    ])
+
+
+def decode_observation_into(payload, obs, nearest=False):
+    """Decode a binary observation into preinitialised observation arrays.
+
+    `obs` is the CustomGameEnv observation dict with padding values already filled in;
+    entity sections beyond the observation caps are dropped. With `nearest`, NPCs and
+    ground items over the cap are the ones nearest the player (in record order) rather
+    than the first ones. Raises ValueError on a malformed payload.
+    """
+    if len(payload) < _ENTITIES_OFFSET:
+        raise ValueError(f"Binary observation too short: {len(payload)} bytes")
+
+    header = np.frombuffer(payload, dtype=HEADER_DTYPE, count=1)[0]
+    if header["magic"] != OBSERVATION_MAGIC:
+        raise ValueError(f"Bad binary observation magic: {header['magic']!r}")
+    if header["version"] != OBSERVATION_VERSION:
+        raise ValueError(f"Unsupported binary observation version: {header['version']}")
+
+    num_npcs = int(header["num_npcs"])
+    num_inventory = int(header["num_inventory"])
+    num_ground_items = int(header["num_ground_items"])
+    expected_size = (_ENTITIES_OFFSET
+                     + num_npcs * NPC_RECORD_DTYPE.itemsize
+                     + num_inventory * INVENTORY_RECORD_DTYPE.itemsize
+                     + num_ground_items * GROUND_ITEM_RECORD_DTYPE.itemsize)
+    if len(payload) != expected_size:
+        raise ValueError(f"Binary observation size mismatch: expected {expected_size} bytes, got {len(payload)}")
+
+    player = np.frombuffer(payload, dtype=PLAYER_DTYPE, count=1, offset=_PLAYER_OFFSET)[0]
+    obs["player_stats"][:] = player["player_stats"]
+    obs["player_location"][:] = player["player_location"]
+    obs["player_animation"][:] = player["player_animation"]
+
+    offset = _ENTITIES_OFFSET
+    npcs = np.frombuffer(payload, dtype=NPC_RECORD_DTYPE, count=num_npcs, offset=offset)
+    offset += npcs.nbytes
+    inventory = np.frombuffer(payload, dtype=INVENTORY_RECORD_DTYPE, count=num_inventory, offset=offset)
+    offset += inventory.nbytes
+    ground_items = np.frombuffer(payload, dtype=GROUND_ITEM_RECORD_DTYPE, count=num_ground_items, offset=offset)
+    if nearest:
+        location = player["player_location"]
+        npcs = nearest_records(npcs, 1, location, len(obs["nearby_npcs_info"]))
+        ground_items = nearest_records(ground_items, 2, location, len(obs["nearby_ground_items_info"]))
+        num_npcs, num_ground_items = len(npcs), len(ground_items)
+
+    k = min(num_npcs, len(obs["nearby_npcs_info"]))
+    obs["nearby_npcs_info"][:k] = npcs[:k]
+    k = min(num_inventory, len(obs["inventory_item_ids"]))
+    obs["inventory_item_ids"][:k] = inventory[:k, 0]
+    k = min(num_ground_items, len(obs["nearby_ground_items_info"]))
+    obs["nearby_ground_items_info"][:k] = ground_items[:k]
+    return obs
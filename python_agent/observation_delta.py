@@ -0,0 +1,65 @@
+"""
+Delta encoding for JSON observations.
+The bridge numbers every observation it sends in delta mode; a client that acknowledges
+sequence N gets back only what changed since observation N, which keeps payloads (and
+json.loads time) small while the scene is static.
+
+Reply formats:
+    full    {"sequence": int, "full": true, "observation": {...}}
+    delta   {"sequence": int, "base_sequence": int,
+             "changed": {key: value},                  # top-level fields that differ
+             "removed": [key],                         # top-level fields that disappeared
+             "lists": {key: {"length": int,            # entity lists, diffed by position
+                             "items": {"index": entity}}}}
+
+The bridge sends a full observation whenever it no longer holds the acknowledged base
+(or the client acknowledges 0). The Java bridge implements the same diff.
+"""
+
+ENTITY_LIST_KEYS = ("nearby_npcs", "inventory", "nearby_ground_items")
+
+
+def encode_observation_delta(base, current, sequence, base_sequence):
+    """Diff `current` against `base`; used by the mock bridge and benchmarks."""
+    changed = {}
+    lists = {}
+    for key, value in current.items():
+        if key in ENTITY_LIST_KEYS and isinstance(value, list) and isinstance(base.get(key), list):
+            base_items = base[key]
+            items = {str(i): entity for i, entity in enumerate(value)
+                     if i >= len(base_items) or base_items[i] != entity}
+            if items or len(value) != len(base_items):
+                lists[key] = {"length": len(value), "items": items}
+        elif key not in base or base[key] != value:
+            changed[key] = value
+    delta = {"sequence": sequence, "base_sequence": base_sequence}
+    if changed:
+        delta["changed"] = changed
+    removed = [key for key in base if key not in current]
+    if removed:
+        delta["removed"] = removed
+    if lists:
+        delta["lists"] = lists
+    return delta
+
+
+def apply_observation_delta(base, delta):
+    """Rebuild the full observation from `base` and a delta reply.
+
+    Returns a new dict; `base` and its lists are left untouched, so observations handed
+    out earlier stay valid. Raises ValueError if the delta doesn't fit the base.
+    """
+    state = dict(base)
+    state.update(delta.get("changed", {}))
+    for key in delta.get("removed", ()):
+        state.pop(key, None)
+    for key, list_delta in delta.get("lists", {}).items():
+        length = list_delta["length"]
+        items = list(base.get(key) or [])[:length]
+        items.extend([None] * (length - len(items)))
+        for index, entity in list_delta.get("items", {}).items():
+            items[int(index)] = entity
+        if None in items:
+            raise ValueError(f"Delta for '{key}' leaves entries unset")
+        state[key] = items
+    return state
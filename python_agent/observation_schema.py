@@ -0,0 +1,185 @@
+"""
+Declarative observation schema for JSON observations.
+
+A schema lists, for every observation array, which fields of the raw observation dict
+fill it, with their defaults, entity caps and dtype. ObservationSchema compiles it once
+into a straight-line Python function specialised to those fields (no per-field loops or
+lookups in schema tables), which CustomGameEnv then calls on every step:
+
+    schema = ObservationSchema([
+        ScalarArray("player_location", (Field(("player_location", "x")), Field(("player_location", "y")))),
+        EntityArray("nearby_npcs_info", "nearby_npcs", cap=3,
+                    columns=(Field(("id",), -1), Field(("location", "x"), -1)), names="npc_names"),
+    ])
+    obs, names = schema.empty()
+    malformed = schema.parse(raw_obs, obs, names)
+
+Field paths are one key, or a parent dict and a key in it; a missing or non-dict parent
+yields the field's default. Entities that are not dicts are skipped and counted, so the
+caller can report them once per observation.
+
+An EntityArray with `nearest_to` keeps, when the list has more than `cap` entities, the
+`cap` entities whose "location" is nearest that location (e.g. the player's) instead of
+the first ones, still in list order. Lists within the cap are parsed as they are.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Field:
+    """One value read from the raw observation (or from an entity in an entity list)."""
+    path: Tuple[str, ...]  # ("player_max_health",) or ("location", "x")
+    default: float = 0
+
+
+@dataclass(frozen=True)
+class ScalarArray:
+    """Observation array with one element per top-level field."""
+    key: str
+    fields: Tuple[Field, ...]
+    dtype: Any = np.float32
+    fill: float = 0  # Value of every element when the observation is unusable
+
+    @property
+    def shape(self):
+        return (len(self.fields),)
+
+
+@dataclass(frozen=True)
+class EntityArray:
+    """Observation array with one row per entity of a list, up to `cap` entities."""
+    key: str
+    source: str                   # Key of the entity list in the raw observation
+    cap: int
+    columns: Tuple[Field, ...]    # One column per field; a single column gives a 1-D array
+    dtype: Any = np.float32
+    fill: float = -1              # Padding for slots without an entity
+    names: Optional[str] = None   # Info key collecting each entity's "name"
+    nearest_to: Optional[str] = None  # Raw key of an {"x", "y"} location; over the cap keep the nearest
+
+    @property
+    def shape(self):
+        return (self.cap,) if len(self.columns) == 1 else (self.cap, len(self.columns))
+
+
+def _distance_sq(entity, x, y):
+    try:
+        location = entity["location"]
+        return (location["x"] - x) ** 2 + (location["y"] - y) ** 2
+    except (KeyError, TypeError):  # Not a dict, no location, or no usable x/y
+        return float('inf')
+
+
+def _nearest_entities(items, origin, k):
+    """The k entities of `items` nearest `origin`, in list order (the first k without an origin)."""
+    if not isinstance(origin, dict):
+        return items
+    x, y = origin.get("x", 0), origin.get("y", 0)
+    dist_sq = [_distance_sq(e, x, y) for e in items]
+    # Partial sort, O(n log k); equal distances keep list order, as nearest_k() does
+    return [items[i] for i in sorted(heapq.nsmallest(k, range(len(items)), key=dist_sq.__getitem__))]
+
+
+def _field_expr(variable, field, parents, convert):
+    if len(field.path) == 1:
+        return f"{convert}({variable}.get({field.path[0]!r}, {field.default!r}))"
+    if len(field.path) == 2:
+        return f"{convert}({parents[field.path[0]]}.get({field.path[1]!r}, {field.default!r}))"
+    raise ValueError(f"Field paths are at most two keys deep: {field.path}")
+
+
+def _parent_lines(variable, fields, indent, prefix):
+    """Bind each parent dict used by `fields` to a local (an empty dict if missing or malformed)."""
+    parents = {}
+    lines = []
+    for field in fields:
+        if len(field.path) == 2 and field.path[0] not in parents:
+            local = f"{prefix}{len(parents)}"
+            parents[field.path[0]] = local
+            lines.append(f"{indent}{local} = {variable}.get({field.path[0]!r})")
+            lines.append(f"{indent}if not isinstance({local}, dict): {local} = _EMPTY")
+    return parents, lines
+
+
+class ObservationSchema:
+    """Compiles a list of ScalarArray/EntityArray specs into an observation parser."""
+
+    def __init__(self, arrays):
+        self.arrays = tuple(arrays)
+        self.source = self._generate()
+        namespace = {"_EMPTY": {}, "_nearest_entities": _nearest_entities}
+        exec(compile(self.source, "<observation_schema>", "exec"), namespace)
+        self.parse = namespace["parse"]
+
+    def empty(self):
+        """Fresh padded observation arrays and entity-name lists: (obs, names)."""
+        obs = {spec.key: np.full(spec.shape, spec.fill, dtype=spec.dtype) for spec in self.arrays}
+        return obs, self._empty_names()
+
+    def empty_batch(self, size):
+        """Padded (size, ...) arrays, plus one (obs, names) per row whose arrays are views into them."""
+        batch = {spec.key: np.full((size,) + spec.shape, spec.fill, dtype=spec.dtype) for spec in self.arrays}
+        rows = [({key: array[i] for key, array in batch.items()}, self._empty_names()) for i in range(size)]
+        return batch, rows
+
+    def _empty_names(self):
+        return {spec.names: [""] * spec.cap for spec in self.arrays
+                if isinstance(spec, EntityArray) and spec.names}
+
+    def clear(self, obs, names):
+        """Reset arrays and name lists from empty() to their padding values in place."""
+        for spec in self.arrays:
+            obs[spec.key].fill(spec.fill)
+        for name_list in names.values():
+            for i in range(len(name_list)):
+                name_list[i] = ""
+
+    def validate(self, observation_space):
+        """Raise ValueError if the schema's arrays do not match a gymnasium Dict space."""
+        for spec in self.arrays:
+            space = observation_space[spec.key]
+            if tuple(space.shape) != spec.shape or np.dtype(space.dtype) != np.dtype(spec.dtype):
+                raise ValueError(f"Schema for {spec.key!r} is {spec.shape} {np.dtype(spec.dtype)}, "
+                                 f"observation space is {space.shape} {space.dtype}")
+
+    def _generate(self):
+        lines = ["def parse(raw, obs, names):",
+                 "    malformed = 0"]
+        for n, spec in enumerate(self.arrays):
+            convert = "int" if np.issubdtype(np.dtype(spec.dtype), np.integer) else "float"
+            if isinstance(spec, ScalarArray):
+                parents, parent_lines = _parent_lines("raw", spec.fields, "    ", f"p{n}_")
+                lines += parent_lines
+                values = ", ".join(_field_expr("raw", field, parents, convert) for field in spec.fields)
+                lines.append(f"    obs[{spec.key!r}][:] = ({values},)")
+            else:
+                parents, parent_lines = _parent_lines("e", spec.columns, "            ", f"p{n}_")
+                values = ", ".join(_field_expr("e", field, parents, convert) for field in spec.columns)
+                row = values if len(spec.columns) == 1 else f"({values})"
+                # Rows are collected in a list and written with a single numpy assignment
+                fill_row = spec.fill if len(spec.columns) == 1 else (spec.fill,) * len(spec.columns)
+                lines += [f"    items = raw.get({spec.source!r})",
+                          f"    if items:"]
+                if spec.nearest_to:
+                    lines += [f"        if len(items) > {spec.cap}:",
+                              f"            items = _nearest_entities(items, raw.get({spec.nearest_to!r}), {spec.cap})"]
+                lines.append(f"        rows = []")
+                if spec.names:
+                    lines.append(f"        out_names = names[{spec.names!r}]")
+                lines += [f"        for i, e in enumerate(items[:{spec.cap}]):",
+                          f"            if not isinstance(e, dict):",
+                          f"                malformed += 1",
+                          f"                rows.append({fill_row!r})",
+                          f"                continue"]
+                lines += parent_lines
+                lines.append(f"            rows.append({row})")
+                if spec.names:
+                    lines.append(f"            out_names[i] = e.get('name', 'Unknown')")
+                lines.append(f"        obs[{spec.key!r}][:len(rows)] = rows")
+        lines.append("    return malformed")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,91 @@
+"""
+Negotiated payload compression for AIBridge messages.
+
+A compressed frame is wrapped in a small envelope:
+    magic "MZC1", codec id (u8) of the body, accepted codec id (u8) for the reply, body
+
+Once a codec is negotiated the client wraps every request, so the bridge knows it may
+compress the reply; bodies below the size threshold travel uncompressed (codec id 0).
+The bridge only wraps replies it actually compresses. zlib is always available; lz4 and
+zstd are used when their packages are installed on both ends.
+"""
+
+import time
+import zlib
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+COMPRESSION_MAGIC = b"MZC1"
+ENVELOPE_SIZE = len(COMPRESSION_MAGIC) + 2
+DEFAULT_COMPRESSION_THRESHOLD = 1024  # bytes
+
+CODEC_NONE = 0
+# name -> (codec id, compress, decompress)
+CODECS = {"zlib": (1, lambda data: zlib.compress(data, 1), zlib.decompress)}
+if LZ4_AVAILABLE:
+    CODECS["lz4"] = (2, lz4.frame.compress, lz4.frame.decompress)
+if ZSTD_AVAILABLE:
+    CODECS["zstd"] = (3, zstandard.ZstdCompressor(level=1).compress, zstandard.ZstdDecompressor().decompress)
+_CODECS_BY_ID = {codec_id: (name, decompress) for name, (codec_id, _, decompress) in CODECS.items()}
+
+# Preferred first when negotiating
+CODEC_PREFERENCE = ("zstd", "lz4", "zlib")
+
+
+def choose_codec(bridge_codecs, requested="auto"):
+    """Pick the codec to use given the bridge's advertised list, or None if there is no match."""
+    candidates = CODEC_PREFERENCE if requested == "auto" else (requested,)
+    for name in candidates:
+        if name in CODECS and name in bridge_codecs:
+            return name
+    return None
+
+
+def is_compressed_frame(frame):
+    return bytes(frame[:4]) == COMPRESSION_MAGIC
+
+
+def wrap_frame(payload, codec, threshold=DEFAULT_COMPRESSION_THRESHOLD, accept=None):
+    """Wrap `payload` in an envelope, compressing it with `codec` if it is at least `threshold` bytes.
+
+    `accept` is the codec the receiver may use for its reply (defaults to `codec`).
+    Returns (frame, codec time in ms; 0.0 when the payload was not compressed).
+    """
+    codec_id, compress, _ = CODECS[codec]
+    accept_id = CODECS[accept][0] if accept else codec_id
+    if len(payload) < threshold:
+        return bytes((*COMPRESSION_MAGIC, CODEC_NONE, accept_id)) + payload, 0.0
+    start = time.perf_counter()
+    body = compress(payload)
+    codec_time_ms = (time.perf_counter() - start) * 1000
+    return bytes((*COMPRESSION_MAGIC, codec_id, accept_id)) + body, codec_time_ms
+
+
+def unwrap_frame(frame):
+    """Undo wrap_frame(). Returns (payload, accepted codec name or None, codec time in ms).
+
+    Raises ValueError for an unknown codec or a corrupt body.
+    """
+    codec_id, accept_id = frame[4], frame[5]
+    accept = _CODECS_BY_ID[accept_id][0] if accept_id in _CODECS_BY_ID else None
+    body = memoryview(frame)[ENVELOPE_SIZE:]  # Decompressors read the body without a copy
+    if codec_id == CODEC_NONE:
+        return bytes(body), accept, 0.0
+    if codec_id not in _CODECS_BY_ID:
+        raise ValueError(f"Unsupported compression codec id: {codec_id}")
+    start = time.perf_counter()
+    try:
+        payload = _CODECS_BY_ID[codec_id][1](body)
+    except Exception as e:
+        raise ValueError(f"Corrupt compressed frame: {e}") from e
+    return payload, accept, (time.perf_counter() - start) * 1000
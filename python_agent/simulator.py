@@ -0,0 +1,457 @@
+"""
+Offline goblin-combat simulator with CustomGameEnv's spaces, actions and reward.
+
+Training against the live game runs at about one step per game tick. The simulator models
+a simplified version of the same task in NumPy, one step per tick: goblins that fight back,
+die, drop bones and respawn; food that heals; walking between GOBLIN_AREA_WAYPOINTS; death
+and respawn at Lumbridge. Rollouts, hyperparameter sweeps and debugging run offline:
+
+    env = SimulatedGameEnv(seed=0)                  # A CustomGameEnv over an in-process bridge
+    envs = SimulatedVectorEnv(num_envs=64, seed=0)  # Batched NumPy version, for throughput
+
+SimulatedGameEnv is a CustomGameEnv whose client is a SimulatedBridge, so its action
+handlers, observation parsing, _calculate_reward and metrics are the real ones.
+SimulatedVectorEnv steps every env at once with vectorized versions of the handlers and
+the reward; with the same seed and actions both produce the same observations and rewards.
+"""
+
+import copy
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from custom_env import (CustomGameEnv, OBSERVATION_SCHEMA, make_observation_space, MAX_INVENTORY_ITEMS,
+                        MAX_GROUND_ITEMS, MAX_NEARBY_NPCS, BONE_ITEM_ID, GOBLIN_NPC_ID, FOOD_ITEM_IDS,
+                        EAT_HEALTH_THRESHOLD_PERCENTAGE, GOBLIN_AREA_WAYPOINTS, NUM_PRIMITIVE_ACTIONS,
+                        MACRO_ACTIONS)
+from step_trace import DEFAULT_TRACE_CAPACITY
+
+# --- Simulation rules ---
+RESPAWN_LOCATION = (3222, 3218, 0)  # Lumbridge, out of sight of the goblins
+PLAYER_MAX_HEALTH = 10
+PLAYER_PRAYER = 1
+PLAYER_HIT_CHANCE = 0.6
+PLAYER_MAX_HIT = 2
+GOBLIN_MAX_HEALTH = 5
+GOBLIN_HIT_CHANCE = 0.25
+GOBLIN_MAX_HIT = 1
+GOBLIN_RESPAWN_TICKS = 10
+GROUND_ITEM_DESPAWN_TICKS = 100
+VIEW_DISTANCE = 15         # Tiles (Chebyshev) within which goblins show up in observations
+RUN_TILES_PER_TICK = 2
+FOOD_HEALING = {315: 3, 2140: 3, 2309: 5}  # Shrimp, chicken, bread
+STARTING_INVENTORY = (315, 315, 2140, 2309, -1)
+ITEM_NAMES = {315: "Shrimps", 2140: "Cooked chicken", 2309: "Bread", BONE_ITEM_ID: "Bones"}
+PLAYER_ATTACK_ANIMATION = 422
+PLAYER_EAT_ANIMATION = 829
+GOBLIN_ATTACK_ANIMATION = 6184
+# One stationary goblin next to each waypoint
+GOBLIN_SPAWNS = np.array([(x + 2, y + 1) for x, y, _ in GOBLIN_AREA_WAYPOINTS], dtype=np.int32)
+
+assert len(STARTING_INVENTORY) == MAX_INVENTORY_ITEMS and len(GOBLIN_SPAWNS) <= MAX_NEARBY_NPCS
+
+
+class GoblinCombatSim:
+    """State and rules of `num_envs` independent simulated games, advanced together.
+
+    A tick is begin_tick(), any of eat()/attack()/walk() (each takes a mask of the envs
+    doing it and returns where it succeeded), then advance().
+    """
+
+    def __init__(self, num_envs=1, seed=None):
+        self.num_envs = num_envs
+        self.rng = np.random.default_rng(seed)
+        num_goblins = len(GOBLIN_SPAWNS)
+        self._envs = np.arange(num_envs)
+        self.health = np.zeros(num_envs, dtype=np.int32)
+        self.position = np.zeros((num_envs, 2), dtype=np.int32)
+        self.destination = np.zeros((num_envs, 2), dtype=np.int32)
+        self.walking = np.zeros(num_envs, dtype=np.bool_)
+        self.target = np.full(num_envs, -1, dtype=np.int64)  # Goblin being fought, -1 for none
+        self.animation = np.full(num_envs, -1, dtype=np.int32)
+        self.inventory = np.zeros((num_envs, MAX_INVENTORY_ITEMS), dtype=np.int32)
+        self.goblin_health = np.zeros((num_envs, num_goblins), dtype=np.int32)
+        self.goblin_respawn = np.zeros((num_envs, num_goblins), dtype=np.int32)  # Ticks until back; 0 alive
+        self.goblin_fighting = np.zeros((num_envs, num_goblins), dtype=np.bool_)
+        self.ground = np.zeros((num_envs, MAX_GROUND_ITEMS, 4), dtype=np.int32)  # id, quantity, x, y
+        self.ground_age = np.zeros((num_envs, MAX_GROUND_ITEMS), dtype=np.int32)
+        self.tick = 0
+        self.reset()
+
+    def seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, mask=None):
+        """Start new games (all, or where `mask` is set)."""
+        mask = slice(None) if mask is None else mask
+        self._respawn_player(mask)
+        self.goblin_health[mask] = GOBLIN_MAX_HEALTH
+        self.goblin_respawn[mask] = 0
+        self.goblin_fighting[mask] = False
+        self.ground[mask] = -1
+        self.ground_age[mask] = 0
+
+    def _respawn_player(self, mask):
+        self.health[mask] = PLAYER_MAX_HEALTH
+        self.position[mask] = RESPAWN_LOCATION[:2]
+        self.walking[mask] = False
+        self.target[mask] = -1
+        self.animation[mask] = -1
+        self.inventory[mask] = STARTING_INVENTORY
+
+    def _goblin_distance(self):
+        return np.abs(GOBLIN_SPAWNS[None, :, :] - self.position[:, None, :]).max(axis=2)
+
+    def visible_goblins(self):
+        """(num_envs, goblins) mask of living goblins in view."""
+        return (self.goblin_respawn == 0) & (self._goblin_distance() <= VIEW_DISTANCE)
+
+    def has_food(self):
+        return np.isin(self.inventory, FOOD_ITEM_IDS).any(axis=1)
+
+    def begin_tick(self):
+        """Respawn players who died last tick (with their starting inventory) and clear animations."""
+        dead = self.health <= 0
+        if dead.any():
+            self._respawn_player(dead)
+        self.animation[:] = -1
+
+    def eat(self, mask):
+        """Eat the first food in the inventory."""
+        is_food = np.isin(self.inventory, FOOD_ITEM_IDS)
+        ok = mask & is_food.any(axis=1)
+        envs = np.flatnonzero(ok)
+        if len(envs):
+            slots = is_food[envs].argmax(axis=1)
+            items = self.inventory[envs, slots]
+            healing = np.zeros(len(envs), dtype=np.int32)
+            for item_id, amount in FOOD_HEALING.items():
+                healing[items == item_id] = amount
+            self.health[envs] = np.minimum(PLAYER_MAX_HEALTH, self.health[envs] + healing)
+            self.inventory[envs, slots] = -1
+            self.inventory[envs] = _compact(self.inventory[envs], self.inventory[envs] == -1)
+            self.animation[envs] = PLAYER_EAT_ANIMATION
+        return ok
+
+    def attack(self, mask):
+        """Start fighting the nearest goblin in view."""
+        visible = self.visible_goblins()
+        ok = mask & visible.any(axis=1)
+        distance = np.where(visible, self._goblin_distance(), np.iinfo(np.int32).max)
+        self.target[ok] = distance[ok].argmin(axis=1)
+        self.walking[ok] = False
+        return ok
+
+    def walk(self, mask, destination):
+        """Walk towards destination[i] (x, y) for every env i in `mask`."""
+        self.destination[mask] = destination[mask]
+        self.walking[mask] = True
+        self.target[mask] = -1
+        return mask.copy()
+
+    def advance(self):
+        """Move, fight, kill, drop and respawn for one game tick."""
+        envs = self._envs
+        fighting = self.target >= 0
+        target = np.where(fighting, self.target, 0)
+        fighting &= self.goblin_respawn[envs, target] == 0
+        self.target[~fighting] = -1
+
+        # Run towards the target (until adjacent) or the walk destination
+        goal = np.where(fighting[:, None], GOBLIN_SPAWNS[target], self.destination)
+        delta = goal - self.position
+        in_reach = fighting & (np.abs(delta).max(axis=1) <= 1)
+        moving = (fighting | self.walking) & ~in_reach
+        self.position[moving] += np.clip(delta[moving], -RUN_TILES_PER_TICK, RUN_TILES_PER_TICK)
+        self.walking &= (self.position != self.destination).any(axis=1)
+
+        # Trade hits with the target
+        player_hits = in_reach & (self.rng.random(self.num_envs) < PLAYER_HIT_CHANCE)
+        goblin_hits = in_reach & (self.rng.random(self.num_envs) < GOBLIN_HIT_CHANCE)
+        self.goblin_health[envs, target] -= np.where(player_hits, self.rng.integers(1, PLAYER_MAX_HIT + 1,
+                                                                                    self.num_envs), 0)
+        self.health -= np.where(goblin_hits, self.rng.integers(1, GOBLIN_MAX_HIT + 1, self.num_envs), 0)
+        np.maximum(self.health, 0, out=self.health)
+        self.animation[in_reach] = PLAYER_ATTACK_ANIMATION
+        self.goblin_fighting[:] = False
+        self.goblin_fighting[envs[in_reach], target[in_reach]] = True
+        self.target[self.health <= 0] = -1
+
+        # Respawns, then this tick's kills (at most one per env: the target)
+        respawning = self.goblin_respawn > 0
+        self.goblin_respawn[respawning] -= 1
+        self.goblin_health[respawning & (self.goblin_respawn == 0)] = GOBLIN_MAX_HEALTH
+        killed = (self.goblin_health <= 0) & (self.goblin_respawn == 0)
+        killed_envs, killed_goblins = np.nonzero(killed)
+        if len(killed_envs):
+            self.goblin_respawn[killed] = GOBLIN_RESPAWN_TICKS
+            self.goblin_fighting[killed] = False
+            self.target[killed_envs] = -1
+            self._drop_bones(killed_envs, GOBLIN_SPAWNS[killed_goblins])
+
+        self.ground_age += 1
+        self.ground[(self.ground_age > GROUND_ITEM_DESPAWN_TICKS) & (self.ground[:, :, 0] != -1)] = -1
+        self.tick += 1
+
+    def _drop_bones(self, envs, locations):
+        # First free slot, or the oldest item when the ground is full
+        free = self.ground[envs, :, 0] == -1
+        slots = np.where(free.any(axis=1), free.argmax(axis=1), self.ground_age[envs].argmax(axis=1))
+        self.ground[envs, slots, 0] = BONE_ITEM_ID
+        self.ground[envs, slots, 1] = 1
+        self.ground[envs, slots, 2:] = locations
+        self.ground_age[envs, slots] = 0
+
+    def write_observations(self, obs):
+        """Fill batched (num_envs, ...) observation arrays, as OBSERVATION_SCHEMA would from the bridge."""
+        stats = obs["player_stats"]
+        stats[:, 0] = self.health
+        stats[:, 1] = PLAYER_MAX_HEALTH
+        stats[:, 2:4] = PLAYER_PRAYER
+        stats[:, 4] = 100.0
+        obs["player_location"][:, :2] = self.position
+        obs["player_location"][:, 2] = RESPAWN_LOCATION[2]
+        obs["player_animation"][:, 0] = self.animation
+
+        # Goblins in view first, in spawn order
+        visible = self.visible_goblins()
+        order = np.argsort(~visible, axis=1, kind="stable")
+        shown = np.take_along_axis(visible, order, axis=1)
+        npcs = obs["nearby_npcs_info"]
+        num_goblins = len(GOBLIN_SPAWNS)
+        npcs[:, num_goblins:] = -1
+        npcs[:, :num_goblins, 0] = np.where(shown, GOBLIN_NPC_ID, -1)
+        npcs[:, :num_goblins, 1] = np.where(shown, GOBLIN_SPAWNS[order, 0], -1)
+        npcs[:, :num_goblins, 2] = np.where(shown, GOBLIN_SPAWNS[order, 1], -1)
+        animation = np.where(np.take_along_axis(self.goblin_fighting, order, axis=1), GOBLIN_ATTACK_ANIMATION, -1)
+        npcs[:, :num_goblins, 3] = np.where(shown, animation, -1)
+
+        obs["inventory_item_ids"][:] = self.inventory
+        obs["nearby_ground_items_info"][:] = _compact(self.ground, self.ground[:, :, 0] == -1)
+
+    def observation_dict(self, i):
+        """Env i's state as a bridge observation reply (JSON-shaped dict)."""
+        x, y = (int(v) for v in self.position[i])
+        visible = self.visible_goblins()[i]
+        return {
+            "player_current_health": int(self.health[i]),
+            "player_max_health": PLAYER_MAX_HEALTH,
+            "player_current_prayer": PLAYER_PRAYER,
+            "player_max_prayer": PLAYER_PRAYER,
+            "player_run_energy_percentage": 100.0,
+            "player_animation": int(self.animation[i]),
+            "player_location": {"x": x, "y": y, "plane": RESPAWN_LOCATION[2]},
+            "game_tick": self.tick,
+            "nearby_npcs": [
+                {"name": "Goblin", "id": GOBLIN_NPC_ID,
+                 "animation": GOBLIN_ATTACK_ANIMATION if self.goblin_fighting[i, g] else -1,
+                 "location": {"x": int(gx), "y": int(gy), "plane": RESPAWN_LOCATION[2]}}
+                for g, (gx, gy) in enumerate(GOBLIN_SPAWNS) if visible[g]
+            ],
+            "inventory": [{"id": int(item_id), "name": ITEM_NAMES.get(int(item_id), "Unknown"), "quantity": 1}
+                          for item_id in self.inventory[i] if item_id != -1],
+            "nearby_ground_items": [
+                {"id": int(item_id), "name": ITEM_NAMES.get(int(item_id), "Unknown"), "quantity": int(quantity),
+                 "location": {"x": int(gx), "y": int(gy), "plane": RESPAWN_LOCATION[2]}}
+                for item_id, quantity, gx, gy in self.ground[i] if item_id != -1
+            ],
+        }
+
+
+def _compact(rows, empty):
+    """Move the non-empty entries of each row to its front, keeping their order."""
+    order = np.argsort(empty, axis=1, kind="stable")
+    if rows.ndim == 3:
+        order = order[:, :, None]
+    return np.take_along_axis(rows, order, axis=1)
+
+
+class SimulatedBridge:
+    """In-process stand-in for ZMQClient, backed by a one-env GoblinCombatSim.
+
+    Actions are applied as they arrive; the game tick advances on the first observation
+    requested after begin_tick() (SimulatedGameEnv.step() calls it), so render() and
+    repeated get_observation() calls don't move time forward.
+    """
+
+    def __init__(self, seed=None):
+        self.sim = GoblinCombatSim(1, seed)
+        self.capabilities = {"step", "action_batch"}
+        self.last_tick = self.sim.tick
+        self._tick_due = False
+        self._one = np.ones(1, dtype=np.bool_)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.sim.seed(seed)
+        self.sim.reset()
+        self._tick_due = False
+
+    def begin_tick(self):
+        self.sim.begin_tick()
+        self._tick_due = True
+
+    def get_capabilities(self, refresh=False):
+        return self.capabilities
+
+    def supports(self, capability):
+        return capability in self.capabilities
+
+    def get_observation(self, refresh=False):
+        if self._tick_due:
+            self.sim.advance()
+            self.last_tick = self.sim.tick
+            self._tick_due = False
+        return self.sim.observation_dict(0)
+
+    def execute_action(self, action_type, parameters):
+        if action_type == "attack_npc":
+            ok = parameters.get("npc_id") == GOBLIN_NPC_ID and self.sim.attack(self._one)[0]
+            message = "No goblin in range"
+        elif action_type == "interact_inventory":
+            ok = parameters.get("action") == "Eat" and parameters.get("item_id") in self.sim.inventory[0] \
+                and self.sim.eat(self._one)[0]
+            message = "Item not in inventory"
+        elif action_type == "walk_to":
+            self.sim.walk(self._one, np.array([[parameters["x"], parameters["y"]]], dtype=np.int32))
+            ok = True
+        else:
+            ok, message = False, f"Unknown action type: {action_type}"
+        if ok:
+            return {"status": "submitted", "action_type": action_type}
+        return {"status": "error", "message": message}
+
+    def execute_action_batch(self, actions):
+        results = [self.execute_action(action_type, parameters) for action_type, parameters in actions]
+        submitted = sum(result["status"] == "submitted" for result in results)
+        status = "submitted" if submitted == len(results) else "partial" if submitted else "error"
+        return {"status": status, "results": results}
+
+    def step(self, action_type, parameters, binary_observation=False):
+        return {"action_result": self.execute_action(action_type, parameters), "observation": self.get_observation()}
+
+    def close(self):
+        pass
+
+
+class SimulatedGameEnv(CustomGameEnv):
+    """CustomGameEnv playing against the simulator instead of a RuneLite bridge.
+
+    Everything but the transport is CustomGameEnv's own, including its per-step logging
+    and metrics. Use SimulatedVectorEnv when throughput matters.
+    """
+
+    def __init__(self, render_mode=None, macro_actions=False, seed=None, reuse_observation_buffers=False,
+                 verbose=True, trace_capacity=DEFAULT_TRACE_CAPACITY, skip_invalid_actions=False):
+        super().__init__(render_mode=render_mode, binary_observations=False, client=SimulatedBridge(seed),
+                         macro_actions=macro_actions, reuse_observation_buffers=reuse_observation_buffers,
+                         verbose=verbose, trace_capacity=trace_capacity, skip_invalid_actions=skip_invalid_actions)
+
+    def reset(self, seed=None, options=None):
+        self.client.reset(seed)
+        self.waypoint_index = 0
+        return super().reset(seed=seed, options=options)
+
+    def step(self, action):
+        self.client.begin_tick()
+        return super().step(action)
+
+    def _wait_ticks(self, ticks):
+        # Simulated ticks pass at once; only the last one is observed
+        for _ in range(ticks - 1):
+            self.client.sim.begin_tick()
+            self.client.sim.advance()
+        self.client.begin_tick()
+        return self.client.get_observation()
+
+
+class SimulatedVectorEnv(VectorEnv):
+    """Gymnasium VectorEnv running `num_envs` simulated games as one batch of NumPy arrays.
+
+    Action handlers and _calculate_reward are vectorized: each env decides from its last
+    observation exactly as CustomGameEnv's handlers do, and is rewarded as CustomGameEnv
+    would be for the bridge's replies. Like CustomGameEnv, episodes never end on their
+    own (wrap with a time limit for episodic training). Infos are empty. With copy=False
+    the returned arrays are overwritten by the next step.
+    """
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, num_envs=16, macro_actions=False, seed=None, copy=True):
+        self.num_envs = num_envs
+        self.copy = copy
+        self.sim = GoblinCombatSim(num_envs, seed)
+        macro_actions = MACRO_ACTIONS if macro_actions else []
+        self.single_observation_space = make_observation_space()
+        self.single_action_space = spaces.Discrete(NUM_PRIMITIVE_ACTIONS + len(macro_actions))
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        # Which primitive handlers each action runs (a macro runs several on the same observation)
+        self._action_primitives = np.zeros((self.single_action_space.n, NUM_PRIMITIVE_ACTIONS), dtype=np.bool_)
+        self._action_primitives[np.arange(NUM_PRIMITIVE_ACTIONS), np.arange(NUM_PRIMITIVE_ACTIONS)] = True
+        for i, (_, primitive_actions) in enumerate(macro_actions):
+            self._action_primitives[NUM_PRIMITIVE_ACTIONS + i, list(primitive_actions)] = True
+        self._waypoints = np.array([waypoint[:2] for waypoint in GOBLIN_AREA_WAYPOINTS], dtype=np.int32)
+        self.waypoint_index = np.zeros(num_envs, dtype=np.int64)
+        self._observations = OBSERVATION_SCHEMA.empty_batch(num_envs)[0]
+        self._food_ids = np.array(FOOD_ITEM_IDS, dtype=np.float32)
+
+    def reset(self, *, seed=None, options=None):
+        if seed is not None:
+            self.sim.seed(seed)
+        self.sim.reset()
+        self.waypoint_index[:] = 0
+        self.sim.write_observations(self._observations)
+        return self._observation_batch(), {}
+
+    def step(self, actions):
+        runs = self._action_primitives[np.asarray(actions)] & self._valid_primitives()
+        attack, eat, walk = runs[:, 0], runs[:, 1], runs[:, 2]
+        destination = self._waypoints[self.waypoint_index % len(self._waypoints)]
+        self.waypoint_index += walk
+
+        # Dispatch in handler order, then let the tick play out
+        self.sim.begin_tick()
+        eaten = self.sim.eat(eat)
+        attacked = self.sim.attack(attack)
+        walked = self.sim.walk(walk, destination)
+        self.sim.advance()
+        self.sim.write_observations(self._observations)
+
+        # _calculate_reward for the bridge replies: -0.1 per step, +0.1 when every action was
+        # submitted, -0.5 more when none was, and -100 for dying
+        sent = eat.astype(np.int8) + attack + walk
+        submitted = eaten.astype(np.int8) + attacked + walked
+        rewards = np.full(self.num_envs, -0.1)
+        rewards[(sent > 0) & (submitted == sent)] += 0.1
+        rewards[(sent > 0) & (submitted == 0)] -= 0.5
+        rewards[self.sim.health <= 0] = -100.0
+        terminations = np.zeros(self.num_envs, dtype=np.bool_)
+        return self._observation_batch(), rewards, terminations, terminations.copy(), {}
+
+    def _valid_primitives(self):
+        """(num_envs, primitives) mask of the handlers that would send a game action.
+
+        The handlers' decisions, from the last observation (see CustomGameEnv._attack_target
+        and _food_to_eat); moving and NOOP are always valid.
+        """
+        last = self._observations
+        stats = last["player_stats"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            low_health = (stats[:, 1] > 0) & (stats[:, 0] / stats[:, 1] <= EAT_HEALTH_THRESHOLD_PERCENTAGE)
+        npcs = last["nearby_npcs_info"]
+        location = last["player_location"]
+        goblin_in_view = ((npcs[:, :, 0] == GOBLIN_NPC_ID) & (npcs[:, :, 1] != -1) & (npcs[:, :, 2] != -1)).any(axis=1)
+        valid = np.ones((self.num_envs, NUM_PRIMITIVE_ACTIONS), dtype=np.bool_)
+        valid[:, 0] = goblin_in_view & ~((location[:, 0] == 0) & (location[:, 1] == 0))
+        valid[:, 1] = low_health & np.isin(last["inventory_item_ids"], self._food_ids).any(axis=1)
+        return valid
+
+    def action_masks(self):
+        """(num_envs, n) boolean mask of each env's valid actions, as CustomGameEnv.action_masks()."""
+        return (self._action_primitives[None] & self._valid_primitives()[:, None, :]).any(axis=2)
+
+    def _observation_batch(self):
+        return copy.deepcopy(self._observations) if self.copy else self._observations
@@ -0,0 +1,245 @@
+"""
+Binary step trace for CustomGameEnv and ZMQClient.
+
+Instead of printing every action decision and reward component, the env records them in a
+fixed-size ring of NumPy records (one row per event: time, episode, step, action, event
+code, and two numbers whose meaning depends on the event). Recording costs one row write;
+the ring keeps the last `capacity` events and can be written out on demand or when the
+process dies on an uncaught exception:
+
+    env = CustomGameEnv(verbose=False)            # no printing, trace only
+    env.trace.dump_on_crash("crash_trace.npy")
+    ...
+    env.trace.dump("trace.npy")
+
+    python step_trace.py trace.npy --last 50      # print a dump
+
+With verbose=True (the default) every event is also printed as the env used to.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_TRACE_CAPACITY = 4096
+
+TRACE_DTYPE = np.dtype([
+    ("time", "<f8"),      # time.time() of the event
+    ("episode", "<u4"),
+    ("step", "<u4"),      # Step the event belongs to (1 for the first step of an episode)
+    ("action", "<i4"),    # Discrete action of that step, -1 outside a step
+    ("event", "<u2"),     # One of the EVENT_* codes below
+    ("value", "<f4"),
+    ("detail", "<f4"),
+])
+
+# --- Event codes: (name, message printed in verbose mode, formatted with value/detail) ---
+EVENT_RESET = 1
+EVENT_MOVE = 2
+EVENT_NOOP = 3
+EVENT_UNKNOWN_ACTION = 4
+EVENT_MACRO = 5
+EVENT_HOLD = 6
+EVENT_ATTACK_NO_OBSERVATION = 10
+EVENT_ATTACK_NO_LOCATION = 11
+EVENT_ATTACK_NO_NPC_INFO = 12
+EVENT_ATTACK_TARGET = 13
+EVENT_ATTACK_NO_GOBLIN = 14
+EVENT_EAT_NO_OBSERVATION = 20
+EVENT_EAT_NO_STATS = 21
+EVENT_EAT_INVALID_MAX_HEALTH = 22
+EVENT_EAT_NO_INVENTORY = 23
+EVENT_EAT_FOOD = 24
+EVENT_EAT_NO_FOOD = 25
+EVENT_REWARD_ACTION_ERROR = 30
+EVENT_REWARD_NO_GOBLIN = 31
+EVENT_REWARD_NO_FOOD = 32
+EVENT_REWARD_HEALTH_SUFFICIENT = 33
+EVENT_REWARD_ATTACK = 34
+EVENT_REWARD_EAT_HEALED = 35
+EVENT_REWARD_EAT_NOT_HEALED = 36
+EVENT_REWARD_MOVE = 37
+EVENT_REWARD_NOOP = 38
+EVENT_REWARD_DEATH = 39
+EVENT_REWARD_TOTAL = 40
+EVENT_OBSERVATION_DECODE_ERROR = 50
+EVENT_OBSERVATION_ERROR_REPLY = 51
+EVENT_OBSERVATION_PARSE_ERROR = 52
+EVENT_OBSERVATION_UNEXPECTED_ERROR = 53
+EVENT_ZMQ_TIMEOUT = 60
+EVENT_ZMQ_ERROR = 61
+EVENT_ZMQ_UNEXPECTED_ERROR = 62
+EVENT_ZMQ_DECOMPRESS_ERROR = 63
+EVENT_ZMQ_JSON_ERROR = 64
+
+TRACE_EVENTS = {
+    EVENT_RESET: ("reset", "Environment reset."),
+    EVENT_MOVE: ("move", "Env Action: Move to waypoint ({value:.0f}, {detail:.0f})"),
+    EVENT_NOOP: ("noop", "Env Action: NOOP"),
+    EVENT_UNKNOWN_ACTION: ("unknown_action", "Unknown action discrete value: {value:.0f}"),
+    EVENT_MACRO: ("macro", "Env Action: Macro {value:.0f} -> {detail:.0f} game actions"),
+    EVENT_HOLD: ("hold", "Env Action: Hold for {value:.0f} ticks"),
+    EVENT_ATTACK_NO_OBSERVATION: ("attack_no_observation", "Attack: No last_observation available."),
+    EVENT_ATTACK_NO_LOCATION: ("attack_no_location",
+                               "Attack: Player location not available or uninitialized in last_observation."),
+    EVENT_ATTACK_NO_NPC_INFO: ("attack_no_npc_info", "Attack: No NPC info in last_observation."),
+    EVENT_ATTACK_TARGET: ("attack_target", "Attack: Found Goblin (ID: {value:.0f}). Min distance: {detail:.2f}"),
+    EVENT_ATTACK_NO_GOBLIN: ("attack_no_goblin", "Attack: No suitable Goblin found nearby."),
+    EVENT_EAT_NO_OBSERVATION: ("eat_no_observation", "Eat Food: No last_observation available."),
+    EVENT_EAT_NO_STATS: ("eat_no_stats", "Eat Food: Player stats not available or incomplete in last_observation."),
+    EVENT_EAT_INVALID_MAX_HEALTH: ("eat_invalid_max_health", "Eat Food: Max health is zero or invalid."),
+    EVENT_EAT_NO_INVENTORY: ("eat_no_inventory", "Eat Food: Inventory info not available in last_observation."),
+    EVENT_EAT_FOOD: ("eat_food", "Eat Food: Health {detail:.0f} is low. Found food (ID: {value:.0f}). "
+                                 "Attempting to eat."),
+    EVENT_EAT_NO_FOOD: ("eat_no_food", "Eat Food: Health {detail:.0f} is low, but no suitable food found in inventory."),
+    EVENT_REWARD_ACTION_ERROR: ("reward_action_error", "Reward: Penalized for action error ({value:+.2f})."),
+    EVENT_REWARD_NO_GOBLIN: ("reward_no_goblin",
+                             "Reward: Penalized for trying to attack with no suitable goblin ({value:+.2f})."),
+    EVENT_REWARD_NO_FOOD: ("reward_no_food", "Reward: Penalized for trying to eat with no food ({value:+.2f})."),
+    EVENT_REWARD_HEALTH_SUFFICIENT: ("reward_health_sufficient",
+                                     "Reward: Penalized for trying to eat with sufficient health ({value:+.2f})."),
+    EVENT_REWARD_ATTACK: ("reward_attack", "Reward: Bonus for submitting attack ({value:+.2f})."),
+    EVENT_REWARD_EAT_HEALED: ("reward_eat_healed",
+                              "Reward: Bonus for eating and increasing health by {detail:.0f} ({value:+.2f})."),
+    EVENT_REWARD_EAT_NOT_HEALED: ("reward_eat_not_healed",
+                                  "Reward: Eat submitted, but no health increase observed ({value:+.2f})."),
+    EVENT_REWARD_MOVE: ("reward_move", "Reward: Bonus for moving to waypoint ({value:+.2f})."),
+    EVENT_REWARD_NOOP: ("reward_noop", "Reward: NOOP action, neutral reward."),
+    EVENT_REWARD_DEATH: ("reward_death", "Reward: Large penalty for player death."),
+    EVENT_REWARD_TOTAL: ("reward_total", "Final Reward for step: {value}"),
+    EVENT_OBSERVATION_DECODE_ERROR: ("observation_decode_error",
+                                     "Warning: Failed to decode binary observation. Using default observation."),
+    EVENT_OBSERVATION_ERROR_REPLY: ("observation_error_reply",
+                                    "Warning: Error or no data in received observation. Using default observation."),
+    EVENT_OBSERVATION_PARSE_ERROR: ("observation_parse_error",
+                                    "Warning: Type or value error while processing observation data."),
+    EVENT_OBSERVATION_UNEXPECTED_ERROR: ("observation_unexpected_error",
+                                         "Warning: Unexpected error while processing observation data."),
+    EVENT_ZMQ_TIMEOUT: ("zmq_timeout", "Timeout waiting for reply."),
+    EVENT_ZMQ_ERROR: ("zmq_error", "ZMQError during communication."),
+    EVENT_ZMQ_UNEXPECTED_ERROR: ("zmq_unexpected_error", "Unexpected error during communication."),
+    EVENT_ZMQ_DECOMPRESS_ERROR: ("zmq_decompress_error", "Failed to decompress reply."),
+    EVENT_ZMQ_JSON_ERROR: ("zmq_json_error", "Failed to decode JSON reply."),
+}
+
+# action_status["status"] values, stored in the detail of EVENT_REWARD_TOTAL (0: anything else)
+ACTION_STATUS_CODES = {"submitted": 1, "partial": 2, "error": 3, "not_executed": 4, "no_response": 5, "skipped": 6,
+                       "held": 7}
+_ACTION_STATUS_NAMES = {code: status for status, code in ACTION_STATUS_CODES.items()}
+
+_crash_dumps = []  # (StepTrace, path) pairs written by the excepthook
+_previous_excepthook = None
+
+
+class StepTrace:
+    """Fixed-size ring of TRACE_DTYPE records; the newest `capacity` events are kept.
+
+    The owner calls begin_step() once per step and record() for every event of the step.
+    Not locked: events recorded from two threads at once may overwrite each other.
+    """
+
+    def __init__(self, capacity=DEFAULT_TRACE_CAPACITY, verbose=True):
+        if capacity < 1:
+            raise ValueError("Trace capacity must be at least 1")
+        self.capacity = capacity
+        self.verbose = verbose
+        self._records = np.zeros(capacity, dtype=TRACE_DTYPE)
+        self._written = 0  # Events recorded since creation (or clear())
+        self.episode = 0
+        self.step = 0
+        self.action = -1
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def begin_step(self, episode, step, action):
+        """Tag the following events with this episode, step and action."""
+        self.episode = episode
+        self.step = step
+        self.action = action
+
+    def record(self, event, value=0.0, detail=0.0, message=None):
+        """Append an event; in verbose mode also print `message` (or the event's own message)."""
+        self._records[self._written % self.capacity] = (
+            time.time(), self.episode, self.step, self.action, event, value, detail)
+        self._written += 1
+        if self.verbose:
+            print(message if message is not None else TRACE_EVENTS[event][1].format(value=value, detail=detail))
+
+    @property
+    def dropped(self):
+        """Events overwritten because the ring was full."""
+        return max(0, self._written - self.capacity)
+
+    def events(self):
+        """Copy of the kept events, oldest first."""
+        if self._written <= self.capacity:
+            return self._records[:self._written].copy()
+        start = self._written % self.capacity
+        return np.concatenate((self._records[start:], self._records[:start]))
+
+    def clear(self):
+        self._written = 0
+
+    def dump(self, path):
+        """Write the kept events to a .npy file (read back with load_trace())."""
+        np.save(path, self.events())
+
+    def dump_on_crash(self, path):
+        """Dump this trace to `path` if the process exits on an uncaught exception."""
+        global _previous_excepthook
+        if _previous_excepthook is None:
+            _previous_excepthook = sys.excepthook
+            sys.excepthook = _dump_traces
+        _crash_dumps.append((self, path))
+
+
+def _dump_traces(exc_type, exc, tb):
+    for trace, path in _crash_dumps:
+        try:
+            trace.dump(path)
+            print(f"Step trace ({len(trace)} events) written to {path}", file=sys.stderr)
+        except Exception as e:
+            print(f"Failed to write step trace to {path}: {e}", file=sys.stderr)
+    _previous_excepthook(exc_type, exc, tb)
+
+
+def load_trace(path):
+    """Events written by StepTrace.dump()."""
+    events = np.load(path)
+    if events.dtype != TRACE_DTYPE:
+        raise ValueError(f"Not a step trace: {path}")
+    return events
+
+
+def format_event(event):
+    """One trace record as a line of text."""
+    code = int(event["event"])
+    name, message = TRACE_EVENTS.get(code, (f"event_{code}", ""))
+    value, detail = float(event["value"]), float(event["detail"])
+    if code == EVENT_REWARD_TOTAL:
+        text = f"Final Reward for step: {value:.2f} ({_ACTION_STATUS_NAMES.get(int(detail), 'other')})"
+    else:
+        text = message.format(value=value, detail=detail)
+    stamp = time.strftime("%H:%M:%S", time.localtime(float(event["time"])))
+    return (f"{stamp} ep {int(event['episode'])} step {int(event['step'])} "
+            f"action {int(event['action'])} {name}: {text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a step trace written by StepTrace.dump()")
+    parser.add_argument("trace")
+    parser.add_argument("--last", type=int, default=None, help="Only the last N events")
+    args = parser.parse_args()
+
+    events = load_trace(args.trace)
+    if args.last is not None:
+        events = events[-args.last:]
+    for event in events:
+        print(format_event(event))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import Mock
+
+from action_repeat import ActionRepeat
+from simulator import SimulatedGameEnv
+
+
+class TestActionRepeat(unittest.TestCase):
+    """Test held actions on the offline simulator."""
+
+    def test_holds_attacks(self):
+        """Test held attacks send one action per decision and stop early when the state changes."""
+        env = ActionRepeat(SimulatedGameEnv(seed=3, verbose=False), repeat=4)
+        bridge = env.unwrapped.client
+        try:
+            _, info = env.reset(seed=3)
+            for _ in range(10):  # Walk to the goblins
+                _, _, _, _, info = env.step(2)
+            bridge.execute_action = Mock(wraps=bridge.execute_action)
+            decisions, interrupted = 0, 0
+            while env.unwrapped.current_step < 200:
+                _, _, _, _, info = env.step(0 if info["action_mask"][0] else 2)
+                decisions += 1
+                self.assertLessEqual(info["held_steps"], 3)
+                interrupted += info["interrupted"]
+            self.assertEqual(bridge.execute_action.call_count, decisions)
+            self.assertLess(decisions, (200 - 10) / 2)
+            self.assertTrue(0 < interrupted < decisions)
+        finally:
+            env.close()
+
+    def test_without_interrupt(self):
+        """Test a hold without an interrupt observes once for all its ticks and sums the rewards."""
+        env = ActionRepeat(SimulatedGameEnv(seed=0, verbose=False), repeat=5, interrupt=None)
+        try:
+            env.reset(seed=0)
+            tick = env.unwrapped.client.sim.tick
+            _, reward, _, _, info = env.step(2)
+            self.assertEqual(env.unwrapped.client.sim.tick, tick + 5)
+            self.assertEqual(info["held_steps"], 1)
+            self.assertEqual(env.unwrapped.current_step, 2)
+            self.assertEqual(info["action_status"], {"status": "held"})
+            self.assertAlmostEqual(reward, -0.4)  # Submitted walk (0.0), then the step cost for 4 held ticks
+            _, _, _, _, info = env.step(1)  # Eating at full health is declined: not held
+            self.assertEqual(info["held_steps"], 0)
+        finally:
+            env.close()
+
+        # Checking every tick (an interrupt that never fires) earns the same reward
+        checked = ActionRepeat(SimulatedGameEnv(seed=0, verbose=False), repeat=5, interrupt=lambda *args: False)
+        try:
+            checked.reset(seed=0)
+            _, checked_reward, _, _, info = checked.step(2)
+            self.assertEqual(info["held_steps"], 4)
+            self.assertAlmostEqual(checked_reward, reward)
+        finally:
+            checked.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
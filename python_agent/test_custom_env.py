@@ -1,18 +1,26 @@
+import os
+import tempfile
 import unittest
 import numpy as np
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 # Important: Add python_agent to sys.path if tests are run from root or another directory
 # For simplicity, assume tests might be run from within python_agent directory or PYTHONPATH is set.
 # If running with `python -m unittest discover ./python_agent` from root, imports should work.
 try:
-    from custom_env import CustomGameEnv, MAX_NEARBY_NPCS, MAX_INVENTORY_ITEMS, MAX_GROUND_ITEMS, BONE_ITEM_ID
+    from custom_env import (CustomGameEnv, MAX_NEARBY_NPCS, MAX_INVENTORY_ITEMS, MAX_GROUND_ITEMS, BONE_ITEM_ID,
+                            INVENTORY_SIZE, FOOD_ITEM_IDS, copy_observation)
+    from observation_codec import encode_observation
+    import step_trace
 except ImportError:
     # Fallback for running directly from python_agent or if path issues occur
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from custom_env import CustomGameEnv, MAX_NEARBY_NPCS, MAX_INVENTORY_ITEMS, MAX_GROUND_ITEMS, BONE_ITEM_ID
+    from custom_env import (CustomGameEnv, MAX_NEARBY_NPCS, MAX_INVENTORY_ITEMS, MAX_GROUND_ITEMS, BONE_ITEM_ID,
+                            INVENTORY_SIZE, FOOD_ITEM_IDS, copy_observation)
+    from observation_codec import encode_observation
+    import step_trace
 
 
 class TestCustomGameEnv(unittest.TestCase):
@@ -24,6 +32,7 @@ class TestCustomGameEnv(unittest.TestCase):
         # Instantiate the environment, replacing its client with the mock
         self.env = CustomGameEnv()
         self.env.client = self.mock_zmq_client
+        self.mock_zmq_client.supports.return_value = False
         
         # Provide a default observation for reset to populate last_observation
         self.mock_zmq_client.get_observation.return_value = self._get_default_raw_obs()
@@ -79,6 +88,54 @@ class TestCustomGameEnv(unittest.TestCase):
         self.assertEqual(info["ground_item_names"][0], "Bones")
 
 
+    def test_get_obs_binary_matches_json(self):
+        raw_obs = self._get_default_raw_obs()
+        raw_obs["player_animation"] = 422
+        raw_obs["nearby_npcs"] = [
+            {"id": 125 + i, "name": "Goblin", "animation": i, "location": {"x": 3201 + i, "y": 3199, "plane": 0}}
+            for i in range(MAX_NEARBY_NPCS + 2)  # More than the cap
+        ]
+        raw_obs["inventory"] = [{"id": BONE_ITEM_ID, "name": "Bones", "quantity": 3}]
+        raw_obs["nearby_ground_items"] = [{"id": BONE_ITEM_ID, "name": "Bones", "quantity": 1, "location": {"x": 3202, "y": 3202, "plane": 0}}]
+
+        json_obs = self.env._get_obs(raw_obs)
+        binary_obs = self.env._get_obs(encode_observation(raw_obs))
+
+        for key in json_obs:
+            np.testing.assert_array_equal(binary_obs[key], json_obs[key], err_msg=key)
+            self.assertEqual(binary_obs[key].dtype, json_obs[key].dtype)
+
+    def test_entity_caps_keep_nearest(self):
+        env = CustomGameEnv(client=self.mock_zmq_client, max_npcs=2, max_inventory_items=INVENTORY_SIZE)
+        self.assertEqual(env.observation_space["nearby_npcs_info"].shape, (2, 4))
+        self.assertEqual(env.observation_space["inventory_item_ids"].shape, (INVENTORY_SIZE,))
+        raw_obs = self._get_default_raw_obs()  # Player at (3200, 3200)
+        offsets = [9, 4, 7, 1, 4, 12]
+        raw_obs["nearby_npcs"] = [
+            {"id": 100 + i, "name": f"Npc {i}", "animation": -1, "location": {"x": 3200 + d, "y": 3200, "plane": 0}}
+            for i, d in enumerate(offsets)
+        ]
+        raw_obs["nearby_npcs"].insert(0, {"id": 99, "name": "Nowhere", "animation": -1})  # No location
+        raw_obs["inventory"] = [{"id": 1000 + i, "name": "Item", "quantity": 1} for i in range(INVENTORY_SIZE)]
+
+        json_obs = env._get_obs(raw_obs)
+        # The two nearest (offsets 1, then the first of the tied 4s), in the order the bridge sent them
+        self.assertEqual(json_obs["nearby_npcs_info"][:, 0].tolist(), [101, 103])
+        self.assertEqual(env._get_info()["npc_names"], ["Npc 1", "Npc 3"])
+        self.assertEqual(json_obs["inventory_item_ids"][-1], 1000 + INVENTORY_SIZE - 1)
+        binary_obs = env._get_obs(encode_observation(raw_obs))
+        for key in json_obs:
+            np.testing.assert_array_equal(binary_obs[key], json_obs[key], err_msg=key)
+
+        first_env = CustomGameEnv(client=self.mock_zmq_client, max_npcs=2, nearest_entities=False)
+        self.assertEqual(first_env._get_obs(raw_obs)["nearby_npcs_info"][:, 0].tolist(), [99, 100])
+
+    def test_get_obs_binary_malformed(self):
+        payload = encode_observation(self._get_default_raw_obs())
+        obs = self.env._get_obs(payload[:-4])  # Truncated payload
+        self.assertTrue(np.all(obs["player_stats"] == 0))
+        self.assertTrue(np.all(obs["nearby_npcs_info"] == -1.0))
+
     def test_get_obs_missing_keys(self):
         raw_obs = {"status": "success", "player_current_health": 90} # Missing many keys
         self.mock_zmq_client.get_observation.return_value = raw_obs
@@ -87,6 +144,189 @@ class TestCustomGameEnv(unittest.TestCase):
         self.assertEqual(obs["player_stats"][1], 0) # Default for max_health
         self.assertTrue(np.all(obs["player_location"] == 0.0))
 
+    def test_get_obs_malformed_entities_reported_once(self):
+        raw_obs = self._get_default_raw_obs()
+        raw_obs["nearby_npcs"] = ["not an npc", {"id": 125, "name": "Goblin", "animation": -1}, 7]
+        with patch("custom_env.record_error") as record_error:
+            obs = self.env._get_obs(raw_obs)
+        record_error.assert_called_once_with("OBSERVATION_FORMAT_ERROR", "2 malformed entities in observation")
+        self.assertTrue(np.all(obs["nearby_npcs_info"][0] == -1.0))
+        self.assertEqual(obs["nearby_npcs_info"][1, 0], 125)
+        self.assertEqual(obs["nearby_npcs_info"][1, 1], -1.0)  # No location
+        self.assertEqual(self.env._get_info()["npc_names"], ["", "Goblin", ""])
+
+    def test_reused_observation_buffers(self):
+        env = CustomGameEnv(client=self.mock_zmq_client, reuse_observation_buffers=True)
+        observations = []
+        for health in (90, 80, 70, 60):
+            raw_obs = self._get_default_raw_obs()
+            raw_obs["player_current_health"] = health
+            observations.append(raw_obs)
+        self.mock_zmq_client.get_observation.side_effect = observations
+
+        first, _ = env.reset()
+        second = env.step(3)[0]
+        self.assertIsNot(second, first)
+        self.assertEqual(first["player_stats"][0], 90)  # Previous observation is still intact
+        kept = copy_observation(second)
+
+        third = env.step(3)[0]
+        self.assertIs(third, first)  # Buffers alternate
+        self.assertEqual(second["player_stats"][0], 80)
+        env.step(3)
+        self.assertEqual(third["player_stats"][0], 70)
+        self.assertEqual(kept["player_stats"][0], 80)
+
+    def test_render_shows_last_observation(self):
+        env = CustomGameEnv(client=self.mock_zmq_client, reuse_observation_buffers=True, render_mode="human")
+        self.mock_zmq_client.get_observation.return_value = self._get_default_raw_obs()
+        first, info = env.reset()
+        second, _, _, _, info = env.step(3)
+        self.mock_zmq_client.get_observation.reset_mock()
+        with patch("builtins.print") as mock_print:
+            env.render()
+        self.mock_zmq_client.get_observation.assert_not_called()
+        self.assertIn(f"  player_stats: {second['player_stats'].tolist()}",
+                      [call.args[0] for call in mock_print.call_args_list])
+        self.assertIs(env._get_info(), info)  # The step's info is left alone
+        self.assertEqual(first["player_stats"][0], 100)  # The spare buffer is untouched
+
+    def test_step_trace_without_printing(self):
+        env = CustomGameEnv(client=self.mock_zmq_client, verbose=False, trace_capacity=4)
+        raw_obs = self._get_default_raw_obs()
+        raw_obs["nearby_npcs"] = [{"id": 125, "name": "Goblin", "animation": -1, "location": {"x": 3203, "y": 3204, "plane": 0}}]
+        self.mock_zmq_client.get_observation.return_value = raw_obs
+        self.mock_zmq_client.execute_action.return_value = {"status": "submitted"}
+        with patch("builtins.print") as mock_print:
+            env.reset()
+            env.step(0)
+            env.step(3)
+        mock_print.assert_not_called()
+
+        events = env.trace.events()  # Ring of 4 keeps the newest events, oldest first
+        self.assertEqual(env.trace.dropped, 1)
+        self.assertEqual(events["event"].tolist(),
+                         [step_trace.EVENT_ATTACK_TARGET, step_trace.EVENT_REWARD_TOTAL,
+                          step_trace.EVENT_NOOP, step_trace.EVENT_REWARD_TOTAL])
+        self.assertEqual(events["step"].tolist(), [1, 1, 2, 2])
+        self.assertEqual(events["action"].tolist(), [0, 0, 3, 3])
+        self.assertEqual(events[0]["value"], 125)
+        self.assertAlmostEqual(float(events[0]["detail"]), 5.0)
+        self.assertEqual(events[1]["detail"], step_trace.ACTION_STATUS_CODES["submitted"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.npy")
+            env.trace.dump(path)
+            self.assertTrue(np.array_equal(step_trace.load_trace(path), events))
+
+    def test_action_masks_and_skipped_steps(self):
+        env = CustomGameEnv(client=self.mock_zmq_client, skip_invalid_actions=True, verbose=False)
+        _, info = env.reset()  # Full health, no NPCs
+        self.assertEqual(env.action_masks().tolist(), [False, False, True, True])
+        self.assertEqual(info["action_mask"].tolist(), [False, False, True, True])
+
+        self.mock_zmq_client.get_observation.reset_mock()
+        obs, reward, _, _, info = env.step(0)
+        self.mock_zmq_client.execute_action.assert_not_called()
+        self.mock_zmq_client.get_observation.assert_not_called()
+        self.assertEqual(info["action_status"], {"status": "skipped"})
+        self.assertAlmostEqual(reward, -0.1)
+        self.assertEqual(env.current_step, 1)
+        for key in obs:
+            np.testing.assert_array_equal(obs[key], env.last_observation[key])
+
+        raw_obs = self._get_default_raw_obs()
+        raw_obs["player_current_health"] = 10
+        raw_obs["nearby_npcs"] = [{"id": 125, "name": "Goblin", "animation": -1, "location": {"x": 3203, "y": 3204, "plane": 0}}]
+        raw_obs["inventory"] = [{"id": FOOD_ITEM_IDS[0], "name": "Food", "quantity": 1}]
+        self.mock_zmq_client.get_observation.return_value = raw_obs
+        self.mock_zmq_client.execute_action.return_value = {"status": "submitted"}
+        _, _, _, _, info = env.step(3)  # NOOP always reaches the bridge
+        self.assertEqual(info["action_mask"].tolist(), [True, True, True, True])
+        env.step(1)
+        self.mock_zmq_client.execute_action.assert_called_once()
+
+
+    def test_declined_step_refreshes_observation(self):
+        self.assertIsNone(CustomGameEnv().client.observation_cache_ms)  # The env's own client doesn't cache
+        self.mock_zmq_client.get_observation.reset_mock()
+        self.env.step(0)  # No goblin: nothing is sent to the bridge
+        self.mock_zmq_client.execute_action.assert_not_called()
+        self.mock_zmq_client.get_observation.assert_called_once_with(refresh=True)
+
+    def test_hold_waits_for_tick_without_sending(self):
+        self.mock_zmq_client.supports.side_effect = lambda capability: capability == "tick_sync"
+        self.mock_zmq_client.last_tick = 10
+        self.mock_zmq_client.wait_for_tick.return_value = self._get_default_raw_obs()
+        obs, reward, _, _, info = self.env.hold(0, ticks=3)
+        self.mock_zmq_client.wait_for_tick.assert_called_once_with(13, binary_observation=False)
+        self.mock_zmq_client.execute_action.assert_not_called()
+        self.assertEqual(info["action_status"], {"status": "held"})
+        self.assertAlmostEqual(reward, -0.3)  # The step cost for each tick
+        self.assertEqual(obs["player_stats"][0], 100)
+
+    def test_hold_learns_the_tick_from_the_stream(self):
+        self.mock_zmq_client.stream_port = 5560  # No tick_sync, but stream snapshots carry their tick
+        self.mock_zmq_client.last_tick = None
+
+        def wait_for_tick(tick, binary_observation=False):
+            self.mock_zmq_client.last_tick = 20 if tick is None else tick
+            return self._get_default_raw_obs()
+
+        self.mock_zmq_client.wait_for_tick.side_effect = wait_for_tick
+        with patch("custom_env.time.sleep") as mock_sleep:
+            _, reward, _, _, _ = self.env.hold(0, ticks=3)
+        mock_sleep.assert_not_called()
+        self.assertEqual([c.args[0] for c in self.mock_zmq_client.wait_for_tick.call_args_list], [None, 22])
+        self.assertAlmostEqual(reward, -0.3)
+
+    def test_held_noop_costs_what_stepped_noops_do(self):
+        self.mock_zmq_client.stream_port = None  # No tick_sync and no stream: the ticks are slept out
+        with patch("custom_env.time.sleep") as mock_sleep, \
+                patch.object(self.env.metrics, "record_warning") as record_warning:
+            _, held_reward, _, _, _ = self.env.hold(3, ticks=2)
+            self.env.hold(3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        record_warning.assert_called_once()
+        self.mock_zmq_client.wait_for_tick.assert_not_called()
+        _, stepped_reward, _, _, _ = self.env.step(3)
+        self.assertAlmostEqual(held_reward, 2 * stepped_reward)
+        self.assertAlmostEqual(stepped_reward, -0.1)
+
+    def test_held_attack_is_rewarded_as_attack(self):
+        raw_obs = self._get_default_raw_obs()
+        raw_obs["nearby_npcs"] = [{"id": 125, "name": "Goblin", "animation": -1, "location": {"x": 3201, "y": 3201, "plane": 0}}]
+        self.mock_zmq_client.get_observation.return_value = raw_obs
+        self.env.reset()
+        self.mock_zmq_client.execute_action.return_value = {"status": "submitted"}
+        self.mock_zmq_client.last_tick = None
+        self.mock_zmq_client.stream_port = None
+        with patch.object(self.env, "_calculate_reward", wraps=self.env._calculate_reward) as calculate_reward, \
+                patch("custom_env.time.sleep"):
+            self.env.step(0)
+            self.env.hold(0)
+        stepped, held = calculate_reward.call_args_list
+        self.assertEqual(stepped.args[5], "attack_npc")  # action_taken
+        self.assertEqual(held.args[5], stepped.args[5])
+        self.assertEqual(held.args[1], {"action_taken": "attack_npc"})  # action_specific_reward_info
+
+    def test_step_macro_action_without_batch_support(self):
+        env = CustomGameEnv(client=self.mock_zmq_client, macro_actions=True)
+        raw_obs = self._get_default_raw_obs()
+        raw_obs["player_current_health"] = 30
+        raw_obs["nearby_npcs"] = [{"id": 125, "name": "Goblin", "animation": -1, "location": {"x": 3201, "y": 3201, "plane": 0}}]
+        raw_obs["inventory"] = [{"id": 315, "name": "Shrimps", "quantity": 1}]
+        self.mock_zmq_client.get_observation.return_value = raw_obs
+        env.reset()
+        self.mock_zmq_client.execute_action.return_value = {"status": "submitted"}
+
+        _, _, _, _, info = env.step(4) # eat_then_attack
+
+        # Bridge lacks "action_batch": one execute_action per game action, in order
+        self.assertEqual([c[0][0] for c in self.mock_zmq_client.execute_action.call_args_list],
+                         ["interact_inventory", "attack_npc"])
+        self.assertEqual(info["action_status"]["status"], "submitted")
+        self.assertEqual(len(info["action_status"]["results"]), 2)
 
     def test_step_action_mapping_type_string(self):
         # self.env.last_observation is already populated by setUp's reset call
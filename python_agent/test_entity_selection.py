@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+
+from entity_selection import GridIndex, id_table, nearest_entity, nearest_k, first_matching_item
+
+
+class TestEntitySelection(unittest.TestCase):
+    """Test vectorized target/item selection and the grid index against brute force."""
+
+    def test_nearest_entity_matches_scan(self):
+        """Test nearest_entity picks what a first-to-last scan would, padding excluded."""
+        rng = np.random.default_rng(0)
+        goblins = id_table([125])
+        for count in (1, 3, 100, 1000):
+            npcs = np.column_stack([rng.choice([125, 3000, -1], count),
+                                    rng.integers(3190, 3211, (count, 2))]).astype(np.float32)
+            npcs[rng.random(count) < 0.1, 1] = -1  # Some goblins without a location
+            expected, expected_dist_sq = None, float('inf')
+            for i, (npc_id, x, y) in enumerate(npcs):
+                dist_sq = (3200 - x) ** 2 + (3200 - y) ** 2
+                if npc_id == 125 and x != -1 and y != -1 and dist_sq < expected_dist_sq:
+                    expected, expected_dist_sq = i, dist_sq
+            self.assertEqual(nearest_entity(npcs[:, 0], npcs[:, 1:3], (3200, 3200), goblins),
+                             (expected, expected_dist_sq))
+
+    def test_first_matching_item(self):
+        """Test the first item from the id table is found and padding never matches."""
+        food = id_table([315, 2140, 2309])
+        self.assertEqual(first_matching_item(np.array([-1, 1511, 2140, 315], dtype=np.float32), food), 2)
+        self.assertIsNone(first_matching_item(np.full(28, -1, dtype=np.float32), food))
+        self.assertIsNone(first_matching_item(np.full(3, -1, dtype=np.float32), id_table([-1])))
+
+    def test_nearest_k(self):
+        """Test the k smallest are kept in index order, ties to the lower index."""
+        dist_sq = np.array([9.0, 4.0, np.inf, 1.0, 4.0, 0.0, 4.0])
+        self.assertEqual(nearest_k(dist_sq, 3).tolist(), [1, 3, 5])
+        self.assertEqual(nearest_k(dist_sq, 5).tolist(), [1, 3, 4, 5, 6])
+        self.assertEqual(nearest_k(dist_sq, 10).tolist(), list(range(7)))
+        rng = np.random.default_rng(2)
+        dist_sq = rng.integers(0, 50, 1000).astype(np.float64)
+        expected = np.sort(np.lexsort((np.arange(1000), dist_sq))[:28])
+        np.testing.assert_array_equal(nearest_k(dist_sq, 28), expected)
+
+    def test_grid_index_matches_brute_force(self):
+        """Test radius and nearest queries agree with a full scan."""
+        rng = np.random.default_rng(1)
+        positions = rng.integers(3150, 3251, (500, 2)).astype(np.float32)
+        positions[:10] = -1  # Padding rows are not indexed
+        mask = rng.random(500) < 0.5
+        index = GridIndex(positions, cell_size=8, mask=mask)
+        valid = mask & (positions[:, 0] != -1)
+        self.assertEqual(len(index), valid.sum())
+        for x, y in rng.integers(3100, 3301, (50, 2)):
+            dist_sq = ((positions - (x, y)) ** 2).sum(axis=1)
+            within = np.flatnonzero(valid & (dist_sq <= 12 ** 2))
+            np.testing.assert_array_equal(index.query_radius(x, y, 12), within)
+            candidates = np.where(valid, dist_sq, np.inf)
+            self.assertEqual(index.nearest(x, y), (int(np.argmin(candidates)), float(candidates.min())))
+        self.assertEqual(GridIndex(positions, mask=np.zeros(500, bool)).nearest(3200, 3200), (None, float('inf')))
+
+
+if __name__ == '__main__':
+    unittest.main()
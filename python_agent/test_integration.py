@@ -4,26 +4,63 @@ Tests the full communication pipeline and environment functionality.
 """
 
 import pytest
+import asyncio
 import time
 import json
 import zmq
 import threading
 from unittest.mock import Mock, patch
-from custom_env import CustomGameEnv
-from zmq_client import ZMQClient
+from custom_env import CustomGameEnv, AsyncCustomGameEnv
+from zmq_client import ZMQClient, CIRCUIT_CLOSED, CIRCUIT_OPEN, GAME_TICK_MS, loads_json
+from monitoring import get_metrics_collector, initialize_monitoring
+from async_zmq_client import AsyncZMQClient
+from zmq_client_pool import ZMQClientPool
+from observation_codec import encode_observation
+from observation_delta import encode_observation_delta
+from payload_compression import CODECS, is_compressed_frame, unwrap_frame, wrap_frame
+from bridge_recording import ReplayServer, read_recording
+
+
+def free_port():
+    """A port nothing is bound to right now, for servers that need to know theirs up front."""
+    context = zmq.Context()
+    socket = context.socket(zmq.REP)
+    try:
+        port = socket.bind_to_random_port("tcp://127.0.0.1")
+    finally:
+        socket.close(linger=0)
+        context.term()
+    return port
 
 
 class MockZMQServer:
     """Mock ZMQ server to simulate the Java AIBridge plugin for testing."""
     
-    def __init__(self, port=5556):  # Use different port to avoid conflicts
+    def __init__(self, port=0, publish_port=None, publish_interval=0.6):
+        # Port 0 binds a free ephemeral port (read it back from self.port after start())
         self.port = port
         self.context = None
         self.socket = None
+        self.publisher_context = None
+        self.publisher_socket = None
         self.running = False
         self.thread = None
         self.responses = {}
         self.received_messages = []
+        self.response_delay = 0.0  # Seconds to wait before replying (simulates a slow bridge)
+        # Publisher mode: push the current observation every publish_interval seconds
+        self.publish_port = publish_port
+        self.publish_interval = publish_interval
+        self.publish_binary = False
+        self.tick = 0
+        self.tick_interval = 0.02  # Simulated game tick length for wait_for_tick
+        self.publisher_thread = None
+        # Delta mode: observations sent so far, keyed by sequence number
+        self.delta_sequence = 0
+        self.delta_history = {}
+        # Replies at least this large are compressed for clients that negotiated a codec
+        self.compression_threshold = 1024
+        self.received_compressed = 0
         
     def setup_default_responses(self):
         """Set up default mock responses for testing."""
@@ -61,54 +98,160 @@ class MockZMQServer:
             "status": "submitted",
             "action_type": "test_action"
         }
+        
+        self.responses["command:get_capabilities"] = {
+            "status": "ok",
+            "capabilities": ["step", "binary_observation", "delta_observation", "compression",
+                             "action_batch", "tick_sync"],
+            "compression_codecs": sorted(CODECS)
+        }
+        if self.publish_port is not None:
+            self.responses["command:get_capabilities"]["capabilities"].append("observation_stream")
+            self.responses["command:get_capabilities"]["observation_stream_port"] = self.publish_port
     
+    @staticmethod
+    def _bind(socket, port):
+        if port:
+            socket.bind(f"tcp://*:{port}")
+            return port
+        return socket.bind_to_random_port("tcp://*")
+
     def start(self):
-        """Start the mock server in a separate thread."""
+        """Bind the sockets, then serve them from separate threads."""
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.REP)
+        self.socket.setsockopt(zmq.RCVTIMEO, 100)  # Short timeout so stop() is quick
+        self.port = self._bind(self.socket, self.port)
+        if self.publish_port is not None:
+            self.publisher_context = zmq.Context()
+            self.publisher_socket = self.publisher_context.socket(zmq.PUB)
+            self.publisher_socket.setsockopt(zmq.LINGER, 0)
+            self.publish_port = self._bind(self.publisher_socket, self.publish_port)
         self.setup_default_responses()
         self.running = True
         self.thread = threading.Thread(target=self._server_loop)
         self.thread.start()
+        if self.publish_port is not None:
+            self.publisher_thread = threading.Thread(target=self._publisher_loop)
+            self.publisher_thread.start()
         time.sleep(0.1)  # Give server time to start
         
     def stop(self):
         """Stop the mock server."""
         self.running = False
+        # The server threads close their own sockets; closing them from here races recv()
         if self.thread:
-            self.thread.join(timeout=1)
-        if self.socket:
-            self.socket.close()
-        if self.context:
-            self.context.term()
+            self.thread.join(timeout=3)
+        if self.publisher_thread:
+            self.publisher_thread.join(timeout=3)
             
     def _server_loop(self):
         """Main server loop handling ZMQ messages."""
         try:
-            self.context = zmq.Context()
-            self.socket = self.context.socket(zmq.REP)
-            self.socket.bind(f"tcp://*:{self.port}")
-            self.socket.setsockopt(zmq.RCVTIMEO, 1000)  # 1 second timeout
-            
             while self.running:
                 try:
-                    message = self.socket.recv_string()
+                    frame = self.socket.recv()
+                    accept = None
+                    if is_compressed_frame(frame):
+                        self.received_compressed += 1
+                        frame, accept, _ = unwrap_frame(frame)
+                    message = frame.decode('utf-8')
                     self.received_messages.append(message)
                     
                     # Find matching response
                     response = None
-                    if message in self.responses:
+                    reply_frames = None
+                    if message == "command:get_observation_binary":
+                        reply_frames = [encode_observation(self.responses["command:get_observation"])]
+                    elif message.startswith("command:step_binary:"):
+                        reply_frames = [
+                            json.dumps(self.responses.get("command:execute_action:*")).encode('utf-8'),
+                            encode_observation(self.responses["command:get_observation"])
+                        ]
+                    elif message.startswith("command:get_observation_delta:"):
+                        response = self._observation_delta(message)
+                    elif message.startswith("command:wait_for_tick"):
+                        reply_frames = self._wait_for_tick(message)
+                    elif message in self.responses:
                         response = self.responses[message]
                     elif message.startswith("command:execute_action:"):
                         response = self.responses.get("command:execute_action:*")
+                    elif message.startswith("command:execute_action_batch:"):
+                        actions = json.loads(message.split(":", 2)[2])["actions"]
+                        response = {"status": "submitted",
+                                    "results": [self.responses.get("command:execute_action:*") for _ in actions]}
+                    elif message.startswith("command:step:"):
+                        response = {
+                            "action_result": self.responses.get("command:execute_action:*"),
+                            "observation": self.responses.get("command:get_observation")
+                        }
                     else:
                         response = {"status": "error", "message": f"Unknown command: {message}"}
                     
-                    self.socket.send_string(json.dumps(response))
+                    if reply_frames is None:
+                        reply_frames = [json.dumps(response).encode('utf-8')]
+                    if self.response_delay:
+                        time.sleep(self.response_delay)
+                    if accept is not None:
+                        reply_frames = [wrap_frame(f, accept)[0] if len(f) >= self.compression_threshold else f
+                                        for f in reply_frames]
+                    self.socket.send_multipart(reply_frames)
                     
                 except zmq.Again:
                     continue  # Timeout, check if still running
                     
         except Exception as e:
             print(f"Mock server error: {e}")
+        finally:
+            if self.socket:
+                self.socket.close()
+            if self.context:
+                self.context.term()
+
+    def _observation_delta(self, message):
+        """Diff the current observation against the one the client acknowledged."""
+        last_sequence = json.loads(message.split("command:get_observation_delta:", 1)[1])["last_sequence"]
+        # Round-trip through JSON so later edits to self.responses don't alter the history
+        current = json.loads(json.dumps(self.responses["command:get_observation"]))
+        self.delta_sequence += 1
+        self.delta_history[self.delta_sequence] = current
+        base = self.delta_history.get(last_sequence)
+        if base is None:
+            return {"sequence": self.delta_sequence, "full": True, "observation": current}
+        return encode_observation_delta(base, current, self.delta_sequence, last_sequence)
+
+    def _wait_for_tick(self, message):
+        """Advance the simulated tick counter to the requested tick and reply with its observation."""
+        command, payload = message.split(":", 2)[1:]
+        target = json.loads(payload).get("tick", self.tick + 1)
+        if target > self.tick:
+            time.sleep((target - self.tick) * self.tick_interval)
+            self.tick = target
+        observation = dict(self.responses["command:get_observation"], game_tick=self.tick)
+        if command == "wait_for_tick_binary":
+            return [json.dumps({"status": "ok", "game_tick": self.tick}).encode('utf-8'),
+                    encode_observation(observation)]
+        return [json.dumps(observation).encode('utf-8')]
+
+    def _publisher_loop(self):
+        """Publish one observation snapshot per simulated game tick."""
+        socket = self.publisher_socket
+        try:
+            while self.running:
+                self.tick += 1
+                observation = self.responses["command:get_observation"]
+                header = {"tick": self.tick, "sequence": self.tick}
+                socket.send_multipart([
+                    b"observation",
+                    json.dumps(header).encode('utf-8'),
+                    encode_observation(observation) if self.publish_binary else json.dumps(observation).encode('utf-8')
+                ])
+                time.sleep(self.publish_interval)
+        except Exception as e:
+            print(f"Mock publisher error: {e}")
+        finally:
+            socket.close()
+            self.publisher_context.term()
 
 
 class TestZMQClient:
@@ -161,10 +304,203 @@ class TestZMQClient:
         assert action_data["action_type"] == "walk_to"
         assert action_data["parameters"]["x"] == 3100
     
+    def test_get_capabilities(self, zmq_client, mock_server):
+        """Test capability negotiation is queried once and cached."""
+        assert zmq_client.supports("step")
+        assert not zmq_client.supports("unknown_feature")
+        
+        capability_messages = [msg for msg in mock_server.received_messages
+                               if msg == "command:get_capabilities"]
+        assert len(capability_messages) == 1
+    
+    def test_get_capabilities_unsupported(self, mock_server):
+        """Test bridges without capability support fall back to an empty set."""
+        del mock_server.responses["command:get_capabilities"]
+        
+        client = ZMQClient(port=mock_server.port)
+        assert client.get_capabilities() == set()
+        assert not client.supports("step")
+        
+        client.close()
+    
+    def test_step(self, zmq_client, mock_server):
+        """Test combined action + observation round trip."""
+        result = zmq_client.step("walk_to", {"x": 3100, "y": 3100})
+        
+        assert result["action_result"]["status"] == "submitted"
+        assert result["observation"]["player_current_health"] == 75
+        
+        # Verify a single message carried the action
+        step_messages = [msg for msg in mock_server.received_messages
+                         if msg.startswith("command:step:")]
+        assert len(step_messages) == 1
+        assert "command:get_observation" not in mock_server.received_messages
+        
+        payload = json.loads(step_messages[0].split("command:step:", 1)[1])
+        assert payload["action_type"] == "walk_to"
+        assert payload["parameters"]["y"] == 3100
+    
+    def test_execute_action_batch(self, zmq_client, mock_server):
+        """Test several actions go out in one message with per-action results."""
+        result = zmq_client.execute_action_batch([
+            ("interact_inventory", {"item_id": 315, "action": "Eat"}),
+            ("attack_npc", {"npc_id": 125}),
+        ])
+        
+        assert result["status"] == "submitted"
+        assert [r["status"] for r in result["results"]] == ["submitted", "submitted"]
+        batch_messages = [msg for msg in mock_server.received_messages
+                          if msg.startswith("command:execute_action_batch:")]
+        assert len(batch_messages) == 1
+        actions = json.loads(batch_messages[0].split(":", 2)[2])["actions"]
+        assert [a["action_type"] for a in actions] == ["interact_inventory", "attack_npc"]
+    
+    def test_execute_action_batch_transport_error(self):
+        """Test a failed batch reports the error for every action."""
+        client = ZMQClient(port=free_port(), timeout_ms=100)
+        try:
+            result = client.execute_action_batch([("attack_npc", {"npc_id": 125}), ("walk_to", {"x": 1, "y": 2})])
+            assert result["status"] == "error"
+            assert len(result["results"]) == 2
+        finally:
+            client.close()
+    
+    def test_execute_action_batch_reply_not_an_object(self, zmq_client):
+        """Test a batch reply that is valid JSON but not an object is reported against every action."""
+        for reply in ([1, 2], "ok", None):
+            with patch.object(zmq_client, "send_command", return_value=reply):
+                result = zmq_client.execute_action_batch([("attack_npc", {"npc_id": 125}), ("walk_to", {"x": 1, "y": 2})])
+            assert result["status"] == "error" and "JSON object" in result["message"]
+            assert result["results"] == [{"status": "error", "message": result["message"]}] * 2
+    
+    def test_get_observation_binary(self, zmq_client, mock_server):
+        """Test fetching an observation in the binary wire format."""
+        payload = zmq_client.get_observation_binary()
+        
+        assert isinstance(payload, bytes)
+        assert payload == encode_observation(mock_server.responses["command:get_observation"])
+        assert "command:get_observation_binary" in mock_server.received_messages
+    
+    def test_step_binary(self, zmq_client, mock_server):
+        """Test combined step round trip with a binary observation frame."""
+        result = zmq_client.step("walk_to", {"x": 3100, "y": 3100}, binary_observation=True)
+        
+        assert result["action_result"]["status"] == "submitted"
+        assert isinstance(result["observation"], bytes)
+        assert any(msg.startswith("command:step_binary:") for msg in mock_server.received_messages)
+    
+    def test_phase_latency_stats(self, zmq_client, mock_server):
+        """Test each request phase is recorded in the latency histograms."""
+        zmq_client.get_observation()
+        zmq_client.execute_action("walk_to", {"x": 3200, "y": 3200})
+        
+        latency = zmq_client.get_connection_stats()["latency_ms"]
+        for phase in ("encode", "send", "wait", "decode", "parse", "total"):
+            assert latency[phase]["count"] == 2
+        assert latency["wait"]["p50"] <= latency["wait"]["p99"] <= latency["wait"]["max"]
+        assert latency["total"]["max"] >= latency["wait"]["max"]
+    
+    def test_observation_cache(self, mock_server):
+        """Test repeat observations within a tick are served locally until refreshed or invalidated."""
+        client = ZMQClient(port=mock_server.port, observation_cache_ms=GAME_TICK_MS)
+        try:
+            first = client.get_observation()
+            assert client.get_observation() == first
+            assert mock_server.received_messages.count("command:get_observation") == 1
+            
+            client.get_observation(refresh=True)
+            assert mock_server.received_messages.count("command:get_observation") == 2
+            
+            client.execute_action("walk_to", {"x": 3200, "y": 3200})
+            client.get_observation()
+            assert mock_server.received_messages.count("command:get_observation") == 3
+            
+            stats = client.get_connection_stats()
+            assert stats["observation_cache_hits"] == 1
+            assert stats["observation_cache_misses"] == 3
+            assert get_metrics_collector().get_observation_cache_stats()["hits"] >= 1
+        finally:
+            client.close()
+    
+    def test_wait_for_tick(self, zmq_client, mock_server):
+        """Test waiting for a game tick returns that tick's observation without polling."""
+        obs = zmq_client.wait_for_tick(5)
+        assert obs["game_tick"] == 5
+        assert zmq_client.last_tick == 5
+        
+        # A tick that already passed is answered at once with the current one
+        assert zmq_client.wait_for_tick(3)["game_tick"] == 5
+        assert zmq_client.wait_for_next_tick()["game_tick"] == 6
+        
+        assert isinstance(zmq_client.wait_for_next_tick(binary_observation=True), bytes)
+        assert zmq_client.last_tick == 7
+        assert len([m for m in mock_server.received_messages if m.startswith("command:wait_for_tick")]) == 4
+    
+    def test_loads_json_from_buffer(self, zmq_client):
+        """Test replies parse straight from a frame buffer and report the JSON backend."""
+        payload = json.dumps({"status": "ok", "values": [1, 2, 3]}).encode('utf-8')
+        assert loads_json(memoryview(payload)) == {"status": "ok", "values": [1, 2, 3]}
+        with pytest.raises(json.JSONDecodeError):
+            loads_json(memoryview(b"invalid json"))
+        assert zmq_client.get_connection_stats()["json_backend"] in ("orjson", "json")
+    
+    def test_dealer_mode_get_observation(self, mock_server):
+        """Test the pipelined client works against the plain REP bridge."""
+        client = ZMQClient(port=mock_server.port, mode="dealer")
+        
+        obs = client.get_observation()
+        assert obs["player_current_health"] == 75
+        result = client.execute_action("walk_to", {"x": 3100, "y": 3100})
+        assert result["status"] == "submitted"
+        
+        client.close()
+    
+    def test_dealer_mode_multiple_in_flight(self, mock_server):
+        """Test several requests can be in flight and are matched by id."""
+        client = ZMQClient(port=mock_server.port, mode="dealer")
+        
+        obs_id = client.submit("get_observation")
+        caps_id = client.submit("get_capabilities")
+        action_id = client.submit("execute_action", {"action_type": "walk_to", "parameters": {"x": 1, "y": 2}})
+        assert client.get_connection_stats()["in_flight_requests"] == 3
+        
+        # Collect out of order
+        assert client.get_reply(action_id)["status"] == "submitted"
+        assert "step" in client.get_reply(caps_id)["capabilities"]
+        assert client.get_reply(obs_id)["player_current_health"] == 75
+        assert client.get_connection_stats()["in_flight_requests"] == 0
+        
+        with pytest.raises(KeyError):
+            client.get_reply(obs_id)
+        
+        client.close()
+    
+    def test_dealer_mode_drops_late_replies(self, mock_server):
+        """Test a reply arriving after its request timed out is dropped, not misdelivered."""
+        client = ZMQClient(port=mock_server.port, mode="dealer", timeout_ms=100)
+        
+        mock_server.response_delay = 0.3
+        obs = client.get_observation()
+        assert obs["status"] == "error"
+        assert "timeout" in obs["message"].lower()
+        
+        mock_server.response_delay = 0.0
+        result = client.get_reply(client.submit("get_capabilities"), timeout_ms=2000)
+        assert "capabilities" in result  # Not the stale observation reply
+        assert client.late_replies_dropped == 1
+        assert client.connected
+        
+        client.close()
+    
+    def test_submit_requires_dealer_mode(self, zmq_client):
+        """Test submit() is rejected on the lockstep REQ client."""
+        with pytest.raises(RuntimeError):
+            zmq_client.submit("get_observation")
+    
     def test_connection_timeout(self):
         """Test client behavior on connection timeout."""
         # Try to connect to non-existent server
-        client = ZMQClient(port=9999)
+        client = ZMQClient(port=free_port())
         
         obs = client.get_observation()
         assert obs["status"] == "error"
@@ -172,6 +508,24 @@ class TestZMQClient:
         
         client.close()
     
+    def test_circuit_breaker_fails_fast(self):
+        """Test the circuit opens after repeated timeouts and later calls skip the network."""
+        client = ZMQClient(port=free_port(), timeout_ms=100, failure_threshold=2, backoff_initial_ms=60000)
+        try:
+            client.get_observation()
+            assert client.circuit_state == CIRCUIT_CLOSED
+            client.get_observation()
+            assert client.circuit_state == CIRCUIT_OPEN
+            
+            start = time.time()
+            obs = client.get_observation()
+            assert time.time() - start < 0.05
+            assert "circuit open" in obs["message"]
+            assert client.get_connection_stats()["fast_failures"] == 1
+            assert get_metrics_collector().get_connection_state_durations()[CIRCUIT_CLOSED] > 0
+        finally:
+            client.close()
+    
     def test_invalid_json_response(self, mock_server):
         """Test handling of invalid JSON response."""
         # Set up server to return invalid JSON
@@ -184,6 +538,546 @@ class TestZMQClient:
         assert "Failed to decode JSON" in obs["message"]
         
         client.close()
+    
+    def test_step_reply_not_an_object(self, mock_server):
+        """Test a step reply that is valid JSON but not an object comes back as an error on both halves."""
+        client = ZMQClient(port=mock_server.port)
+        try:
+            with patch.object(client, "send_command", return_value=[1, 2]):
+                result = client.step("walk_to", {"x": 3200, "y": 3200})
+            assert result["action_result"]["status"] == "error"
+            assert result["observation"] is result["action_result"]
+            assert "JSON object" in result["action_result"]["message"]
+        finally:
+            client.close()
+
+
+class TestObservationDelta:
+    """Test delta-encoded observations and client-side state reconstruction."""
+    
+    @pytest.fixture
+    def mock_server(self):
+        server = MockZMQServer()
+        server.start()
+        yield server
+        server.stop()
+    
+    @pytest.fixture
+    def zmq_client(self, mock_server):
+        client = ZMQClient(port=mock_server.port, delta_observations=True)
+        yield client
+        client.close()
+    
+    def _delta_requests(self, mock_server):
+        return [json.loads(msg.split(":", 2)[2]) for msg in mock_server.received_messages
+                if msg.startswith("command:get_observation_delta:")]
+    
+    def test_first_observation_is_full(self, zmq_client, mock_server):
+        """Test the client starts with a full resync and returns the complete dict."""
+        obs = zmq_client.get_observation()
+        
+        assert obs == mock_server.responses["command:get_observation"]
+        assert self._delta_requests(mock_server) == [{"last_sequence": 0}]
+        assert zmq_client.get_connection_stats()["delta_full_syncs"] == 1
+    
+    def test_delta_reconstructs_changes(self, zmq_client, mock_server):
+        """Test only changed fields/entities are sent and the full state is rebuilt."""
+        first = zmq_client.get_observation()
+        
+        current = mock_server.responses["command:get_observation"]
+        current["player_current_health"] = 60
+        current["nearby_npcs"][0]["location"] = {"x": 3202, "y": 3201, "plane": 0}
+        current["inventory"].pop()
+        second = zmq_client.get_observation()
+        
+        assert second == current
+        assert self._delta_requests(mock_server)[-1] == {"last_sequence": 1}
+        assert zmq_client.get_connection_stats()["delta_updates"] == 1
+        # Observations handed out earlier are not modified in place
+        assert first["player_current_health"] == 75
+        assert len(first["inventory"]) == 2
+    
+    def test_resync_after_timeout(self, zmq_client, mock_server):
+        """Test the client asks for a full observation again after losing a reply."""
+        zmq_client.get_observation()
+        zmq_client._handle_timeout("command:get_observation_delta")
+        obs = zmq_client.get_observation()
+        
+        assert obs == mock_server.responses["command:get_observation"]
+        assert self._delta_requests(mock_server)[-1] == {"last_sequence": 0}
+        assert zmq_client.get_connection_stats()["delta_full_syncs"] == 2
+    
+    def test_base_mismatch_triggers_resync(self, zmq_client, mock_server):
+        """Test a delta against a base the client doesn't hold falls back to a full sync."""
+        zmq_client.get_observation()
+        original = mock_server._observation_delta
+        
+        def wrong_base(message):
+            response = original(message)
+            if not response.get("full"):
+                response["base_sequence"] += 100
+            return response
+        
+        mock_server._observation_delta = wrong_base
+        obs = zmq_client.get_observation()
+        
+        assert obs == mock_server.responses["command:get_observation"]
+        assert self._delta_requests(mock_server)[-2:] == [{"last_sequence": 1}, {"last_sequence": 0}]
+        assert zmq_client.get_connection_stats()["delta_full_syncs"] == 2
+
+
+class TestZMQClientPool:
+    """Test routing across several bridge endpoints."""
+    
+    @pytest.fixture
+    def mock_servers(self):
+        servers = [MockZMQServer(), MockZMQServer()]
+        for server in servers:
+            server.start()
+        yield servers
+        for server in servers:
+            server.stop()
+    
+    def test_acquire_least_loaded(self, mock_servers):
+        """Test leases spread across endpoints and clients share the pool's context."""
+        pool = ZMQClientPool([f"localhost:{server.port}" for server in mock_servers])
+        try:
+            first = pool.acquire()
+            second = pool.acquire()
+            
+            assert {first.port, second.port} == {server.port for server in mock_servers}
+            assert first.context is pool.context and second.context is pool.context
+            assert first.get_observation()["player_current_health"] == 75
+            
+            pool.release(first)
+            assert pool.acquire() is first  # Now the endpoint with fewer leases
+            stats = pool.get_pool_stats()["endpoints"]
+            assert all(endpoint["leases"] == 1 for endpoint in stats.values())
+        finally:
+            pool.close()
+    
+    def test_dead_endpoint_parked_until_it_recovers(self, mock_servers):
+        """Test an endpoint whose circuit opens leaves rotation and returns once the bridge is back."""
+        live_port, dead_port = mock_servers[0].port, free_port()
+        pool = ZMQClientPool([live_port, dead_port], failure_threshold=1, timeout_ms=200,
+                             backoff_initial_ms=20, backoff_max_ms=50)
+        revived = None
+        try:
+            clients = [pool.acquire(), pool.acquire()]
+            dead = next(client for client in clients if client.port == dead_port)
+            assert dead.get_observation()["status"] == "error"
+            for client in clients:
+                pool.release(client)
+            
+            assert all(pool.acquire().port == live_port for _ in range(3))
+            assert pool.get_pool_stats()["parked_endpoints"] == [f"localhost:{dead_port}"]
+            
+            revived = MockZMQServer(port=dead_port)
+            revived.start()
+            deadline = time.time() + 5
+            while dead.circuit_state != CIRCUIT_CLOSED and time.time() < deadline:
+                time.sleep(0.02)
+            assert pool.acquire() is dead  # Back in rotation with no leases
+            assert pool.get_pool_stats()["parked_endpoints"] == []
+        finally:
+            pool.close()
+            if revived is not None:
+                revived.stop()
+    
+    def test_envs_draw_clients_from_pool(self, mock_servers):
+        """Test env factories lease distinct clients and hand them back on close."""
+        pool = ZMQClientPool([server.port for server in mock_servers])
+        try:
+            envs = [env_fn() for env_fn in pool.make_env_fns(2)]
+            assert {env.client.port for env in envs} == {server.port for server in mock_servers}
+            obs, _ = envs[0].reset()
+            assert obs["player_stats"][0] == 75
+            
+            for env in envs:
+                env.close()
+            stats = pool.get_pool_stats()["endpoints"]
+            assert all(endpoint["leases"] == 0 for endpoint in stats.values())
+        finally:
+            pool.close()
+
+
+class TestVecEnv:
+    """Test the multi-bridge env factory and per-worker metrics."""
+    
+    def test_metrics_collector_per_process(self):
+        """Test a forked worker gets its own collector instead of its parent's copy."""
+        parent = get_metrics_collector()
+        with patch("monitoring.os.getpid", return_value=-1):
+            worker = get_metrics_collector()
+            assert worker is not parent
+            assert get_metrics_collector() is worker
+        initialize_monitoring()  # Back to a collector owned by this process
+    
+    def test_worker_metrics_labelled(self):
+        """Test an env reports the metrics of the collector it was created with."""
+        try:
+            port = free_port()
+            initialize_monitoring(worker=f"localhost:{port}")
+            env = CustomGameEnv(port=port, observation_cache_ms=None)
+            try:
+                assert env.client.port == port
+                metrics = env.get_worker_metrics()
+                assert metrics["worker"] == f"localhost:{port}"
+                assert "zmq_connected" in metrics["health"]
+            finally:
+                env.close()
+        finally:
+            initialize_monitoring()
+    
+    def test_polled_vector_env(self):
+        """Test round trips overlap across bridges and a dead bridge only affects its own env."""
+        from vec_env import PolledVectorEnv
+        servers = [MockZMQServer(), MockZMQServer()]
+        for server in servers:
+            server.response_delay = 0.1
+            server.start()
+        envs = PolledVectorEnv([server.port for server in servers] + [free_port()], timeout_ms=400)
+        try:
+            observations, _ = envs.reset()
+            assert observations["player_stats"].shape == (3, 5)
+            assert list(observations["player_stats"][:, 0]) == [75, 75, 0]  # Dead bridge: default observation
+            
+            observations, rewards, terminations, truncations, infos = envs.step([2, 2, 2])
+            assert list(observations["player_stats"][:2, 0]) == [75, 75]
+            assert infos["action_status"]["status"][2] == "error"
+            assert rewards.shape == (3,) and not terminations.any()
+            
+            # Once its circuit is open the dead bridge fails fast: the step costs one round trip
+            while envs.envs[2].client.circuit_state == CIRCUIT_CLOSED:
+                envs.step([3, 3, 3])
+            start = time.time()
+            envs.step([2, 2, 2])
+            assert time.time() - start < 0.19
+            assert envs.envs[0].client.get_connection_stats()["circuit_state"] == CIRCUIT_CLOSED
+        finally:
+            envs.close()
+            for server in servers:
+                server.stop()
+    
+    def test_make_env_subprocesses(self):
+        """Test make_env runs one worker process per endpoint, each with its own metrics."""
+        pytest.importorskip("stable_baselines3")
+        from vec_env import make_env, worker_metrics
+        servers = [MockZMQServer(), MockZMQServer()]
+        for server in servers:
+            server.start()
+        env = make_env([server.port for server in servers], subprocess=True)
+        try:
+            obs = env.reset()
+            assert obs["player_stats"].shape[0] == 2
+            env.step([3, 3])
+            assert [m["worker"] for m in worker_metrics(env)] == [f"localhost:{server.port}" for server in servers]
+        finally:
+            env.close()
+            for server in servers:
+                server.stop()
+
+
+class TestCompression:
+    """Test negotiated payload compression."""
+    
+    @pytest.fixture
+    def mock_server(self):
+        server = MockZMQServer()
+        server.compression_threshold = 64  # The default observation is only a few hundred bytes
+        server.start()
+        yield server
+        server.stop()
+    
+    def test_compressed_round_trip(self, mock_server):
+        """Test requests are wrapped and large replies come back compressed."""
+        observation = mock_server.responses["command:get_observation"]
+        observation["nearby_npcs"] = observation["nearby_npcs"] * 50  # A busy scene compresses well
+        client = ZMQClient(port=mock_server.port, compression="zlib", compression_threshold=64)
+        try:
+            obs = client.get_observation()
+            action = client.execute_action("walk_to", {"x": 3200, "y": 3200, "plane": 0})
+            
+            assert obs == mock_server.responses["command:get_observation"]
+            assert action["status"] == "submitted"
+            assert mock_server.received_compressed == 2  # Everything after get_capabilities
+            stats = client.get_connection_stats()
+            assert stats["compression_codec"] == "zlib"
+            assert stats["compression_ratio"] > 1
+            assert get_metrics_collector().get_compression_stats()["frames"] > 0
+        finally:
+            client.close()
+    
+    def test_no_compression_without_bridge_support(self, mock_server):
+        """Test older bridges without the capability get plain messages."""
+        mock_server.responses["command:get_capabilities"] = {"status": "ok", "capabilities": ["step"]}
+        client = ZMQClient(port=mock_server.port, compression="auto")
+        try:
+            assert client.get_observation()["player_current_health"] == 75
+            assert client.compression_codec is None
+            assert mock_server.received_compressed == 0
+        finally:
+            client.close()
+
+
+class TestRecordReplay:
+    """Test recording bridge traffic and serving it back."""
+    
+    @pytest.fixture
+    def mock_server(self):
+        server = MockZMQServer()
+        server.start()
+        yield server
+        server.stop()
+    
+    def test_record_and_replay(self, mock_server, tmp_path):
+        """Test a recorded session is replayed to a new client, command by command."""
+        recording = str(tmp_path / "session.mbr")
+        client = ZMQClient(port=mock_server.port, record_path=recording, compression="zlib")
+        try:
+            client.get_observation()
+            mock_server.responses["command:get_observation"]["player_current_health"] = 40
+            client.get_observation()
+            client.execute_action("walk_to", {"x": 3200, "y": 3200})
+        finally:
+            client.close()
+        
+        exchanges = read_recording(recording)
+        assert [e.request.split(b":{")[0] for e in exchanges] == [
+            b"command:get_capabilities", b"command:get_observation", b"command:get_observation",
+            b"command:execute_action"]
+        assert all(e.latency_ms >= 0 for e in exchanges)
+        
+        server = ReplayServer(recording, port=free_port())
+        server.start()
+        replay_client = ZMQClient(port=server.port)
+        try:
+            assert replay_client.get_observation()["player_current_health"] == 75
+            assert replay_client.get_observation()["player_current_health"] == 40
+            # Replies start over once a command's recording runs out
+            assert replay_client.get_observation()["player_current_health"] == 75
+            assert replay_client.execute_action("attack_npc", {"npc_id": 1})["status"] == "submitted"
+            assert replay_client.send_command("step", {"action_type": "walk_to"})["status"] == "error"
+            assert server.unmatched_requests == 1
+        finally:
+            replay_client.close()
+            server.stop()
+    
+    def test_replay_timeline(self, mock_server, tmp_path):
+        """Test --timeline replays keep the recorded gap between requests, plain replays don't."""
+        recording = str(tmp_path / "session.mbr")
+        client = ZMQClient(port=mock_server.port, record_path=recording)
+        try:
+            client.get_observation()
+            time.sleep(0.3)
+            client.get_observation()
+        finally:
+            client.close()
+        
+        for timeline in (False, True):
+            server = ReplayServer(recording, port=free_port(), speed=1.0, timeline=timeline)
+            server.start()
+            replay_client = ZMQClient(port=server.port)
+            try:
+                start = time.perf_counter()
+                replay_client.get_observation()
+                replay_client.get_observation()
+                elapsed = time.perf_counter() - start
+            finally:
+                replay_client.close()
+                server.stop()
+            assert (elapsed >= 0.25) if timeline else (elapsed < 0.2)
+
+
+class TestObservationStream:
+    """Test the PUB/SUB observation stream and the client's latest-value cache."""
+    
+    @pytest.fixture
+    def mock_server(self):
+        """Fixture providing a mock ZMQ server in publisher mode."""
+        server = MockZMQServer(publish_port=0, publish_interval=0.05)
+        server.start()
+        yield server
+        server.stop()
+    
+    def _wait_for_snapshot(self, client, after_sequence=0, timeout=2.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            snapshot = client.get_latest_snapshot()
+            if snapshot is not None and snapshot.sequence > after_sequence:
+                return snapshot
+            time.sleep(0.01)
+        pytest.fail("No observation snapshot received from the stream")
+    
+    def test_get_observation_served_from_stream(self, mock_server):
+        """Test get_observation() answers from the cached snapshot without a request."""
+        client = ZMQClient(port=mock_server.port, stream_port=mock_server.publish_port)
+        try:
+            first = self._wait_for_snapshot(client)
+            obs = client.get_observation()
+            
+            assert obs["player_current_health"] == 75
+            assert "command:get_observation" not in mock_server.received_messages
+            assert client.get_connection_stats()["stream_cache_hits"] == 1
+            
+            # Snapshots carry increasing tick/sequence numbers
+            later = self._wait_for_snapshot(client, after_sequence=first.sequence)
+            assert later.tick > first.tick
+        finally:
+            client.close()
+    
+    def test_stale_stream_falls_back_to_request(self, mock_server):
+        """Test a snapshot older than stream_stale_ms is not served."""
+        client = ZMQClient(port=mock_server.port, stream_port=mock_server.publish_port, stream_stale_ms=0)
+        try:
+            self._wait_for_snapshot(client)
+            time.sleep(0.01)
+            obs = client.get_observation()
+            
+            assert obs["player_current_health"] == 75
+            assert "command:get_observation" in mock_server.received_messages
+        finally:
+            client.close()
+    
+    def test_binary_stream(self, mock_server):
+        """Test binary snapshots only serve get_observation_binary()."""
+        mock_server.publish_binary = True
+        client = ZMQClient(port=mock_server.port, stream_port=mock_server.publish_port)
+        try:
+            self._wait_for_snapshot(client)
+            
+            assert isinstance(client.get_observation_binary(), bytes)
+            assert "command:get_observation_binary" not in mock_server.received_messages
+            
+            # JSON callers still get JSON, via a request
+            assert client.get_observation()["player_current_health"] == 75
+            assert "command:get_observation" in mock_server.received_messages
+        finally:
+            client.close()
+
+
+class TestAsyncZMQClient:
+    """Test the asyncio client and env against the mock server."""
+    
+    @pytest.fixture
+    def mock_server(self):
+        """Fixture providing a mock ZMQ server."""
+        server = MockZMQServer()
+        server.start()
+        yield server
+        server.stop()
+    
+    def test_get_observation_and_execute_action(self, mock_server):
+        """Test basic async round trips."""
+        async def run():
+            client = AsyncZMQClient(port=mock_server.port)
+            try:
+                obs = await client.get_observation()
+                result = await client.execute_action("walk_to", {"x": 3100, "y": 3100})
+                return obs, result
+            finally:
+                client.close()
+        
+        obs, result = asyncio.run(run())
+        assert obs["player_current_health"] == 75
+        assert result["status"] == "submitted"
+    
+    def test_delta_observations(self, mock_server):
+        """Test an async client created with delta_observations asks for deltas and rebuilds the state."""
+        async def run():
+            client = AsyncZMQClient(port=mock_server.port, delta_observations=True)
+            try:
+                await client.get_capabilities()
+                first = await client.get_observation()
+                mock_server.responses["command:get_observation"]["player_current_health"] = 60
+                second = await client.get_observation()
+                return first, second, client.get_connection_stats()
+            finally:
+                client.close()
+        
+        first, second, stats = asyncio.run(run())
+        assert first["player_current_health"] == 75
+        assert second == mock_server.responses["command:get_observation"]
+        assert stats["delta_full_syncs"] == 1 and stats["delta_updates"] == 1
+        assert not any(msg == "command:get_observation" for msg in mock_server.received_messages)
+    
+    def test_concurrent_requests(self, mock_server):
+        """Test many concurrent awaits on one client get their own replies."""
+        async def run():
+            client = AsyncZMQClient(port=mock_server.port)
+            try:
+                return await asyncio.gather(*(
+                    client.get_capabilities(refresh=True) if i % 2 else client.get_observation()
+                    for i in range(50)
+                ))
+            finally:
+                client.close()
+        
+        results = asyncio.run(run())
+        for i, result in enumerate(results):
+            if i % 2:
+                assert "step" in result
+            else:
+                assert result["player_current_health"] == 75
+    
+    def test_timeout(self):
+        """Test an unreachable bridge times out without blocking the loop."""
+        async def run():
+            client = AsyncZMQClient(port=free_port(), timeout_ms=100)
+            try:
+                ticks = 0
+                async def ticker():
+                    nonlocal ticks
+                    while True:
+                        ticks += 1
+                        await asyncio.sleep(0.01)
+                ticker_task = asyncio.get_running_loop().create_task(ticker())
+                obs = await client.get_observation()
+                ticker_task.cancel()
+                return obs, ticks
+            finally:
+                client.close()
+        
+        obs, ticks = asyncio.run(run())
+        assert obs["status"] == "error"
+        assert "timeout" in obs["message"].lower()
+        assert ticks > 1  # Other tasks kept running while we waited
+    
+    def test_reconnect_keeps_requests_in_flight(self, mock_server):
+        """Test a reconnect after one request's failure doesn't fail the others awaiting replies."""
+        async def run():
+            client = AsyncZMQClient(port=mock_server.port, timeout_ms=2000)
+            try:
+                await client.get_capabilities()
+                mock_server.response_delay = 0.2
+                slow = asyncio.ensure_future(client.get_observation())
+                await asyncio.sleep(0.05)  # Sent and awaiting its reply
+                client.connected = False  # As after another request timed out
+                capabilities = await client.get_capabilities(refresh=True)
+                return await slow, capabilities
+            finally:
+                client.close()
+        
+        obs, capabilities = asyncio.run(run())
+        assert obs["player_current_health"] == 75
+        assert "step" in capabilities
+    
+    def test_async_env_step(self, mock_server):
+        """Test AsyncCustomGameEnv steps several envs concurrently end to end."""
+        async def run():
+            envs = [AsyncCustomGameEnv(port=mock_server.port) for _ in range(3)]
+            try:
+                await asyncio.gather(*(env.reset_async() for env in envs))
+                return await asyncio.gather(*(env.step_async(2) for env in envs))
+            finally:
+                for env in envs:
+                    env.close()
+        
+        results = asyncio.run(run())
+        for obs, reward, terminated, truncated, info in results:
+            assert obs["player_stats"][0] == 75
+            assert info["action_status"]["status"] == "submitted"
+        assert any(msg.startswith("command:step_binary:") for msg in mock_server.received_messages)
 
 
 class TestCustomGameEnv:
@@ -207,6 +1101,7 @@ class TestCustomGameEnv:
             # Set up mock client responses
             mock_client.get_observation.return_value = mock_server.responses["command:get_observation"]
             mock_client.execute_action.return_value = {"status": "submitted", "action_type": "test"}
+            mock_client.supports.return_value = False
             
             env = CustomGameEnv()
             yield env, mock_client
@@ -274,6 +1169,62 @@ class TestCustomGameEnv:
         assert isinstance(terminated, bool)
         assert isinstance(truncated, bool)
     
+    def test_step_uses_combined_rpc(self, game_env, mock_server):
+        """Test step() uses a single step round trip when the bridge supports it."""
+        env, mock_client = game_env
+        
+        env.reset()
+        mock_client.get_observation.reset_mock()
+        mock_client.supports.return_value = True
+        mock_client.step.return_value = {
+            "action_result": {"status": "submitted", "action_type": "walk_to"},
+            "observation": {**mock_server.responses["command:get_observation"],
+                            "player_current_health": 42}
+        }
+        
+        obs, reward, terminated, truncated, info = env.step(2)  # MOVE_TO_GOBLIN_AREA
+        
+        mock_client.step.assert_called_once()
+        assert mock_client.step.call_args[0][0] == "walk_to"
+        mock_client.execute_action.assert_not_called()
+        mock_client.get_observation.assert_not_called()
+        assert obs["player_stats"][0] == 42
+        assert info["action_status"]["status"] == "submitted"
+    
+    def test_macro_action_single_batch(self, mock_server):
+        """Test a macro action dispatches all its game actions in one batch message."""
+        mock_server.responses["command:get_observation"]["player_current_health"] = 30  # Low enough to eat
+        env = CustomGameEnv(client=ZMQClient(port=mock_server.port), macro_actions=True)
+        try:
+            assert env.action_space.n == 6
+            env.reset()
+            obs, reward, terminated, truncated, info = env.step(4)  # eat_then_attack
+            
+            batch_messages = [msg for msg in mock_server.received_messages
+                              if msg.startswith("command:execute_action_batch:")]
+            assert len(batch_messages) == 1
+            actions = json.loads(batch_messages[0].split(":", 2)[2])["actions"]
+            assert [a["action_type"] for a in actions] == ["interact_inventory", "attack_npc"]
+            assert not any(msg.startswith(("command:execute_action:", "command:step"))
+                           for msg in mock_server.received_messages)
+            assert info["action_status"]["status"] == "submitted"
+            assert len(info["action_status"]["results"]) == 2
+        finally:
+            env.close()
+    
+    def test_tick_synced_steps(self, mock_server):
+        """Test each step observes the game exactly ticks_per_step ticks after the previous one."""
+        env = CustomGameEnv(client=ZMQClient(port=mock_server.port), ticks_per_step=2)
+        try:
+            env.reset()
+            start_tick = env.client.last_tick
+            for i in range(3):
+                env.step(3)  # NOOP
+                assert env.client.last_tick == start_tick + 2 * (i + 1)
+            assert not any(msg.startswith("command:step") for msg in mock_server.received_messages)
+        finally:
+            env.close()
+    
     def test_step_eat_food(self, game_env):
         """Test EAT_FOOD action."""
         env, mock_client = game_env
@@ -382,6 +1333,7 @@ class TestIntegrationWorkflow:
             
             mock_client.get_observation.side_effect = observations
             mock_client.execute_action.return_value = {"status": "submitted"}
+            mock_client.supports.return_value = False
             
             env = CustomGameEnv()
             
@@ -403,8 +1355,29 @@ class TestIntegrationWorkflow:
     
     def test_connection_recovery(self, mock_server):
         """Test system behavior during connection issues."""
-        # This would test reconnection logic if implemented
-        pass
+        client = ZMQClient(port=mock_server.port, timeout_ms=200, failure_threshold=1,
+                           backoff_initial_ms=50, backoff_max_ms=200)
+        try:
+            assert client.get_observation()["player_current_health"] == 75
+            
+            # Bridge goes away: one timeout opens the circuit
+            mock_server.stop()
+            assert client.get_observation()["status"] == "error"
+            assert client.circuit_state != CIRCUIT_CLOSED
+            
+            # Bridge comes back: the background probe closes the circuit
+            restarted = MockZMQServer(port=mock_server.port)
+            restarted.start()
+            try:
+                deadline = time.time() + 3
+                while client.circuit_state != CIRCUIT_CLOSED and time.time() < deadline:
+                    time.sleep(0.05)
+                assert client.circuit_state == CIRCUIT_CLOSED
+                assert client.get_observation()["player_current_health"] == 75
+            finally:
+                restarted.stop()
+        finally:
+            client.close()
 
 
 if __name__ == "__main__":
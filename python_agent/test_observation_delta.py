@@ -0,0 +1,54 @@
+import copy
+import unittest
+
+from observation_delta import apply_observation_delta, encode_observation_delta
+
+
+def _observation():
+    return {
+        "player_current_health": 75,
+        "player_location": {"x": 3200, "y": 3200, "plane": 0},
+        "nearby_npcs": [{"name": "Goblin", "id": 125, "location": {"x": 3201, "y": 3201, "plane": 0}}],
+        "inventory": [{"id": 315, "name": "Shrimp", "quantity": 10}, {"id": 526, "name": "Bones", "quantity": 1}],
+    }
+
+
+class TestObservationDelta(unittest.TestCase):
+    """Test the delta encoding the bridge and client share."""
+
+    def test_only_changes_are_encoded(self):
+        """Test changed fields and entities are sent and the rest left out."""
+        base = _observation()
+        current = copy.deepcopy(base)
+        current["player_current_health"] = 60
+        current["nearby_npcs"][0]["location"] = {"x": 3202, "y": 3201, "plane": 0}
+        current["inventory"].pop()
+        delta = encode_observation_delta(base, current, 2, 1)
+
+        self.assertEqual(delta["changed"], {"player_current_health": 60})
+        self.assertEqual(set(delta["lists"]), {"nearby_npcs", "inventory"})
+        self.assertEqual(delta["lists"]["inventory"], {"length": 1, "items": {}})
+        self.assertEqual(apply_observation_delta(base, delta), current)
+        self.assertEqual(len(base["inventory"]), 2)  # The base is left untouched
+
+    def test_removed_and_added_fields(self):
+        """Test fields that disappear or appear survive the round trip."""
+        base = _observation()
+        current = copy.deepcopy(base)
+        del current["player_location"]
+        current["nearby_ground_items"] = [{"id": 526, "name": "Bones"}]
+        delta = encode_observation_delta(base, current, 2, 1)
+
+        self.assertEqual(delta["removed"], ["player_location"])
+        self.assertEqual(apply_observation_delta(base, delta), current)
+        self.assertEqual(encode_observation_delta(base, base, 2, 1), {"sequence": 2, "base_sequence": 1})
+
+    def test_delta_that_does_not_fit_base(self):
+        """Test a list delta that leaves entries unset is rejected."""
+        delta = {"sequence": 2, "base_sequence": 1, "lists": {"inventory": {"length": 3, "items": {}}}}
+        with self.assertRaises(ValueError):
+            apply_observation_delta(_observation(), delta)
+
+
+if __name__ == '__main__':
+    unittest.main()
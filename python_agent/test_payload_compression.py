@@ -0,0 +1,34 @@
+import unittest
+
+from payload_compression import choose_codec, is_compressed_frame, unwrap_frame, wrap_frame
+
+
+class TestPayloadCompression(unittest.TestCase):
+    """Test the compression envelope and codec negotiation."""
+
+    def test_small_payloads_bypass_compression(self):
+        """Test payloads below the threshold are wrapped but not compressed."""
+        frame, codec_time_ms = wrap_frame(b"command:get_observation", "zlib", threshold=1024)
+        self.assertTrue(frame.endswith(b"command:get_observation"))
+        self.assertEqual(codec_time_ms, 0.0)
+        self.assertEqual(unwrap_frame(frame), (b"command:get_observation", "zlib", 0.0))
+
+    def test_large_payloads_round_trip(self):
+        """Test payloads at the threshold are compressed and come back unchanged."""
+        payload = b'{"name": "Goblin", "id": 125}' * 100
+        frame, _ = wrap_frame(payload, "zlib", threshold=1024)
+        self.assertTrue(is_compressed_frame(frame))
+        self.assertLess(len(frame), len(payload))
+        self.assertEqual(unwrap_frame(frame)[:2], (payload, "zlib"))
+        with self.assertRaises(ValueError):
+            unwrap_frame(frame[:-8])
+
+    def test_choose_codec(self):
+        """Test negotiation only picks codecs both sides support."""
+        self.assertEqual(choose_codec(["zlib"]), "zlib")
+        self.assertIsNone(choose_codec([]))
+        self.assertIsNone(choose_codec(["zlib"], requested="brotli"))
+
+
+if __name__ == '__main__':
+    unittest.main()
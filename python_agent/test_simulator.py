@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+
+from simulator import SimulatedGameEnv, SimulatedVectorEnv
+
+
+class TestSimulator(unittest.TestCase):
+    """Test the offline simulator against CustomGameEnv's own handlers and reward."""
+
+    def test_vector_env_matches_simulated_env(self):
+        """Test the vectorized handlers/reward reproduce CustomGameEnv step for step."""
+        env = SimulatedGameEnv(macro_actions=True, seed=7)
+        envs = SimulatedVectorEnv(num_envs=1, macro_actions=True, seed=7)
+        actions = np.random.default_rng(0).integers(0, envs.single_action_space.n, 500)
+        rewards = set()
+        try:
+            observation, _ = env.reset(seed=7)
+            observations, _ = envs.reset(seed=7)
+            for action in actions:
+                observation, reward, _, _, info = env.step(int(action))
+                observations, vector_rewards, _, _, _ = envs.step([action])
+                for key in observation:
+                    np.testing.assert_array_equal(observation[key], observations[key][0])
+                self.assertEqual(vector_rewards[0], reward)
+                np.testing.assert_array_equal(envs.action_masks()[0], info["action_mask"])
+                rewards.add(reward)
+            self.assertLessEqual({0.0, -0.1}, rewards)  # Submitted and declined actions both occurred
+        finally:
+            env.close()
+
+    def test_vector_env_batches(self):
+        """Test batched observations fit the single-env space and goblins get fought."""
+        envs = SimulatedVectorEnv(num_envs=8, seed=0)
+        observations, _ = envs.reset()
+        self.assertEqual(observations["nearby_npcs_info"].shape, (8, 3, 4))
+        for _ in range(20):
+            observations, rewards, terminations, truncations, _ = envs.step(np.full(8, 2))  # Walk to the goblins
+        for _ in range(30):
+            observations, rewards, _, _, _ = envs.step(np.zeros(8, dtype=np.int64))  # Attack
+        self.assertEqual(rewards.shape, (8,))
+        self.assertFalse(terminations.any())
+        self.assertTrue((observations["nearby_ground_items_info"][:, 0, 0] == 526).any())  # Bones from a kill
+        for key in ("nearby_npcs_info", "inventory_item_ids", "player_animation"):
+            self.assertIn(observations[key][0], envs.single_observation_space[key])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,8 @@
 import os
 import time
-from custom_env import CustomGameEnv
 from stable_baselines3 import PPO
 from stable_baselines3.common.env_checker import check_env
-from stable_baselines3.common.vec_env import DummyVecEnv
+from vec_env import make_env, DEFAULT_ENDPOINT
 
 # Create directories for logs and models
 log_dir = "sb3_logs/"
@@ -11,14 +10,17 @@ model_dir = "sb3_models/"
 os.makedirs(log_dir, exist_ok=True)
 os.makedirs(model_dir, exist_ok=True)
 
+# One entry per running game client ("host:port" of its AIBridge); several run in parallel processes
+ENDPOINTS = [DEFAULT_ENDPOINT]
+
 if __name__ == '__main__':
     print("Initializing environment...")
-    # It's often good to wrap the custom environment in DummyVecEnv for SB3
-    env = DummyVecEnv([lambda: CustomGameEnv(render_mode='human')])
+    # One CustomGameEnv per bridge: DummyVecEnv for a single endpoint, SubprocVecEnv for several
+    env = make_env(ENDPOINTS, render_mode='human')
     
     # It's recommended to check your custom environment before training
     # print("Checking environment...")
-    # check_env(env.envs[0], warn=True) # Check the underlying CustomGameEnv instance
+    # check_env(env.envs[0], warn=True) # Check the underlying CustomGameEnv instance (single endpoint only)
     # Note: check_env might have issues with complex observation spaces or network comms
     # during checks. Use with caution or skip if it causes problems for this specific env.
 
@@ -4,15 +4,15 @@ Features real-time monitoring, health checks, automatic recovery, and metrics ex
 """
 
 import os
+import json
 import time
 import signal
 import threading
 from datetime import datetime
-from custom_env import CustomGameEnv
 from stable_baselines3 import PPO
 from stable_baselines3.common.env_checker import check_env
-from stable_baselines3.common.vec_env import DummyVecEnv
 from stable_baselines3.common.callbacks import BaseCallback
+from vec_env import make_env, worker_metrics, DEFAULT_ENDPOINT
 from monitoring import (
     initialize_monitoring, 
     RealTimeMonitor, 
@@ -29,6 +29,19 @@ os.makedirs(model_dir, exist_ok=True)
 os.makedirs(monitoring_dir, exist_ok=True)
 
 
+def export_worker_metrics(env, filepath):
+    """Write each env worker's metrics (see vec_env.worker_metrics) to a JSON file.
+
+    Returns False without writing when the envs share this process's collector.
+    """
+    workers = worker_metrics(env)
+    if not any(worker["worker"] for worker in workers):
+        return False
+    with open(filepath, 'w') as f:
+        json.dump(workers, f, indent=2)
+    return True
+
+
 class HealthCheckCallback(BaseCallback):
     """Custom callback for health monitoring and automatic recovery."""
     
@@ -53,14 +66,19 @@ class HealthCheckCallback(BaseCallback):
             # Check for critical issues
             critical_issues = []
             
-            if not health.get('zmq_connected', False):
-                critical_issues.append("ZMQ connection lost")
-            
-            if health.get('error_count_last_minute', 0) > 10:
-                critical_issues.append(f"High error rate: {health['error_count_last_minute']}/min")
-            
-            if health.get('last_observation_age_ms', 0) > 10000:
-                critical_issues.append("Observation data too old")
+            # Each env worker process has its own metrics; in-process envs report to ours
+            for worker in worker_metrics(self.training_env):
+                worker_health = worker["health"]
+                prefix = f"{worker['worker']}: " if worker["worker"] else ""
+                
+                if not worker_health.get('zmq_connected', False):
+                    critical_issues.append(f"{prefix}ZMQ connection lost")
+                
+                if worker_health.get('error_count_last_minute', 0) > 10:
+                    critical_issues.append(f"{prefix}High error rate: {worker_health['error_count_last_minute']}/min")
+                
+                if worker_health.get('last_observation_age_ms', 0) > 10000:
+                    critical_issues.append(f"{prefix}Observation data too old")
             
             # Log health status
             if critical_issues:
@@ -111,8 +129,13 @@ class MetricsExportCallback(BaseCallback):
             metrics = get_metrics_collector()
             metrics.export_metrics(metrics_file)
             
+            workers_file = os.path.join(monitoring_dir, f"worker_metrics_{timestamp}.json")
+            workers_exported = export_worker_metrics(self.training_env, workers_file)
+            
             if self.verbose > 0:
                 print(f"📊 Metrics exported to {metrics_file}")
+                if workers_exported:
+                    print(f"📊 Worker metrics exported to {workers_file}")
                 
         except Exception as e:
             record_error("METRICS_EXPORT_ERROR", f"Failed to export metrics: {str(e)}")
@@ -135,9 +158,11 @@ class MetricsExportCallback(BaseCallback):
 class TrainingManager:
     """Manages the complete training pipeline with monitoring and recovery."""
     
-    def __init__(self, total_timesteps=10000, monitoring_enabled=True):
+    def __init__(self, total_timesteps=10000, monitoring_enabled=True, endpoints=None):
         self.total_timesteps = total_timesteps
         self.monitoring_enabled = monitoring_enabled
+        # AIBridge endpoints, one env per game client (several are stepped in parallel processes)
+        self.endpoints = list(endpoints) if endpoints else [DEFAULT_ENDPOINT]
         self.monitor = None
         self.env = None
         self.model = None
@@ -165,9 +190,9 @@ class TrainingManager:
                 self.monitor = RealTimeMonitor(self.metrics)
                 self.monitor.start_monitoring(update_interval=10.0)
             
-            # Create and wrap environment
-            env = CustomGameEnv(render_mode='human' if self.monitoring_enabled else None)
-            self.env = DummyVecEnv([lambda: env])
+            # One CustomGameEnv per bridge endpoint
+            print(f"🔌 Bridge endpoints: {', '.join(map(str, self.endpoints))}")
+            self.env = make_env(self.endpoints, render_mode='human' if self.monitoring_enabled else None)
             
             # Optional environment validation (can be slow)
             # print("🔍 Validating environment...")
@@ -272,6 +297,11 @@ class TrainingManager:
                 self.metrics.export_metrics(final_metrics_path)
                 print(f"📊 Final metrics exported: {final_metrics_path}")
                 
+                if self.env:
+                    workers_path = os.path.join(monitoring_dir, f"final_worker_metrics_{int(time.time())}.json")
+                    if export_worker_metrics(self.env, workers_path):
+                        print(f"📊 Final worker metrics exported: {workers_path}")
+                
                 # Save dashboard
                 if self.monitor:
                     dashboard_path = os.path.join(monitoring_dir, f"final_dashboard_{int(time.time())}.png")
@@ -317,10 +347,12 @@ class TrainingManager:
             episode_reward = 0
             done = False
             
+            # With several bridges the episode of the first env is the one scored
             while not done:
                 action, _states = self.model.predict(obs, deterministic=True)
-                obs, reward, done, info = self.env.step(action)
-                episode_reward += reward
+                obs, reward, dones, info = self.env.step(action)
+                episode_reward += reward[0]
+                done = dones[0]
                 
                 if done:
                     break
@@ -342,11 +374,13 @@ def main():
     TOTAL_TIMESTEPS = 50000
     ENABLE_MONITORING = True
     MODEL_PATH = None  # Set to load existing model
+    ENDPOINTS = [DEFAULT_ENDPOINT]  # Add one "host:port" per running game client
     
     # Initialize training manager
     manager = TrainingManager(
         total_timesteps=TOTAL_TIMESTEPS,
-        monitoring_enabled=ENABLE_MONITORING
+        monitoring_enabled=ENABLE_MONITORING,
+        endpoints=ENDPOINTS
     )
     
     try:
@@ -0,0 +1,219 @@
+"""
+Vector envs over several RuneLite bridges, one game client per env.
+
+    env = make_env(["localhost:5555", "localhost:5565", "10.0.0.7:5555"])
+    model = PPO("MultiInputPolicy", env)
+
+make_env() gives every endpoint its own worker process (stable-baselines3 SubprocVecEnv),
+so the bridges are stepped in parallel and throughput grows with the number of game
+clients. Each worker records into its own MetricsCollector, labelled with its endpoint;
+the parent reads them with worker_metrics(env).
+
+PolledVectorEnv does the same from a single process: the envs only wait on the network,
+so one zmq.Poller over all their sockets overlaps the round trips without any workers.
+
+    envs = PolledVectorEnv(["localhost:5555", "localhost:5565"])
+    observations, infos = envs.reset()
+"""
+
+import copy
+import functools
+import time
+
+import numpy as np
+import zmq
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from custom_env import CustomGameEnv
+from monitoring import initialize_monitoring
+from zmq_client import ZMQClient, CIRCUIT_CLOSED
+from zmq_client_pool import parse_endpoint
+
+DEFAULT_ENDPOINT = "localhost:5555"
+
+
+def _make_worker_env(endpoint, own_metrics, env_kwargs):
+    host, port = parse_endpoint(endpoint)
+    if own_metrics:
+        initialize_monitoring(worker=f"{host}:{port}")
+    return CustomGameEnv(host=host, port=port, **env_kwargs)
+
+
+def make_env(endpoints, subprocess=None, start_method=None, **env_kwargs):
+    """A stable-baselines3 VecEnv with one CustomGameEnv per bridge endpoint.
+
+    Endpoints are "host:port", ("host", port) or bare port numbers. With several endpoints
+    the envs run in a SubprocVecEnv (one process per bridge); a single endpoint, or
+    subprocess=False, keeps them in-process in a DummyVecEnv sharing the caller's
+    MetricsCollector. env_kwargs go to every CustomGameEnv.
+    """
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+    endpoints = list(endpoints)
+    if not endpoints:
+        raise ValueError("make_env needs at least one endpoint")
+    if subprocess is None:
+        subprocess = len(endpoints) > 1
+    # functools.partial of a module-level function so the factories pickle for spawn/forkserver
+    env_fns = [functools.partial(_make_worker_env, endpoint, subprocess, env_kwargs) for endpoint in endpoints]
+    if subprocess:
+        return SubprocVecEnv(env_fns, start_method=start_method)
+    return DummyVecEnv(env_fns)
+
+
+def worker_metrics(vec_env):
+    """get_worker_metrics() of every env in a VecEnv built by make_env(), in endpoint order."""
+    return vec_env.env_method("get_worker_metrics")
+
+
+class PolledVectorEnv(VectorEnv):
+    """Gymnasium VectorEnv stepping one CustomGameEnv per bridge from a single process.
+
+    Every env gets a dealer-mode ZMQClient on one shared zmq.Context. step() first sends
+    all envs' requests, then collects the replies with a single zmq.Poller, so the bridge
+    round trips overlap instead of adding up. Action selection, reward and metrics are the
+    envs' own. Observations are written straight into batched (num_envs, ...) arrays, two
+    sets filled in turn: with copy=False a returned batch stays valid until the step after
+    next. An env whose bridge has not answered within timeout_ms gets an error reply
+    (default observation, action error penalty) while the others step normally; its
+    client's circuit breaker then fails it fast until the bridge is back. Envs that
+    terminate or truncate are reset on their next step (AutoresetMode.NEXT_STEP).
+    """
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, endpoints, timeout_ms=5000, copy=True, **env_kwargs):
+        endpoints = [parse_endpoint(endpoint) for endpoint in endpoints]
+        if not endpoints:
+            raise ValueError("PolledVectorEnv needs at least one endpoint")
+        if env_kwargs.get("ticks_per_step") is not None:
+            raise ValueError("PolledVectorEnv does not support ticks_per_step")
+        self.timeout_ms = timeout_ms
+        self.copy = copy
+        self.context = zmq.Context()
+        verbose = env_kwargs.get("verbose", True)
+        self.envs = [CustomGameEnv(client=ZMQClient(host=host, port=port, mode="dealer", timeout_ms=timeout_ms,
+                                                    context=self.context, verbose=verbose), **env_kwargs)
+                     for host, port in endpoints]
+        for env in self.envs:
+            env.client.trace = env.trace  # Each client's errors go to its env's trace
+
+        self.num_envs = len(self.envs)
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+        self.action_space = batch_space(self.single_action_space, self.num_envs)
+        self.render_mode = self.envs[0].render_mode
+
+        # Two sets of batched observation arrays; each env parses into its row of the current set
+        schema = self.envs[0].observation_schema
+        self._buffers = [schema.empty_batch(self.num_envs) for _ in range(2)]
+        self._buffer_index = 0
+        self._rewards = np.zeros(self.num_envs, dtype=np.float64)
+        self._terminations = np.zeros(self.num_envs, dtype=np.bool_)
+        self._truncations = np.zeros(self.num_envs, dtype=np.bool_)
+        self._autoreset_envs = np.zeros(self.num_envs, dtype=np.bool_)
+
+    def reset(self, *, seed=None, options=None):
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+        self._negotiate_capabilities()
+
+        batch, rows = self._next_buffers()
+        pending = [env._submit_reset(seeds[i]) for i, env in enumerate(self.envs)]
+        self._gather(pending)
+        infos = {}
+        for i, env in enumerate(self.envs):
+            _, info = env._finish_reset(pending[i], into=rows[i])
+            infos = self._add_env_info(infos, info, i)
+        self._terminations[:] = False
+        self._truncations[:] = False
+        self._autoreset_envs[:] = False
+        return self._observations(batch), infos
+
+    def step(self, actions):
+        self._negotiate_capabilities()
+
+        batch, rows = self._next_buffers()
+        pending = [env._submit_reset() if self._autoreset_envs[i] else env._submit_step(int(actions[i]))
+                   for i, env in enumerate(self.envs)]
+        self._gather(pending)
+        infos = {}
+        for i, env in enumerate(self.envs):
+            if self._autoreset_envs[i]:
+                _, info = env._finish_reset(pending[i], into=rows[i])
+                self._rewards[i], self._terminations[i], self._truncations[i] = 0.0, False, False
+            else:
+                (_, self._rewards[i], self._terminations[i], self._truncations[i],
+                 info) = env._finish_step(pending[i], into=rows[i])
+            infos = self._add_env_info(infos, info, i)
+        self._autoreset_envs = np.logical_or(self._terminations, self._truncations)
+        return (self._observations(batch), np.copy(self._rewards), np.copy(self._terminations),
+                np.copy(self._truncations), infos)
+
+    def _add_env_info(self, infos, info, i):
+        # raw_observation is bytes or a dict depending on the bridge and reply, which
+        # gymnasium's info batching can't mix; the observation arrays carry the same data
+        return self._add_info(infos, {key: value for key, value in info.items() if key != "raw_observation"}, i)
+
+    def _next_buffers(self):
+        self._buffer_index ^= 1
+        return self._buffers[self._buffer_index]
+
+    def _observations(self, batch):
+        return copy.deepcopy(batch) if self.copy else batch
+
+    def _negotiate_capabilities(self):
+        """Ask every bridge whose capabilities are still unknown, all at once."""
+        clients = [env.client for env in self.envs
+                   if env.client.capabilities is None and env.client.circuit_state == CIRCUIT_CLOSED]
+        if not clients:
+            return
+        requests = [client.submit("get_capabilities") for client in clients]
+        self._wait_for_replies([(client, [request_id]) for client, request_id in zip(clients, requests)])
+        for client, request_id in zip(clients, requests):
+            client._store_capabilities(client.get_reply(request_id, timeout_ms=0))
+
+    def _gather(self, pending):
+        self._wait_for_replies([(env.client, p["requests"]) for env, p in zip(self.envs, pending)])
+
+    def _wait_for_replies(self, requests):
+        """Poll the clients' sockets until every (client, request_ids) is answered or timeout_ms passes.
+
+        Requests still unanswered then are left to get_reply(), which times them out.
+        """
+        deadline = time.time() + self.timeout_ms / 1000.0
+        while True:
+            waiting = [client for client, request_ids in requests
+                       if not all(client.reply_ready(request_id) for request_id in request_ids)]
+            remaining_ms = int((deadline - time.time()) * 1000)
+            if not waiting or remaining_ms <= 0:
+                return
+            poller = zmq.Poller()
+            for client in waiting:
+                poller.register(client.socket, zmq.POLLIN)
+            ready = dict(poller.poll(remaining_ms))
+            for client in waiting:
+                if client.socket in ready:
+                    client.collect_replies()
+
+    def action_masks(self):
+        """(num_envs, n) boolean mask of each env's valid actions (see CustomGameEnv.action_masks())."""
+        return np.stack([env.action_masks() for env in self.envs])
+
+    def call(self, name, *args, **kwargs):
+        """Call a method (or read an attribute) of every env, e.g. call("get_worker_metrics")."""
+        results = []
+        for env in self.envs:
+            attribute = getattr(env, name)
+            results.append(attribute(*args, **kwargs) if callable(attribute) else attribute)
+        return tuple(results)
+
+    def close_extras(self, **kwargs):
+        for env in self.envs:
+            env.close()
+        self.context.term()
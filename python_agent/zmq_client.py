@@ -1,50 +1,183 @@
 import zmq
 import json
 import time
-from monitoring import record_error, get_metrics_collector
+import random
+import threading
+from dataclasses import dataclass
+from typing import Any
+from monitoring import record_error, get_metrics_collector, LatencyHistogram
+from bridge_recording import TrafficRecorder
+import step_trace
+from observation_codec import is_binary_observation
+from observation_delta import apply_observation_delta
+from payload_compression import (DEFAULT_COMPRESSION_THRESHOLD, choose_codec, is_compressed_frame,
+                                 unwrap_frame, wrap_frame)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+OBSERVATION_STREAM_TOPIC = b"observation"
+
+# The game state only changes once per game tick
+GAME_TICK_MS = 600
+
+# Phases of a request timed by ZMQClient (see get_connection_stats()["latency_ms"])
+LATENCY_PHASES = ("encode", "send", "wait", "decode", "parse", "total")
+
+# Circuit breaker states (see ZMQClient._record_failure / _probe_loop)
+CIRCUIT_CLOSED = "closed"        # Normal operation
+CIRCUIT_OPEN = "open"            # Bridge known to be down: fail fast, probe in the background
+CIRCUIT_HALF_OPEN = "half_open"  # A probe request is in flight
+
+
+def loads_json(buffer):
+    """Parse JSON straight from a received buffer (bytes or memoryview).
+
+    Uses orjson when it is installed; its JSONDecodeError subclasses json.JSONDecodeError.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(buffer)
+    return json.loads(bytes(buffer))  # stdlib json takes bytes but not memoryview
+
+
+def frame_buffer(frame):
+    """The payload of a zmq.Frame (received with copy=False) as a memoryview; bytes pass through."""
+    return frame.buffer if isinstance(frame, zmq.Frame) else frame
+
+
+@dataclass(frozen=True)
+class ObservationSnapshot:
+    """One observation published on the bridge's observation stream."""
+    sequence: int       # Publisher-side counter, +1 per snapshot
+    tick: int           # Game tick the snapshot was taken on
+    observation: Any    # Observation dict, or bytes in the binary wire format
+    received_at: float  # time.time() when the subscriber received it
+
 
 class ZMQClient:
-    def __init__(self, host="localhost", port=5555):
+    def __init__(self, host="localhost", port=5555, mode="req", timeout_ms=5000,
+                 stream_port=None, stream_stale_ms=2000, delta_observations=False, context=None,
+                 failure_threshold=3, backoff_initial_ms=250, backoff_max_ms=10000,
+                 compression=None, compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+                 observation_cache_ms=None, record_path=None, verbose=True, trace=None):
+        if mode not in ("req", "dealer"):
+            raise ValueError(f"Unknown ZMQClient mode: {mode}")
         self.host = host
         self.port = port
-        self.context = None
+        # "req": one request at a time (classic REQ/REP lockstep)
+        # "dealer": pipelined, several requests in flight matched by request id
+        self.mode = mode
+        self.timeout_ms = timeout_ms
+        # A caller-supplied context (e.g. ZMQClientPool's) is shared and never terminated here
+        self.context = context
+        self._owns_context = context is None
         self.socket = None
         self.connected = False
         self.connection_attempts = 0
         self.last_successful_communication = 0
+        self.consecutive_failures = 0 # Timeouts/transport errors since the last good reply
+        self.avg_latency_ms = None    # Exponential moving average of reply latency
+        self.phase_latency = {phase: LatencyHistogram() for phase in LATENCY_PHASES}
+        self.capabilities = None # Populated lazily by get_capabilities()
+        self.capability_details = {} # Extra fields of the capabilities reply (ports, codecs, ...)
+        self._next_request_id = 0
+        self._pending = {}    # request_id -> (command_type, raw_message, start_time, sent_at)
+        self._completed = {}  # request_id -> response, for replies not yet collected
+        self.late_replies_dropped = 0
         self.metrics = get_metrics_collector()
+        # Errors are recorded in `trace` (a step_trace.StepTrace, e.g. the env's) when given;
+        # verbose=False turns off all console output
+        self.verbose = verbose
+        self.trace = trace
+
+        # Circuit breaker: after failure_threshold consecutive failures, calls fail fast while
+        # a background probe retries with exponential backoff + jitter
+        self.failure_threshold = failure_threshold
+        self.backoff_initial_ms = backoff_initial_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.circuit_state = CIRCUIT_CLOSED
+        self._circuit_state_since = time.time()
+        self._circuit_lock = threading.Lock()
+        self._probe_thread = None
+        self._probe_stop = threading.Event()
+        self.circuit_opens = 0
+        self.fast_failures = 0
+
+        # Optional PUB/SUB observation stream (see _start_observation_stream)
+        self.stream_port = stream_port
+        self.stream_stale_ms = stream_stale_ms
+        self._latest_snapshot = None
+        self._snapshot_condition = threading.Condition()  # Notified for every new snapshot
+        self._stream_context = None
+        self._stream_thread = None
+        self._stream_running = False
+        self.stream_snapshots_received = 0
+        self.stream_snapshots_skipped = 0
+        self.stream_cache_hits = 0
+
+        # Delta-encoded observations (see observation_delta); state is rebuilt client-side
+        self.delta_observations = delta_observations
+        self._delta_state = None
+        self._delta_sequence = 0  # 0 asks the bridge for a full observation
+        self.delta_full_syncs = 0
+        self.delta_updates = 0
+
+        # Payload compression: None (off), "auto" or a codec name; negotiated on first use
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_codec = None
+        self._compression_negotiated = False
+        self.compression_raw_bytes = 0
+        self.compression_wire_bytes = 0
+
+        # Observation cache: repeat get_observation() calls within observation_cache_ms (e.g.
+        # GAME_TICK_MS) are answered locally. None disables it; actions invalidate it.
+        self.observation_cache_ms = observation_cache_ms
+        self._cached_observation = None  # (binary, observation, fetched_at)
+        self.observation_cache_hits = 0
+        self.observation_cache_misses = 0
+
+        # Newest game tick seen in an observation, stream snapshot or wait_for_tick() reply
+        self.last_tick = None
+
+        # Optional traffic recording for offline replay (see bridge_recording)
+        self.recorder = TrafficRecorder(record_path) if record_path else None
         
         self._initialize_connection()
+        if stream_port is not None:
+            self._start_observation_stream()
 
     def _initialize_connection(self):
         """Initialize ZMQ connection with error handling."""
         try:
-            self.context = zmq.Context()
-            self.socket = self.context.socket(zmq.REQ)
+            if self.context is None:
+                self.context = zmq.Context()
+            self.socket = self.context.socket(zmq.DEALER if self.mode == "dealer" else zmq.REQ)
             self.socket.connect(f"tcp://{self.host}:{self.port}")
             # Set a timeout for receive operations (e.g., 5 seconds)
-            self.socket.setsockopt(zmq.RCVTIMEO, 5000)
+            self.socket.setsockopt(zmq.RCVTIMEO, self.timeout_ms)
             self.socket.setsockopt(zmq.LINGER, 0) # Don't wait for unsent messages on close
             self.connected = True
             self.connection_attempts += 1
-            print(f"ZMQ Client connected to tcp://{self.host}:{self.port}")
+            if self.verbose:
+                print(f"ZMQ Client connected to tcp://{self.host}:{self.port}")
         except Exception as e:
             self.connected = False
             record_error("ZMQ_INIT_ERROR", f"Failed to initialize ZMQ connection: {str(e)}")
             raise
 
     def _reconnect(self):
-        """Attempt to reconnect if connection is lost."""
+        """Replace the socket after a failure (Lazy Pirate): the context is kept, nothing sleeps."""
         if self.connected:
             return True
             
+        self._reset_delta_state()
         try:
             if self.socket:
                 self.socket.close()
-            if self.context:
-                self.context.term()
-            
-            time.sleep(1)  # Brief delay before reconnect
             self._initialize_connection()
             return True
         except Exception as e:
@@ -52,25 +185,37 @@ class ZMQClient:
             self.metrics.record_connection_failure()
             return False
 
-    def send_command(self, command_type, params=None):
-        message = {"command_type": command_type}
-        if params:
-            message["params"] = params
-        
+    def _build_message(self, command_type, params=None):
         # For AI Bridge, commands are prefixed
-        if command_type == "get_observation":
-            raw_message = "command:get_observation"
-        elif command_type == "execute_action":
+        if command_type in ("get_observation", "get_observation_binary", "get_capabilities"):
+            return f"command:{command_type}"
+        elif command_type in ("get_observation_delta", "wait_for_tick", "wait_for_tick_binary"):
+            return f"command:{command_type}:{json.dumps(params)}"
+        elif command_type in ("execute_action", "step", "step_binary"):
             # The action_type and parameters for execute_action are wrapped in the 'params' dict
-            # which then becomes the JSON payload for "command:execute_action:"
+            # which then becomes the JSON payload for "command:execute_action:" / "command:step:"
             if not params or "action_type" not in params:
-                raise ValueError("Missing 'action_type' in params for execute_action")
-            raw_message = f"command:execute_action:{json.dumps(params)}"
+                raise ValueError(f"Missing 'action_type' in params for {command_type}")
+            return f"command:{command_type}:{json.dumps(params)}"
+        elif command_type == "execute_action_batch":
+            if not params or "actions" not in params:
+                raise ValueError(f"Missing 'actions' in params for {command_type}")
+            return f"command:{command_type}:{json.dumps(params)}"
         else:
             raise ValueError(f"Unknown command_type for ZMQClient: {command_type}")
 
+    def send_command(self, command_type, params=None):
+        if self.circuit_state != CIRCUIT_CLOSED:
+            return self._circuit_open_error()
+        if self.compression and not self._compression_negotiated and command_type != "get_capabilities":
+            self._negotiate_compression()
+
         # Track communication timing
         start_time = time.time()
+        raw_message, payload = self._encode_command(command_type, params)
+
+        if self.mode == "dealer":
+            return self.get_reply(self._submit(command_type, raw_message, payload, start_time))
         
         try:
             # Ensure we're connected
@@ -79,59 +224,658 @@ class ZMQClient:
                     return {"status": "error", "message": "Connection failed"}
             
             # print(f"Sending: {raw_message}") # For debugging
-            self.socket.send_string(raw_message)
-            response_bytes = self.socket.recv()
-            response_str = response_bytes.decode('utf-8')
-            
-            # Record successful communication
-            self.last_successful_communication = time.time()
-            communication_time_ms = (self.last_successful_communication - start_time) * 1000
-            
-            # print(f"Received: {response_str}") # For debugging
-            try:
-                response = json.loads(response_str)
-                
-                # Log performance for observations
-                if command_type == "get_observation":
-                    self.metrics.record_observation_time(communication_time_ms)
-                elif command_type == "execute_action":
-                    self.metrics.record_action_time(communication_time_ms)
-                
-                return response
-            except json.JSONDecodeError as e:
-                error_msg = f"Failed to decode JSON response: {response_str}. Error: {e}"
-                print(error_msg)
-                record_error("ZMQ_JSON_DECODE_ERROR", error_msg, {"raw_response": response_str})
-                return {"status": "error", "message": error_msg, "raw_response": response_str}
+            send_start = time.perf_counter()
+            self.socket.send(payload)
+            sent_at = time.perf_counter()
+            self._record_phase("send", sent_at - send_start)
+            frames = self.socket.recv_multipart(copy=False)
+            self._record_phase("wait", time.perf_counter() - sent_at)
+            return self._handle_reply(command_type, raw_message, frames, start_time)
                 
         except zmq.error.Again: # Timeout
-            error_msg = f"Timeout waiting for ZMQ response to command: {raw_message}"
-            print(error_msg)
-            record_error("ZMQ_TIMEOUT", error_msg, {"command": raw_message})
-            self.connected = False  # Mark as disconnected on timeout
-            # Consider logging this to a file as well if it becomes frequent
-            return {"status": "error", "message": "ZMQ timeout"}
+            return self._handle_timeout(raw_message)
         except zmq.error.ZMQError as e: # Other ZMQ errors
             error_msg = f"ZMQError during communication for command {raw_message}: {e}"
-            print(error_msg)
+            self._report_error(step_trace.EVENT_ZMQ_ERROR, error_msg)
             record_error("ZMQ_ERROR", error_msg, {"command": raw_message})
-            self.connected = False  # Mark as disconnected on ZMQ error
+            self._record_failure()  # Mark as disconnected on ZMQ error
             return {"status": "error", "message": error_msg}
         except Exception as e: # Other unexpected errors
             error_msg = f"Unexpected error during ZMQ communication for command {raw_message}: {e}"
-            print(error_msg)
+            self._report_error(step_trace.EVENT_ZMQ_UNEXPECTED_ERROR, error_msg)
             record_error("ZMQ_UNEXPECTED_ERROR", error_msg, {"command": raw_message})
-            self.connected = False  # Mark as disconnected on unexpected error
+            self._record_failure()  # Mark as disconnected on unexpected error
             return {"status": "error", "message": error_msg}
 
-    def get_observation(self):
-        return self.send_command("get_observation")
+    def _handle_reply(self, command_type, raw_message, frames, start_time):
+        """Decode the reply frames of a command and record its latency."""
+        # Record successful communication
+        self.last_successful_communication = time.time()
+        communication_time_ms = (self.last_successful_communication - start_time) * 1000
+        self.consecutive_failures = 0
+        if self.avg_latency_ms is None:
+            self.avg_latency_ms = communication_time_ms
+        else:
+            self.avg_latency_ms += 0.1 * (communication_time_ms - self.avg_latency_ms)
+        
+        # print(f"Received: {frames}") # For debugging
+        try:
+            if self.recorder is not None:
+                # Decompressed once for the recording; decoding the plain frames below skips the codec
+                frames = [self._decompress_frame(frame) for frame in frames]
+                self.recorder.record(raw_message, frames, start_time, communication_time_ms)
+            if command_type == "step_binary" and len(frames) == 2:
+                # JSON action result frame followed by the observation frame
+                response = {"action_result": self._decode_frame(frames[0]),
+                            "observation": self._decode_frame(frames[1])}
+            elif command_type == "wait_for_tick_binary" and len(frames) == 2:
+                # JSON {"status", "game_tick"} frame followed by the observation frame
+                response = {"tick_result": self._decode_frame(frames[0]),
+                            "observation": self._decode_frame(frames[1])}
+            else:
+                response = self._decode_frame(frames[0])
+            
+            # Log performance for observations
+            if command_type in ("get_observation", "get_observation_binary", "get_observation_delta"):
+                self.metrics.record_observation_time(communication_time_ms)
+            elif command_type in ("execute_action", "execute_action_batch"):
+                self.metrics.record_action_time(communication_time_ms)
+            elif command_type in ("step", "step_binary"):
+                self.metrics.record_step_time(communication_time_ms)
+            
+            self._record_phase("total", time.time() - start_time)
+            return response
+        except json.JSONDecodeError as e:
+            # Only materialize the raw reply when it is needed for the error report
+            response_str = bytes(frame_buffer(frames[0])).decode('utf-8', errors='replace')
+            error_msg = f"Failed to decode JSON response: {response_str}. Error: {e}"
+            self._report_error(step_trace.EVENT_ZMQ_JSON_ERROR, error_msg)
+            record_error("ZMQ_JSON_DECODE_ERROR", error_msg, {"raw_response": response_str})
+            return {"status": "error", "message": error_msg, "raw_response": response_str}
+        except ValueError as e:
+            error_msg = f"Failed to decompress response: {e}"
+            self._report_error(step_trace.EVENT_ZMQ_DECOMPRESS_ERROR, error_msg)
+            record_error("ZMQ_DECOMPRESS_ERROR", error_msg)
+            return {"status": "error", "message": error_msg}
+
+    def _encode_command(self, command_type, params):
+        """Serialize a command to its wire bytes. Returns (raw_message, payload)."""
+        encode_start = time.perf_counter()
+        raw_message = self._build_message(command_type, params)
+        payload = self._encode_request(raw_message)
+        self._record_phase("encode", time.perf_counter() - encode_start)
+        return raw_message, payload
+
+    def _record_phase(self, phase, duration_s):
+        self.phase_latency[phase].record(duration_s * 1000)
+
+    def _report_error(self, event, error_msg):
+        """Trace (or, without a trace, print) a communication error; callers also record_error() it."""
+        if self.trace is not None:
+            self.trace.record(event, message=error_msg)
+        elif self.verbose:
+            print(error_msg)
+
+    def _handle_timeout(self, raw_message):
+        error_msg = f"Timeout waiting for ZMQ response to command: {raw_message}"
+        self._report_error(step_trace.EVENT_ZMQ_TIMEOUT, error_msg)
+        record_error("ZMQ_TIMEOUT", error_msg, {"command": raw_message})
+        self._record_failure()  # Mark as disconnected on timeout
+        self._reset_delta_state()  # A lost reply may have advanced the bridge's sequence
+        # Consider logging this to a file as well if it becomes frequent
+        return {"status": "error", "message": "ZMQ timeout"}
+
+    # --- Circuit breaker ---
+
+    def _record_failure(self):
+        """Count a timeout/transport error and open the circuit once failure_threshold is hit."""
+        self.connected = False
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold and self.circuit_state == CIRCUIT_CLOSED:
+            self._open_circuit()
+
+    def _circuit_open_error(self):
+        self.fast_failures += 1
+        return {"status": "error", "message": "Bridge unavailable (circuit open)"}
+
+    def _set_circuit_state(self, state):
+        with self._circuit_lock:
+            if state == self.circuit_state:
+                return
+            now = time.time()
+            self.metrics.record_connection_state(self.circuit_state, now - self._circuit_state_since)
+            if self.verbose:
+                print(f"ZMQ Client circuit {self.circuit_state} -> {state} (tcp://{self.host}:{self.port})")
+            self.circuit_state = state
+            self._circuit_state_since = now
+
+    def _open_circuit(self):
+        self.circuit_opens += 1
+        self._set_circuit_state(CIRCUIT_OPEN)
+        record_error("ZMQ_CIRCUIT_OPEN",
+                     f"Bridge at tcp://{self.host}:{self.port} unavailable after {self.consecutive_failures} failures")
+        self.metrics.record_connection_failure()
+        self._probe_stop.clear()
+        self._probe_thread = threading.Thread(target=self._probe_loop, name="ZMQClient-Probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        """Retry the bridge with exponential backoff + jitter until it answers, then close the circuit."""
+        attempt = 0
+        while True:
+            backoff_ms = min(self.backoff_max_ms, self.backoff_initial_ms * 2 ** attempt)
+            if self._probe_stop.wait(random.uniform(backoff_ms / 2, backoff_ms) / 1000.0):
+                return
+            attempt += 1
+            self._set_circuit_state(CIRCUIT_HALF_OPEN)
+            if self._probe_bridge():
+                self.consecutive_failures = 0
+                self.connected = False  # Request socket is replaced on next use
+                self._set_circuit_state(CIRCUIT_CLOSED)
+                return
+            self._set_circuit_state(CIRCUIT_OPEN)
+
+    def _probe_bridge(self):
+        """Send command:get_capabilities on a throwaway socket; any reply means the bridge is back."""
+        # A sync shadow of the context, so this also works for zmq.asyncio contexts
+        socket = zmq.Context.shadow(self.context.underlying).socket(zmq.REQ)
+        try:
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.setsockopt(zmq.RCVTIMEO, min(self.timeout_ms, 1000))
+            socket.connect(f"tcp://{self.host}:{self.port}")
+            socket.send_string("command:get_capabilities")
+            socket.recv_multipart()
+            return True
+        except zmq.error.ZMQError:
+            return False
+        finally:
+            socket.close()
+
+    def _stop_probe(self):
+        self._probe_stop.set()
+        if self._probe_thread is not None:
+            self._probe_thread.join(timeout=2)
+            self._probe_thread = None
+
+    # --- Pipelined (DEALER) mode ---
+    # Each request is sent as [request_id, "", message]. The bridge's REP socket treats
+    # everything up to the empty delimiter as the envelope and echoes it back, so replies
+    # can be matched to requests without any bridge-side changes.
+
+    def submit(self, command_type, params=None):
+        """Send a command without waiting for its reply (dealer mode only).
+
+        Returns a request id to pass to get_reply(). Several requests may be in flight.
+        """
+        if self.mode != "dealer":
+            raise RuntimeError("submit() requires ZMQClient(mode='dealer')")
+        start_time = time.time()
+        return self._submit(command_type, *self._encode_command(command_type, params), start_time)
+
+    def _submit(self, command_type, raw_message, payload, start_time):
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        if self.circuit_state != CIRCUIT_CLOSED:
+            self._completed[request_id] = self._circuit_open_error()
+            return request_id
+        try:
+            send_start = time.perf_counter()
+            self.socket.send_multipart([request_id.to_bytes(8, "big"), b"", payload])
+            sent_at = time.perf_counter()
+            self._record_phase("send", sent_at - send_start)
+            self._pending[request_id] = (command_type, raw_message, start_time, sent_at)
+        except zmq.error.ZMQError as e:
+            self._record_failure()
+            error_msg = f"ZMQError during communication for command {raw_message}: {e}"
+            self._report_error(step_trace.EVENT_ZMQ_ERROR, error_msg)
+            record_error("ZMQ_ERROR", error_msg, {"command": raw_message})
+            self._completed[request_id] = {"status": "error", "message": error_msg}
+        return request_id
+
+    def get_reply(self, request_id, timeout_ms=None):
+        """Wait for the reply to a submitted request (dealer mode only).
+
+        Replies to other in-flight requests that arrive in the meantime are buffered.
+        On timeout the request is abandoned and its reply is dropped if it shows up later.
+        """
+        if request_id in self._completed:
+            return self._completed.pop(request_id)
+        if request_id not in self._pending:
+            raise KeyError(f"Unknown or already collected request id: {request_id}")
+
+        timeout_ms = self.timeout_ms if timeout_ms is None else timeout_ms
+        deadline = time.time() + timeout_ms / 1000.0
+        while request_id not in self._completed:
+            remaining_ms = int((deadline - time.time()) * 1000)
+            if remaining_ms <= 0 or not self.socket.poll(remaining_ms, zmq.POLLIN):
+                _, raw_message, _, _ = self._pending.pop(request_id)
+                return self._handle_timeout(raw_message)
+            self._receive_pending_reply()
+        return self._completed.pop(request_id)
+
+    def reply_ready(self, request_id):
+        """Whether get_reply(request_id) would return without waiting (dealer mode only)."""
+        return request_id not in self._pending
+
+    def collect_replies(self):
+        """Read every reply that has already arrived, without blocking (dealer mode only).
+
+        For callers that wait on several clients' sockets with one zmq.Poller.
+        """
+        while self._pending and self.socket.poll(0, zmq.POLLIN):
+            self._receive_pending_reply()
+
+    def _receive_pending_reply(self):
+        frames = self.socket.recv_multipart(zmq.NOBLOCK, copy=False)
+        request_id = int.from_bytes(frame_buffer(frames[0]), "big")
+        pending = self._pending.pop(request_id, None)
+        if pending is None:
+            # Reply to a request we already gave up on
+            self.late_replies_dropped += 1
+            return
+        command_type, raw_message, start_time, sent_at = pending
+        self._record_phase("wait", time.perf_counter() - sent_at)
+        self.connected = True
+        # frames[1] is the empty delimiter
+        self._completed[request_id] = self._handle_reply(command_type, raw_message, frames[2:], start_time)
+
+    # --- Payload compression ---
+
+    def _negotiate_compression(self):
+        self.get_capabilities()
+        self._select_compression_codec()
+
+    def _select_compression_codec(self):
+        """Pick a codec both ends support, from the bridge's "compression_codecs" list."""
+        if self.capabilities is None:
+            return  # Bridge unreachable; try again on the next command
+        self._compression_negotiated = True
+        if "compression" in self.capabilities:
+            self.compression_codec = choose_codec(self.capability_details.get("compression_codecs", []),
+                                                  self.compression)
+        if self.compression_codec is not None and self.verbose:
+            print(f"ZMQ Client using {self.compression_codec} compression above {self.compression_threshold} bytes")
+
+    def _encode_request(self, raw_message):
+        payload = raw_message.encode('utf-8')
+        if self.compression_codec is None:
+            return payload
+        frame, codec_time_ms = wrap_frame(payload, self.compression_codec, self.compression_threshold)
+        self._record_compression(len(payload), len(frame), codec_time_ms)
+        return frame
+
+    def _record_compression(self, raw_bytes, wire_bytes, codec_time_ms):
+        self.compression_raw_bytes += raw_bytes
+        self.compression_wire_bytes += wire_bytes
+        self.metrics.record_compression(raw_bytes, wire_bytes, codec_time_ms)
+
+    def _decompress_frame(self, frame):
+        """The frame's payload buffer, decompressed if it is a compressed frame."""
+        buffer = frame_buffer(frame)
+        if is_compressed_frame(buffer):
+            payload, _, codec_time_ms = unwrap_frame(buffer)
+            self._record_compression(len(payload), len(buffer), codec_time_ms)
+            return payload
+        return buffer
+
+    def _decode_frame(self, frame, record_phases=True):
+        """Binary observation frames are returned as bytes, anything else is parsed as JSON.
+
+        `frame` may be bytes or a zmq.Frame; JSON is parsed from the frame's buffer without
+        copying it into a str first.
+        """
+        decode_start = time.perf_counter()
+        buffer = self._decompress_frame(frame)
+        if is_binary_observation(buffer):
+            if record_phases:
+                self._record_phase("decode", time.perf_counter() - decode_start)
+            return bytes(buffer)
+        parse_start = time.perf_counter()
+        response = loads_json(buffer)
+        if record_phases:
+            self._record_phase("decode", parse_start - decode_start)
+            self._record_phase("parse", time.perf_counter() - parse_start)
+        return response
+
+    # --- Observation stream (PUB/SUB) ---
+    # The bridge publishes [topic, {"tick": ..., "sequence": ...}, observation] once per game
+    # tick. A background thread keeps only the newest snapshot, so get_observation() can
+    # answer from memory instead of making a round trip. The subscriber has its own context
+    # so reconnecting the request socket doesn't interrupt the stream.
+
+    def _start_observation_stream(self):
+        self._stream_context = zmq.Context()
+        self._stream_running = True
+        self._stream_thread = threading.Thread(target=self._stream_loop, name="ZMQClient-ObservationStream",
+                                               daemon=True)
+        self._stream_thread.start()
+        if self.verbose:
+            print(f"ZMQ Client subscribed to observation stream on tcp://{self.host}:{self.stream_port}")
+
+    def _stop_observation_stream(self):
+        self._stream_running = False
+        if self._stream_thread is not None:
+            self._stream_thread.join(timeout=1)
+            self._stream_thread = None
+        if self._stream_context is not None:
+            self._stream_context.term()
+            self._stream_context = None
+
+    def _stream_loop(self):
+        socket = self._stream_context.socket(zmq.SUB)
+        try:
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.setsockopt(zmq.RCVHWM, 16)  # Only the newest snapshot matters
+            socket.setsockopt(zmq.SUBSCRIBE, OBSERVATION_STREAM_TOPIC)
+            socket.connect(f"tcp://{self.host}:{self.stream_port}")
+            while self._stream_running:
+                if socket.poll(100, zmq.POLLIN):
+                    self._handle_stream_frames(socket.recv_multipart(copy=False))
+        except zmq.error.ZMQError as e:
+            record_error("ZMQ_STREAM_ERROR", f"Observation stream stopped: {e}")
+        finally:
+            socket.close()
+
+    def _handle_stream_frames(self, frames):
+        try:
+            _, header_frame, observation_frame = frames
+            header = loads_json(frame_buffer(header_frame))
+            snapshot = ObservationSnapshot(sequence=int(header["sequence"]), tick=int(header["tick"]),
+                                           observation=self._decode_frame(observation_frame, record_phases=False),
+                                           received_at=time.time())
+        except (ValueError, KeyError, TypeError) as e:
+            record_error("ZMQ_STREAM_DECODE_ERROR", f"Malformed observation stream message: {e}")
+            return
+
+        previous = self._latest_snapshot
+        if previous is not None and snapshot.sequence > previous.sequence + 1:
+            self.stream_snapshots_skipped += snapshot.sequence - previous.sequence - 1
+        # A lower sequence means the bridge restarted its counter; take the new snapshot anyway
+        with self._snapshot_condition:
+            self._latest_snapshot = snapshot
+            self._snapshot_condition.notify_all()
+        self.last_tick = snapshot.tick
+        self.stream_snapshots_received += 1
+
+    def get_latest_snapshot(self):
+        """Return the newest ObservationSnapshot from the stream, or None if nothing arrived yet.
+
+        Compare `sequence`/`tick` with a previously seen snapshot to tell whether it is new.
+        """
+        return self._latest_snapshot
+
+    def _fresh_stream_observation(self, binary):
+        snapshot = self._latest_snapshot
+        if snapshot is None or isinstance(snapshot.observation, bytes) != binary:
+            return None
+        if (time.time() - snapshot.received_at) * 1000 > self.stream_stale_ms:
+            return None  # Publisher went quiet; don't hand out an old game state
+        self.stream_cache_hits += 1
+        return snapshot.observation
+
+    # --- Observation cache ---
+
+    def _local_observation(self, binary, refresh):
+        """An observation that can be served without a round trip (stream or cache), else None."""
+        observation = self._fresh_stream_observation(binary)
+        if observation is not None or self.observation_cache_ms is None:
+            return observation
+        cached = self._cached_observation
+        if (not refresh and cached is not None and cached[0] == binary
+                and (time.time() - cached[2]) * 1000 < self.observation_cache_ms):
+            self.observation_cache_hits += 1
+            self.metrics.record_observation_cache(hit=True)
+            return cached[1]
+        self.observation_cache_misses += 1
+        self.metrics.record_observation_cache(hit=False)
+        return None
+
+    def _cache_observation(self, binary, observation):
+        if self.observation_cache_ms is None:
+            return
+        if isinstance(observation, dict) and observation.get("status") == "error":
+            self._cached_observation = None  # Never serve an error reply from the cache
+        else:
+            self._cached_observation = (binary, observation, time.time())
+
+    def invalidate_observation_cache(self):
+        """Drop the cached observation so the next get_observation() asks the bridge."""
+        self._cached_observation = None
+
+    def get_observation(self, refresh=False):
+        """Fetch the current observation.
+
+        With an observation stream, returns the newest published snapshot without a round
+        trip, falling back to a request if the stream has nothing recent. With
+        observation_cache_ms set, an observation fetched less than that long ago is reused
+        unless `refresh` is set.
+        """
+        observation = self._local_observation(binary=False, refresh=refresh)
+        if observation is not None:
+            return observation
+        if self.delta_observations and self.supports("delta_observation"):
+            observation = self.get_observation_delta()
+        else:
+            observation = self.send_command("get_observation")
+        self._remember_tick(observation)
+        self._cache_observation(False, observation)
+        return observation
+
+    # --- Delta observations ---
+
+    def _reset_delta_state(self):
+        """Forget the reconstructed state so the next delta request is a full resync."""
+        self._delta_state = None
+        self._delta_sequence = 0
+
+    def get_observation_delta(self):
+        """Fetch an observation in delta mode and return the full reconstructed dict.
+
+        Requires the "delta_observation" capability. Error replies are returned as-is.
+        """
+        for _ in range(2):  # A failed delta is retried once as a full resync
+            response = self.send_command("get_observation_delta", params={"last_sequence": self._delta_sequence})
+            observation = self._delta_observation(response)
+            if observation is not None:
+                return observation
+        return self._delta_resync_failed()
+
+    def _delta_observation(self, response):
+        """Rebuild the observation from a delta reply; None if the request should be retried as a full resync."""
+        if not isinstance(response, dict) or "sequence" not in response:
+            # Error reply (e.g. not logged in); resync from scratch next time
+            self._reset_delta_state()
+            return response
+
+        if response.get("full"):
+            state = response.get("observation")
+            if not isinstance(state, dict):
+                return self._delta_resync_failed()
+            self.delta_full_syncs += 1
+        elif self._delta_state is None or response.get("base_sequence") != self._delta_sequence:
+            # The bridge diffed against a state we don't hold
+            self._reset_delta_state()
+            return None
+        else:
+            try:
+                state = apply_observation_delta(self._delta_state, response)
+            except (ValueError, KeyError, TypeError) as e:
+                record_error("ZMQ_DELTA_ERROR", f"Could not apply observation delta: {e}")
+                self._reset_delta_state()
+                return None
+            self.delta_updates += 1
+
+        self._delta_state = state
+        self._delta_sequence = response["sequence"]
+        return state
+
+    def _delta_resync_failed(self):
+        self._reset_delta_state()
+        error_msg = "Bridge did not send a usable full observation on delta resync"
+        record_error("ZMQ_DELTA_ERROR", error_msg)
+        return {"status": "error", "message": error_msg}
+
+    def get_observation_binary(self, refresh=False):
+        """Fetch an observation in the binary wire format (see observation_codec).
+
+        Returns the raw bytes on success, or an error dict like get_observation().
+        Requires the "binary_observation" capability. Cached like get_observation().
+        """
+        observation = self._local_observation(binary=True, refresh=refresh)
+        if observation is not None:
+            return observation
+        observation = self.send_command("get_observation_binary")
+        self._cache_observation(True, observation)
+        return observation
 
     def execute_action(self, action_type, parameters):
         # The 'params' for send_command in this case is the dict containing action_type and its own parameters
         action_payload = {"action_type": action_type, "parameters": parameters}
+        self.invalidate_observation_cache()  # The caller will want to see the action's effect
         return self.send_command("execute_action", params=action_payload)
 
+    def execute_action_batch(self, actions):
+        """Submit an ordered list of (action_type, parameters) pairs in one message.
+
+        Returns {"status": "submitted" | "partial" | "error", "results": [...]} with one
+        execute_action-style reply per action, in order. Requires the "action_batch" capability.
+        """
+        batch_payload = {"actions": [{"action_type": action_type, "parameters": parameters}
+                                     for action_type, parameters in actions]}
+        self.invalidate_observation_cache()
+        response = self.send_command("execute_action_batch", params=batch_payload)
+        return self._batch_result(response, len(batch_payload["actions"]))
+
+    @staticmethod
+    def _malformed_reply(command_type, response):
+        """Records and returns an error for a reply that parsed but is not a JSON object."""
+        error_msg = f"Malformed {command_type} reply, expected a JSON object: {response!r:.200}"
+        record_error("ZMQ_MALFORMED_REPLY", error_msg)
+        return {"status": "error", "message": error_msg}
+
+    @staticmethod
+    def _batch_result(response, num_actions):
+        if not isinstance(response, dict):
+            response = ZMQClient._malformed_reply("action batch", response)
+        if response.get("status") == "error" and "results" not in response:
+            # Transport/bridge level failure: report it against every action
+            return dict(response, results=[response] * num_actions)
+        return response
+
+    def step(self, action_type, parameters, binary_observation=False):
+        """Submit an action and fetch the post-action observation in a single round trip.
+
+        Returns a dict with "action_result" (same shape as execute_action's reply) and
+        "observation" (same shape as get_observation's reply, or bytes when
+        binary_observation is set). Only valid against bridges that advertise the "step"
+        capability; see supports().
+        """
+        action_payload = {"action_type": action_type, "parameters": parameters}
+        command_type = "step_binary" if binary_observation else "step"
+        self.invalidate_observation_cache()
+        response = self.send_command(command_type, params=action_payload)
+        if not isinstance(response, dict) or response.get("status") == "error":
+            return self._failed_step(response)
+        # The post-action observation is as fresh as a get_observation() would be
+        self._remember_tick(response.get("observation"))
+        self._cache_observation(binary_observation, response.get("observation"))
+        return response
+
+    @staticmethod
+    def _failed_step(response):
+        """A step reply for an error reply, or for a reply that is not a JSON object."""
+        if not isinstance(response, dict):
+            response = ZMQClient._malformed_reply("step", response)
+        # Transport/bridge level failure: surface it on both halves of the reply
+        return {"action_result": response, "observation": response}
+
+    # --- Tick synchronization ---
+
+    def _remember_tick(self, observation):
+        if isinstance(observation, dict) and isinstance(observation.get("game_tick"), int):
+            self.last_tick = observation["game_tick"]
+
+    def _tick_request(self, tick, timeout_ms):
+        params = {"timeout_ms": timeout_ms if timeout_ms is not None else self.timeout_ms // 2}
+        if tick is not None:
+            params["tick"] = tick
+        return params
+
+    def _tick_observation(self, binary, response):
+        """The observation from a wait_for_tick reply; records the tick reached in last_tick."""
+        if binary and isinstance(response, dict) and "tick_result" in response:
+            self._remember_tick(response["tick_result"])
+            observation = response["observation"]
+        else:
+            # JSON observation (carrying "game_tick") or an error reply
+            self._remember_tick(response)
+            observation = response
+        self._cache_observation(binary, observation)
+        return observation
+
+    def _wait_for_stream_tick(self, tick, binary, timeout_ms):
+        """Wait for a stream snapshot of `tick` (or of any later tick than the current one if None)."""
+        if self._stream_thread is None:
+            return None
+        with self._snapshot_condition:
+            latest = self._latest_snapshot
+            target = tick if tick is not None else (latest.tick + 1 if latest is not None else None)
+            ready = self._snapshot_condition.wait_for(
+                lambda: self._latest_snapshot is not None and
+                        (target is None or self._latest_snapshot.tick >= target),
+                timeout=timeout_ms / 1000.0)
+            snapshot = self._latest_snapshot
+        if not ready or isinstance(snapshot.observation, bytes) != binary:
+            return None  # Stream quiet or in the other format; ask the bridge instead
+        self.stream_cache_hits += 1
+        return snapshot.observation
+
+    def wait_for_tick(self, tick=None, binary_observation=False, timeout_ms=None):
+        """Block until the game reaches `tick` (the next tick if None) and return its observation.
+
+        Returns at once if the tick has already passed. With an observation stream the
+        snapshot is awaited locally; otherwise the bridge holds the request until the tick
+        ("tick_sync" capability), so nothing is polled. The tick reached is stored in
+        last_tick. `timeout_ms` defaults to half of the client's timeout_ms and must stay below
+        it; on timeout an error dict is returned.
+        """
+        wait_ms = timeout_ms if timeout_ms is not None else self.timeout_ms // 2
+        observation = self._wait_for_stream_tick(tick, binary_observation, wait_ms)
+        if observation is not None:
+            return observation
+        command_type = "wait_for_tick_binary" if binary_observation else "wait_for_tick"
+        response = self.send_command(command_type, params=self._tick_request(tick, wait_ms))
+        return self._tick_observation(binary_observation, response)
+
+    def wait_for_next_tick(self, binary_observation=False, timeout_ms=None):
+        """Block until the next game tick and return its observation (see wait_for_tick())."""
+        return self.wait_for_tick(None, binary_observation=binary_observation, timeout_ms=timeout_ms)
+
+    def get_capabilities(self, refresh=False):
+        """Query (once) which optional protocol features the bridge supports."""
+        if self.capabilities is not None and not refresh:
+            return self.capabilities
+
+        return self._store_capabilities(self.send_command("get_capabilities"))
+
+    def _store_capabilities(self, response):
+        """Remember the capabilities from a get_capabilities reply (or an error in its place)."""
+        if isinstance(response, dict) and isinstance(response.get("capabilities"), list):
+            self.capabilities = set(response["capabilities"])
+            self.capability_details = {key: value for key, value in response.items()
+                                       if key not in ("status", "capabilities")}
+        elif not self.connected:
+            # Bridge unreachable; don't cache so we re-negotiate once it is back
+            return set()
+        else:
+            # Older bridges don't know the command and reply with an error instead
+            self.capabilities = set()
+        return self.capabilities
+
+    def supports(self, capability):
+        """Check whether the bridge advertised the given capability (e.g. "step")."""
+        return capability in self.get_capabilities()
+
     def is_connected(self):
         """Check if the client is currently connected."""
         if not self.connected:
@@ -150,18 +894,51 @@ class ZMQClient:
             "connected": self.connected,
             "connection_attempts": self.connection_attempts,
             "last_successful_communication": self.last_successful_communication,
+            "consecutive_failures": self.consecutive_failures,
+            "avg_latency_ms": self.avg_latency_ms,
+            "json_backend": "orjson" if ORJSON_AVAILABLE else "json",
+            "latency_ms": {phase: histogram.summary() for phase, histogram in self.phase_latency.items()},
+            "circuit_state": self.circuit_state,
+            "circuit_opens": self.circuit_opens,
+            "fast_failures": self.fast_failures,
+            "compression_codec": self.compression_codec,
+            "compression_ratio": (self.compression_raw_bytes / self.compression_wire_bytes
+                                  if self.compression_wire_bytes else None),
+            "capabilities": sorted(self.capabilities) if self.capabilities is not None else None,
+            "mode": self.mode,
+            "in_flight_requests": len(self._pending),
+            "late_replies_dropped": self.late_replies_dropped,
+            "last_tick": self.last_tick,
+            "stream_port": self.stream_port,
+            "stream_sequence": self._latest_snapshot.sequence if self._latest_snapshot else None,
+            "stream_tick": self._latest_snapshot.tick if self._latest_snapshot else None,
+            "stream_snapshots_received": self.stream_snapshots_received,
+            "stream_snapshots_skipped": self.stream_snapshots_skipped,
+            "stream_cache_hits": self.stream_cache_hits,
+            "observation_cache_ms": self.observation_cache_ms,
+            "observation_cache_hits": self.observation_cache_hits,
+            "observation_cache_misses": self.observation_cache_misses,
+            "delta_sequence": self._delta_sequence,
+            "delta_full_syncs": self.delta_full_syncs,
+            "delta_updates": self.delta_updates,
+            "recorded_exchanges": self.recorder.records if self.recorder is not None else None,
             "host": self.host,
             "port": self.port
         }
 
     def close(self):
         try:
+            self._stop_probe()
+            self._stop_observation_stream()
+            if self.recorder is not None:
+                self.recorder.close()
             if self.socket:
                 self.socket.close()
-            if self.context:
+            if self.context and self._owns_context:
                 self.context.term()
             self.connected = False
-            print("ZMQ Client connection closed")
+            if self.verbose:
+                print("ZMQ Client connection closed")
         except Exception as e:
             record_error("ZMQ_CLOSE_ERROR", f"Error closing ZMQ connection: {str(e)}")
 
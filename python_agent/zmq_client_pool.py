@@ -0,0 +1,125 @@
+"""
+Client pool for driving many RuneLite bridges from one trainer process.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import zmq
+
+from zmq_client import ZMQClient, CIRCUIT_CLOSED
+from custom_env import CustomGameEnv
+from monitoring import record_error
+
+
+def parse_endpoint(endpoint):
+    """Normalize "host:port", ("host", port) or a bare port number to (host, port)."""
+    if isinstance(endpoint, int):
+        return "localhost", endpoint
+    if isinstance(endpoint, str):
+        host, _, port = endpoint.rpartition(":")
+        return host or "localhost", int(port)
+    host, port = endpoint
+    return host, int(port)
+
+
+class ZMQClientPool:
+    """One ZMQClient per bridge endpoint, all sharing a single zmq.Context.
+
+    acquire() leases out the healthy endpoint with the fewest current leases, preferring
+    lower average latency on ties; release() hands it back. An endpoint is healthy while its
+    client's circuit breaker is closed. Once it opens (after the client's failure_threshold
+    consecutive failures, a client keyword argument) the endpoint is parked: it is skipped
+    by acquire() while the client probes the bridge, and re-enters rotation when the
+    circuit closes again.
+    """
+
+    def __init__(self, endpoints, **client_kwargs):
+        if not endpoints:
+            raise ValueError("ZMQClientPool needs at least one endpoint")
+        self.context = zmq.Context()
+        self._lock = threading.Lock()
+        self._clients = {}  # (host, port) -> ZMQClient
+        self._leases = {}   # (host, port) -> number of current holders
+        self._parked = set()  # Endpoints out of rotation as of the last acquire()
+        for endpoint in endpoints:
+            host, port = parse_endpoint(endpoint)
+            self._clients[(host, port)] = ZMQClient(host=host, port=port, context=self.context, **client_kwargs)
+            self._leases[(host, port)] = 0
+
+    def _is_healthy(self, client):
+        return client.circuit_state == CIRCUIT_CLOSED
+
+    def _update_rotation(self):
+        """Healthy endpoints; reports endpoints leaving and re-entering rotation."""
+        healthy = []
+        for key, client in self._clients.items():
+            if self._is_healthy(client):
+                healthy.append(key)
+                if key in self._parked:
+                    self._parked.discard(key)
+                    record_error("ZMQ_POOL_ENDPOINT_RECOVERED",
+                                 f"Bridge tcp://{key[0]}:{key[1]} is back in the pool's rotation")
+            elif key not in self._parked:
+                self._parked.add(key)
+                record_error("ZMQ_POOL_ENDPOINT_PARKED",
+                             f"Parking bridge tcp://{key[0]}:{key[1]} after "
+                             f"{client.consecutive_failures} consecutive failures")
+        return healthy
+
+    def acquire(self):
+        """Lease the least-loaded healthy client. Raises RuntimeError if none is left."""
+        with self._lock:
+            candidates = self._update_rotation()
+            if not candidates:
+                raise RuntimeError("No healthy bridge endpoints in the pool (every circuit is open)")
+            key = min(candidates, key=lambda k: (self._leases[k], self._clients[k].avg_latency_ms or 0.0))
+            self._leases[key] += 1
+            return self._clients[key]
+
+    def release(self, client):
+        """Return a client obtained from acquire()."""
+        key = (client.host, client.port)
+        with self._lock:
+            if self._clients.get(key) is not client:
+                return  # Pool already closed
+            self._leases[key] -= 1
+
+    @contextmanager
+    def lease(self):
+        """`with pool.lease() as client:` for short-lived use of a client."""
+        client = self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def make_env_fns(self, num_envs, **env_kwargs):
+        """Env factories for in-process vector envs, each env leasing its client from the pool.
+
+        e.g. gymnasium.vector.SyncVectorEnv(pool.make_env_fns(4)). The pool shares one
+        zmq.Context, so it can't be handed to subprocess-based vector envs.
+        """
+        return [lambda: CustomGameEnv(pool=self, **env_kwargs) for _ in range(num_envs)]
+
+    def get_pool_stats(self):
+        """Per-endpoint connection stats plus lease counts, for monitoring."""
+        with self._lock:
+            endpoints = {}
+            for key, client in self._clients.items():
+                stats = client.get_connection_stats()
+                stats["leases"] = self._leases[key]
+                stats["in_rotation"] = self._is_healthy(client)
+                endpoints[f"{key[0]}:{key[1]}"] = stats
+            return {
+                "endpoints": endpoints,
+                "parked_endpoints": [name for name, stats in endpoints.items() if not stats["in_rotation"]],
+            }
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._leases.clear()
+            self.context.term()
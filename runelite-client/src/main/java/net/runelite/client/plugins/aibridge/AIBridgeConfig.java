@@ -3,6 +3,7 @@ package net.runelite.client.plugins.aibridge;
 import net.runelite.client.config.Config;
 import net.runelite.client.config.ConfigGroup;
 import net.runelite.client.config.ConfigItem;
+import net.runelite.client.config.Range;
 
 @ConfigGroup("aibridge")
 public interface AIBridgeConfig extends Config {
@@ -14,4 +15,26 @@ public interface AIBridgeConfig extends Config {
     default String greeting() {
         return "Hello";
     }
+
+    @ConfigItem(
+            keyName = "observationStream",
+            name = "Observation stream",
+            description = "Publish an observation every game tick for subscribed clients (applies when the plugin starts)"
+    )
+    default boolean observationStream() {
+        return false;
+    }
+
+    @Range(
+            min = 1,
+            max = 65535
+    )
+    @ConfigItem(
+            keyName = "observationStreamPort",
+            name = "Observation stream port",
+            description = "Port the observation stream is published on"
+    )
+    default int observationStreamPort() {
+        return 5560;
+    }
 }
@@ -1,6 +1,8 @@
 package net.runelite.client.plugins.aibridge;
 
+import com.google.inject.Provides;
 import javax.inject.Inject;
+import net.runelite.client.config.ConfigManager;
 import net.runelite.client.plugins.Plugin;
 import net.runelite.client.plugins.PluginDescriptor;
 import lombok.extern.slf4j.Slf4j;
@@ -27,16 +29,27 @@ import net.runelite.api.DecorativeObject;
 import net.runelite.api.widgets.Widget;
 import net.runelite.api.widgets.WidgetInfo;
 import net.runelite.client.callback.ClientThread;
+import net.runelite.client.eventbus.Subscribe;
+import net.runelite.api.events.GameTick;
 import net.runelite.api.TileItem; // For ground items
 import net.runelite.api.Constants; // For SCENE_SIZE
 import net.runelite.api.ItemComposition; // To get item names
 import com.google.gson.Gson;
 import com.google.gson.reflect.TypeToken;
 import java.lang.reflect.Type;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
 import java.util.List;
 import java.util.ArrayList;
 import java.util.Map;
 import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.Objects;
+import java.util.Arrays;
+import java.io.ByteArrayOutputStream;
+import java.util.zip.DataFormatException;
+import java.util.zip.Deflater;
+import java.util.zip.Inflater;
 import net.runelite.api.ObjectComposition;
 import net.runelite.api.gameval.ComponentID;
 import net.runelite.api.gameval.InventoryID;
@@ -61,19 +74,288 @@ public class AIBridgePlugin extends Plugin {
     @Inject
     private ClientThread clientThread;
 
+    // Optional protocol features advertised to clients via command:get_capabilities
+    private static final List<String> CAPABILITIES = List.of("step", "binary_observation", "delta_observation",
+            "compression", "action_batch", "tick_sync");
+
+    // Compression envelope, mirrored by python_agent/payload_compression.py:
+    // magic "MZC1", codec id of the body, codec id accepted for the reply, body
+    private static final byte[] COMPRESSION_MAGIC = {'M', 'Z', 'C', '1'};
+    private static final int COMPRESSION_ENVELOPE_SIZE = 6;
+    private static final int CODEC_NONE = 0;
+    private static final int CODEC_ZLIB = 1;
+    private static final List<String> COMPRESSION_CODECS = List.of("zlib");
+    private static final int COMPRESSION_THRESHOLD = 1024;
+
+    // PUB socket that pushes one observation snapshot per game tick (see onGameTick); opt-in via config
+    private static final byte[] OBSERVATION_STREAM_TOPIC = "observation".getBytes(ZMQ.CHARSET);
+
+    // Binary observation layout, mirrored by python_agent/observation_codec.py
+    private static final byte[] OBSERVATION_MAGIC = {'M', 'B', 'O', '1'};
+    private static final int OBSERVATION_VERSION = 1;
+    private static final int OBSERVATION_HEADER_SIZE = 12;
+    private static final int OBSERVATION_PLAYER_SIZE = 36;
+
     private ZContext context;
     private ZMQ.Socket socket;
+    private ZMQ.Socket publisher; // null while the observation stream is off
+    private int observationStreamPort; // Read from config at startUp, like the stream toggle
+    private List<String> capabilities;
+    private long publishSequence;
+
+    // Delta mode (command:get_observation_delta): recent observations keyed by sequence number,
+    // diffed the same way as python_agent/observation_delta.py
+    private static final int DELTA_HISTORY_SIZE = 8;
+    private static final List<String> ENTITY_LIST_KEYS = List.of("nearby_npcs", "inventory", "nearby_ground_items");
+    private final Map<Long, Map<String, Object>> deltaHistory = new LinkedHashMap<Long, Map<String, Object>>() {
+        @Override
+        protected boolean removeEldestEntry(Map.Entry<Long, Map<String, Object>> eldest) {
+            return size() > DELTA_HISTORY_SIZE;
+        }
+    };
+    private long deltaSequence;
     private Thread listenerThread;
 
+    // Tick sync (command:wait_for_tick): the listener thread waits on this until onGameTick reaches the tick
+    private static final long DEFAULT_TICK_WAIT_MS = 2000;
+    // The wait holds the only listener thread, so every other command queues behind it
+    private static final long MAX_TICK_WAIT_MS = 3000;
+    private final Object tickMonitor = new Object();
+
+    private static boolean isCompressedFrame(byte[] frame) {
+        return frame.length >= COMPRESSION_ENVELOPE_SIZE
+                && Arrays.equals(Arrays.copyOf(frame, COMPRESSION_MAGIC.length), COMPRESSION_MAGIC);
+    }
+
+    private static byte[] unwrapCompressedFrame(byte[] frame) throws DataFormatException {
+        byte[] body = Arrays.copyOfRange(frame, COMPRESSION_ENVELOPE_SIZE, frame.length);
+        if (frame[4] == CODEC_NONE) {
+            return body;
+        }
+        if (frame[4] != CODEC_ZLIB) {
+            throw new DataFormatException("Unsupported compression codec id: " + frame[4]);
+        }
+        Inflater inflater = new Inflater();
+        inflater.setInput(body);
+        ByteArrayOutputStream out = new ByteArrayOutputStream(body.length * 4);
+        byte[] chunk = new byte[8192];
+        try {
+            while (!inflater.finished()) {
+                int n = inflater.inflate(chunk);
+                if (n == 0 && inflater.needsInput()) {
+                    throw new DataFormatException("Truncated compressed frame");
+                }
+                out.write(chunk, 0, n);
+            }
+        } finally {
+            inflater.end();
+        }
+        return out.toByteArray();
+    }
+
+    /**
+     * Compresses a reply frame when the client negotiated a codec and the frame is large enough;
+     * smaller frames go out unwrapped.
+     */
+    private static byte[] wrapReplyFrame(byte[] payload, int acceptCodec) {
+        if (acceptCodec != CODEC_ZLIB || payload.length < COMPRESSION_THRESHOLD) {
+            return payload;
+        }
+        Deflater deflater = new Deflater(Deflater.BEST_SPEED);
+        deflater.setInput(payload);
+        deflater.finish();
+        ByteArrayOutputStream out = new ByteArrayOutputStream(payload.length / 4 + COMPRESSION_ENVELOPE_SIZE);
+        out.write(COMPRESSION_MAGIC, 0, COMPRESSION_MAGIC.length);
+        out.write(CODEC_ZLIB);
+        out.write(CODEC_NONE);
+        byte[] chunk = new byte[8192];
+        while (!deflater.finished()) {
+            int n = deflater.deflate(chunk);
+            out.write(chunk, 0, n);
+        }
+        deflater.end();
+        return out.toByteArray();
+    }
+
     private String getGameObservationJson() {
+        return gson.toJson(buildGameObservation());
+    }
+
+    /**
+     * Returns only what changed since the observation the client acknowledged, or the full
+     * observation if that one is no longer in the history (or the client sent 0 to resync).
+     */
+    @SuppressWarnings("unchecked")
+    private String getGameObservationDeltaJson(String jsonPayload) {
+        Map<String, Object> current = buildGameObservation();
+        if ("error".equals(current.get("status"))) {
+            return gson.toJson(current);
+        }
+
+        long lastSequence = 0;
+        try {
+            Map<String, Object> request = gson.fromJson(jsonPayload, new TypeToken<Map<String, Object>>(){}.getType());
+            lastSequence = ((Number) request.get("last_sequence")).longValue();
+        } catch (Exception e) {
+            log.warn("Bad delta observation request, sending full observation: " + jsonPayload);
+        }
+
+        deltaSequence++;
+        Map<String, Object> base = deltaHistory.get(lastSequence);
+        deltaHistory.put(deltaSequence, current);
+        Map<String, Object> reply = new HashMap<>();
+        reply.put("sequence", deltaSequence);
+        if (base == null) {
+            reply.put("full", true);
+            reply.put("observation", current);
+            return gson.toJson(reply);
+        }
+        reply.put("base_sequence", lastSequence);
+
+        Map<String, Object> changed = new HashMap<>();
+        Map<String, Object> lists = new HashMap<>();
+        for (Map.Entry<String, Object> entry : current.entrySet()) {
+            String key = entry.getKey();
+            Object value = entry.getValue();
+            Object baseValue = base.get(key);
+            if (ENTITY_LIST_KEYS.contains(key) && value instanceof List && baseValue instanceof List) {
+                List<Object> items = (List<Object>) value;
+                List<Object> baseItems = (List<Object>) baseValue;
+                Map<String, Object> changedItems = new HashMap<>();
+                for (int i = 0; i < items.size(); i++) {
+                    if (i >= baseItems.size() || !Objects.equals(baseItems.get(i), items.get(i))) {
+                        changedItems.put(String.valueOf(i), items.get(i));
+                    }
+                }
+                if (!changedItems.isEmpty() || items.size() != baseItems.size()) {
+                    lists.put(key, Map.of("length", items.size(), "items", changedItems));
+                }
+            } else if (!base.containsKey(key) || !Objects.equals(baseValue, value)) {
+                changed.put(key, value);
+            }
+        }
+        List<String> removed = new ArrayList<>();
+        for (String key : base.keySet()) {
+            if (!current.containsKey(key)) {
+                removed.add(key);
+            }
+        }
+        if (!changed.isEmpty()) {
+            reply.put("changed", changed);
+        }
+        if (!removed.isEmpty()) {
+            reply.put("removed", removed);
+        }
+        if (!lists.isEmpty()) {
+            reply.put("lists", lists);
+        }
+        return gson.toJson(reply);
+    }
+
+    /**
+     * Blocks until the game reaches the requested tick (or the next one if none is given).
+     * Returns the tick that was reached, or -1 on timeout. timeout_ms is capped at MAX_TICK_WAIT_MS.
+     */
+    private int awaitTick(String jsonPayload) throws InterruptedException {
+        Integer tick = null;
+        long timeoutMs = DEFAULT_TICK_WAIT_MS;
+        try {
+            Map<String, Object> request = gson.fromJson(jsonPayload, new TypeToken<Map<String, Object>>(){}.getType());
+            if (request != null && request.get("tick") != null) {
+                tick = ((Number) request.get("tick")).intValue();
+            }
+            if (request != null && request.get("timeout_ms") != null) {
+                timeoutMs = ((Number) request.get("timeout_ms")).longValue();
+            }
+        } catch (Exception e) {
+            log.warn("Bad wait_for_tick request, waiting for the next tick: " + jsonPayload);
+        }
+
+        long deadline = System.currentTimeMillis() + Math.min(timeoutMs, MAX_TICK_WAIT_MS);
+        synchronized (tickMonitor) {
+            int target = tick != null ? tick : client.getTickCount() + 1;
+            while (client.getTickCount() < target) {
+                long remaining = deadline - System.currentTimeMillis();
+                if (remaining <= 0) {
+                    return -1;
+                }
+                tickMonitor.wait(remaining);
+            }
+        }
+        return client.getTickCount();
+    }
+
+    private String tickTimeoutJson() {
+        return gson.toJson(Map.of("status", "error", "message", "Timed out waiting for game tick",
+                "game_tick", client.getTickCount()));
+    }
+
+    /**
+     * Encodes the observation in the fixed-layout binary format read by python_agent/observation_codec.py.
+     * Errors (e.g. not logged in) are still sent as JSON so the client can report the message.
+     */
+    @SuppressWarnings("unchecked")
+    private byte[] getGameObservationBinary() {
+        Map<String, Object> observation = buildGameObservation();
+        if ("error".equals(observation.get("status"))) {
+            return gson.toJson(observation).getBytes(ZMQ.CHARSET);
+        }
+
+        List<Map<String, Object>> npcs = (List<Map<String, Object>>) observation.get("nearby_npcs");
+        List<Map<String, Object>> inventoryItems = (List<Map<String, Object>>) observation.get("inventory");
+        List<Map<String, Object>> groundItems = (List<Map<String, Object>>) observation.get("nearby_ground_items");
+        Map<String, Integer> location = (Map<String, Integer>) observation.get("player_location");
+
+        int size = OBSERVATION_HEADER_SIZE + OBSERVATION_PLAYER_SIZE
+                + npcs.size() * 16 + inventoryItems.size() * 8 + groundItems.size() * 16;
+        ByteBuffer buffer = ByteBuffer.allocate(size).order(ByteOrder.LITTLE_ENDIAN);
+        buffer.put(OBSERVATION_MAGIC);
+        buffer.putShort((short) OBSERVATION_VERSION);
+        buffer.putShort((short) npcs.size());
+        buffer.putShort((short) inventoryItems.size());
+        buffer.putShort((short) groundItems.size());
+
+        buffer.putFloat(((Number) observation.get("player_current_health")).floatValue());
+        buffer.putFloat(((Number) observation.get("player_max_health")).floatValue());
+        buffer.putFloat(((Number) observation.get("player_current_prayer")).floatValue());
+        buffer.putFloat(((Number) observation.get("player_max_prayer")).floatValue());
+        buffer.putFloat(((Number) observation.get("player_run_energy_fraction")).floatValue());
+        buffer.putFloat(location != null ? location.get("x") : 0);
+        buffer.putFloat(location != null ? location.get("y") : 0);
+        buffer.putFloat(location != null ? location.get("plane") : 0);
+        buffer.putInt(((Number) observation.get("player_animation")).intValue());
+
+        for (Map<String, Object> npc : npcs) {
+            Map<String, Integer> npcLocation = (Map<String, Integer>) npc.get("location");
+            buffer.putFloat(((Number) npc.get("id")).floatValue());
+            buffer.putFloat(npcLocation.get("x"));
+            buffer.putFloat(npcLocation.get("y"));
+            buffer.putFloat(((Number) npc.get("animation")).floatValue());
+        }
+        for (Map<String, Object> item : inventoryItems) {
+            buffer.putFloat(((Number) item.get("id")).floatValue());
+            buffer.putFloat(((Number) item.get("quantity")).floatValue());
+        }
+        for (Map<String, Object> item : groundItems) {
+            Map<String, Integer> itemLocation = (Map<String, Integer>) item.get("location");
+            buffer.putFloat(((Number) item.get("id")).floatValue());
+            buffer.putFloat(((Number) item.get("quantity")).floatValue());
+            buffer.putFloat(itemLocation.get("x"));
+            buffer.putFloat(itemLocation.get("y"));
+        }
+        return buffer.array();
+    }
+
+    private Map<String, Object> buildGameObservation() {
         if (client == null) {
-            return gson.toJson(Map.of("status", "error", "message", "Client is null."));
+            return Map.of("status", "error", "message", "Client is null.");
         }
         if (client.getGameState() != GameState.LOGGED_IN) {
-            return gson.toJson(Map.of("status", "error", "message", "Not logged in. Current state: " + client.getGameState()));
+            return Map.of("status", "error", "message", "Not logged in. Current state: " + client.getGameState());
         }
 
         Map<String, Object> observation = new HashMap<>();
+        observation.put("game_tick", client.getTickCount());
         observation.put("player_current_health", client.getBoostedSkillLevel(Skill.HITPOINTS));
         observation.put("player_max_health", client.getRealSkillLevel(Skill.HITPOINTS));
         observation.put("player_current_prayer", client.getBoostedSkillLevel(Skill.PRAYER));
@@ -177,7 +459,12 @@ public class AIBridgePlugin extends Plugin {
         }
         observation.put("nearby_ground_items", groundItemsList);
 
-        return gson.toJson(observation);
+        return observation;
+    }
+
+    @Provides
+    AIBridgeConfig provideConfig(ConfigManager configManager) {
+        return configManager.getConfig(AIBridgeConfig.class);
     }
 
     @Override
@@ -186,34 +473,91 @@ public class AIBridgePlugin extends Plugin {
         context = new ZContext();
         socket = context.createSocket(SocketType.REP);
         socket.bind("tcp://*:5555");
+        capabilities = CAPABILITIES;
+        if (config.observationStream()) {
+            publisher = context.createSocket(SocketType.PUB);
+            publisher.setSndHWM(4); // Slow subscribers should lose old snapshots, not queue them
+            observationStreamPort = config.observationStreamPort();
+            publisher.bind("tcp://*:" + observationStreamPort);
+            capabilities = new ArrayList<>(CAPABILITIES);
+            capabilities.add("observation_stream");
+        }
+        publishSequence = 0;
 
         listenerThread = new Thread(() -> {
             while (!Thread.currentThread().isInterrupted()) {
                 try {
                     // Wait for next request from client
                     byte[] request = socket.recv(0);
+                    int acceptCodec = CODEC_NONE;
+                    if (isCompressedFrame(request)) {
+                        acceptCodec = request[5];
+                        request = unwrapCompressedFrame(request);
+                    }
                     String message = new String(request, ZMQ.CHARSET);
                     log.info("Received request: " + message);
 
                     // Process the request
                     String reply = "Error: Unknown command"; // Default reply for unknown commands
+                    byte[] binaryReply = null; // Set for commands whose last frame is a binary observation
                     if ("hello".equalsIgnoreCase(message)) {
                         reply = "Received hello";
                     } else if ("command:get_observation".equalsIgnoreCase(message)) {
                         reply = getGameObservationJson();
-                    } else if (message != null && message.startsWith("command:execute_action:")) {
-                        String jsonPayload = message.substring("command:execute_action:".length());
-                        try {
-                            Type type = new TypeToken<Map<String, Object>>(){}.getType();
-                            Map<String, Object> actionDetails = gson.fromJson(jsonPayload, type);
-                            reply = handleAction(actionDetails);
-                        } catch (Exception e) {
-                            log.error("Failed to parse or handle action: " + jsonPayload, e);
-                            reply = gson.toJson(Map.of("status", "error", "message", "Failed to handle action: " + e.getMessage()));
+                    } else if ("command:get_observation_binary".equalsIgnoreCase(message)) {
+                        reply = null;
+                        binaryReply = getGameObservationBinary();
+                    } else if (message != null && message.startsWith("command:get_observation_delta:")) {
+                        reply = getGameObservationDeltaJson(message.substring("command:get_observation_delta:".length()));
+                    } else if ("command:get_capabilities".equalsIgnoreCase(message)) {
+                        Map<String, Object> capabilitiesReply = new HashMap<>();
+                        capabilitiesReply.put("status", "ok");
+                        capabilitiesReply.put("capabilities", capabilities);
+                        capabilitiesReply.put("compression_codecs", COMPRESSION_CODECS);
+                        if (publisher != null) {
+                            capabilitiesReply.put("observation_stream_port", observationStreamPort);
+                        }
+                        reply = gson.toJson(capabilitiesReply);
+                    } else if (message != null && message.startsWith("command:step:")) {
+                        // Execute the action and return the observation in the same reply
+                        String actionReply = handleActionPayload(message.substring("command:step:".length()));
+                        reply = "{\"action_result\":" + actionReply + ",\"observation\":" + getGameObservationJson() + "}";
+                    } else if (message != null && message.startsWith("command:step_binary:")) {
+                        // Two frames: JSON action result, then the binary observation
+                        reply = handleActionPayload(message.substring("command:step_binary:".length()));
+                        binaryReply = getGameObservationBinary();
+                    } else if (message != null && message.startsWith("command:wait_for_tick:")) {
+                        // Answer once the tick is reached, so the client never polls for it
+                        reply = awaitTick(message.substring("command:wait_for_tick:".length())) < 0
+                                ? tickTimeoutJson() : getGameObservationJson();
+                    } else if (message != null && message.startsWith("command:wait_for_tick_binary:")) {
+                        // Two frames: JSON {"status", "game_tick"}, then the binary observation
+                        int tick = awaitTick(message.substring("command:wait_for_tick_binary:".length()));
+                        if (tick < 0) {
+                            reply = tickTimeoutJson();
+                        } else {
+                            reply = gson.toJson(Map.of("status", "ok", "game_tick", tick));
+                            binaryReply = getGameObservationBinary();
                         }
+                    } else if (message != null && message.startsWith("command:execute_action_batch:")) {
+                        reply = handleActionBatchPayload(message.substring("command:execute_action_batch:".length()));
+                    } else if (message != null && message.startsWith("command:execute_action:")) {
+                        reply = handleActionPayload(message.substring("command:execute_action:".length()));
                     }
 
-                    socket.send(reply.getBytes(ZMQ.CHARSET), 0);
+                    if (reply != null && binaryReply != null) {
+                        socket.send(wrapReplyFrame(reply.getBytes(ZMQ.CHARSET), acceptCodec), ZMQ.SNDMORE);
+                        socket.send(wrapReplyFrame(binaryReply, acceptCodec), 0);
+                    } else if (binaryReply != null) {
+                        socket.send(wrapReplyFrame(binaryReply, acceptCodec), 0);
+                    } else {
+                        socket.send(wrapReplyFrame(reply.getBytes(ZMQ.CHARSET), acceptCodec), 0);
+                    }
+                } catch (InterruptedException e) {
+                    // shutDown() during wait_for_tick; wait() cleared the flag, so restore it and stop
+                    Thread.currentThread().interrupt();
+                    log.info("Listener thread interrupted, exiting.");
+                    break;
                 } catch (Exception e) {
                     if (Thread.currentThread().isInterrupted()) {
                         log.info("Listener thread interrupted, exiting.");
@@ -226,6 +570,29 @@ public class AIBridgePlugin extends Plugin {
         listenerThread.setName("AIBridge-ZMQ-Listener");
         listenerThread.start();
         log.info("AI Bridge ZMQ listener started on tcp://*:5555");
+        if (publisher != null) {
+            log.info("AI Bridge observation stream publishing on tcp://*:" + observationStreamPort);
+        }
+    }
+
+    /**
+     * Publishes [topic, {"tick", "sequence"}, observation JSON] every game tick, so subscribed
+     * clients can read the latest state without a request, and releases command:wait_for_tick.
+     * Runs on the client thread, so nothing is serialized while the stream is off.
+     */
+    @Subscribe
+    public void onGameTick(GameTick event) {
+        synchronized (tickMonitor) {
+            tickMonitor.notifyAll(); // Wake a pending command:wait_for_tick
+        }
+        if (publisher == null || client.getGameState() != GameState.LOGGED_IN) {
+            return;
+        }
+        publishSequence++;
+        String header = gson.toJson(Map.of("tick", client.getTickCount(), "sequence", publishSequence));
+        publisher.send(OBSERVATION_STREAM_TOPIC, ZMQ.SNDMORE);
+        publisher.send(header.getBytes(ZMQ.CHARSET), ZMQ.SNDMORE);
+        publisher.send(getGameObservationJson().getBytes(ZMQ.CHARSET), 0);
     }
 
     @Override
@@ -236,6 +603,10 @@ public class AIBridgePlugin extends Plugin {
         if (socket != null) {
             socket.close();
         }
+        if (publisher != null) {
+            publisher.close();
+            publisher = null;
+        }
         
         if (listenerThread != null) {
             listenerThread.interrupt();
@@ -255,6 +626,47 @@ public class AIBridgePlugin extends Plugin {
         log.info("AI Bridge stopped!");
     }
 
+    private String handleActionPayload(String jsonPayload) {
+        try {
+            Type type = new TypeToken<Map<String, Object>>(){}.getType();
+            Map<String, Object> actionDetails = gson.fromJson(jsonPayload, type);
+            return handleAction(actionDetails);
+        } catch (Exception e) {
+            log.error("Failed to parse or handle action: " + jsonPayload, e);
+            return gson.toJson(Map.of("status", "error", "message", "Failed to handle action: " + e.getMessage()));
+        }
+    }
+
+    /**
+     * Runs {"actions": [action, ...]} in order. Every action is attempted and gets its own entry
+     * in "results"; the overall status is "submitted" (all), "partial" (some) or "error" (none).
+     */
+    @SuppressWarnings("unchecked")
+    private String handleActionBatchPayload(String jsonPayload) {
+        try {
+            Type type = new TypeToken<Map<String, Object>>(){}.getType();
+            Map<String, Object> batch = gson.fromJson(jsonPayload, type);
+            List<Map<String, Object>> actions = (List<Map<String, Object>>) batch.get("actions");
+            if (actions == null) {
+                return gson.toJson(Map.of("status", "error", "message", "Missing actions"));
+            }
+            List<Map<String, Object>> results = new ArrayList<>();
+            int submitted = 0;
+            for (Map<String, Object> action : actions) {
+                Map<String, Object> result = gson.fromJson(handleAction(action), type);
+                if ("submitted".equals(result.get("status"))) {
+                    submitted++;
+                }
+                results.add(result);
+            }
+            String status = submitted == actions.size() ? "submitted" : submitted > 0 ? "partial" : "error";
+            return gson.toJson(Map.of("status", status, "results", results));
+        } catch (Exception e) {
+            log.error("Failed to parse or handle action batch: " + jsonPayload, e);
+            return gson.toJson(Map.of("status", "error", "message", "Failed to handle action batch: " + e.getMessage()));
+        }
+    }
+
     private String handleAction(Map<String, Object> actionDetails) {
         String actionType = (String) actionDetails.get("action_type");
         Map<String, Object> parameters = (Map<String, Object>) actionDetails.get("parameters");